@@ -2,6 +2,8 @@
 Application configuration using Pydantic Settings.
 Loads from environment variables and .env file.
 """
+from typing import Optional
+
 from pydantic_settings import BaseSettings
 
 
@@ -16,6 +18,142 @@ class Settings(BaseSettings):
     # CORS
     cors_origins: str = "*"
     
+    # Blocking call executor (worker threads / timeout seconds per call class)
+    executor_search_workers: int = 8
+    executor_search_timeout: float = 20.0
+    executor_browse_workers: int = 8
+    executor_browse_timeout: float = 30.0
+    executor_extraction_workers: int = 4
+    executor_extraction_timeout: float = 60.0
+    # Speculative stream prefetch (kept small: it shares the yt-dlp pool)
+    executor_prefetch_workers: int = 1
+    # Download job workers, and how long GET /download/{video_id} waits for its job
+    executor_download_workers: int = 2
+    executor_download_timeout: float = 600.0
+    
+    # Unified search (type=all): deadline in seconds for each result section
+    search_section_timeout: float = 8.0
+    
+    # Stream URL cache
+    stream_cache_max_entries: int = 5000
+    stream_cache_max_bytes: int = 16 * 1024 * 1024
+    stream_cache_max_ttl: int = 6 * 60 * 60
+    # Stop serving a cached URL this many seconds before YouTube expires it
+    stream_cache_expiry_margin: int = 30 * 60
+    
+    # Pooled yt-dlp instances for stream extraction
+    ydl_pool_size: int = 4
+    ydl_pool_max_uses: int = 200
+    
+    # Batch stream resolution (POST /api/v1/stream/batch)
+    stream_batch_max_ids: int = 50
+    # Capped below executor_extraction_workers so a batch can't take every worker
+    stream_batch_concurrency: int = 3
+    
+    # Speculative stream URL prefetch after /related, /album and /playlist:
+    # tracks per response, and a global budget of extractions per minute (burst)
+    stream_prefetch_enabled: bool = True
+    stream_prefetch_tracks: int = 3
+    stream_prefetch_per_minute: float = 30.0
+    stream_prefetch_burst: int = 10
+    
+    # Persistent SQLite cache shared by all workers (TTL in seconds per type)
+    cache_enabled: bool = True
+    cache_db_path: str = "data/cache.sqlite3"
+    cache_max_bytes: int = 256 * 1024 * 1024
+    cache_ttl_song: int = 24 * 60 * 60
+    cache_ttl_album: int = 7 * 24 * 60 * 60
+    cache_ttl_artist: int = 24 * 60 * 60
+    cache_ttl_playlist: int = 60 * 60
+    cache_ttl_lyrics: int = 30 * 24 * 60 * 60
+    # "No lyrics" results, so instrumentals are re-checked now and then
+    cache_ttl_lyrics_negative: int = 3 * 24 * 60 * 60
+    
+    # Playlist search song counts: "fast" returns YouTube's item count and
+    # fills the exact playable count in the background, "exact" waits for it
+    playlist_count_mode: str = "fast"
+    playlist_count_ttl: int = 24 * 60 * 60
+    playlist_count_cache_entries: int = 10000
+    
+    # Search/browse response cache ("memory" or "redis" backend), TTL in seconds
+    response_cache_enabled: bool = True
+    response_cache_backend: str = "memory"
+    response_cache_redis_url: str = "redis://localhost:6379/0"
+    # Seconds an unreachable Redis server is skipped before it is tried again
+    response_cache_redis_retry_after: float = 30.0
+    response_cache_max_entries: int = 5000
+    response_cache_ttl_search: int = 10 * 60
+    response_cache_ttl_album: int = 24 * 60 * 60
+    response_cache_ttl_artist: int = 6 * 60 * 60
+    response_cache_ttl_playlist: int = 30 * 60
+    # Serve expired entries this much longer while refreshing in the background
+    response_cache_stale_ttl: int = 60 * 60
+    
+    # Autocomplete prefix index: suggestion lists kept per prefix (TTL in seconds)
+    suggestion_index_enabled: bool = True
+    suggestion_index_max_entries: int = 20000
+    suggestion_index_ttl: int = 6 * 60 * 60
+    # Suggestions YouTube Music returns for a prefix with many completions;
+    # shorter lists are complete and answer longer prefixes (0 = never derive)
+    suggestion_page_size: int = 7
+    
+    # Shared outbound HTTP client (LRCLIB); timeouts in seconds
+    http_http2: bool = True
+    http_connect_timeout: float = 2.0
+    http_read_timeout: float = 5.0
+    http_max_connections: int = 20
+    http_max_keepalive: int = 10
+    http_keepalive_expiry: float = 60.0
+    
+    # Skip LRCLIB for a cool-down after this many consecutive failures
+    lrclib_breaker_threshold: int = 5
+    lrclib_breaker_cooldown: float = 60.0
+    
+    # Audio relay (GET /api/v1/stream/{video_id}/audio)
+    relay_upstream_chunk_bytes: int = 10 * 1024 * 1024
+    relay_read_chunk_bytes: int = 64 * 1024
+    relay_max_re_resolves: int = 2
+    relay_connect_timeout: float = 5.0
+    relay_read_timeout: float = 30.0
+    relay_max_connections: int = 100
+    
+    # Download jobs: queue limit and how long finished jobs/files are kept (seconds)
+    download_max_queued: int = 500
+    download_job_ttl: int = 60 * 60
+    # Progressive downloads: read size and how often the growing file is polled (seconds)
+    download_progressive_chunk_bytes: int = 64 * 1024
+    download_progressive_poll_interval: float = 0.1
+    
+    # On-disk LRU cache of downloaded audio files, shared by all workers
+    audio_cache_enabled: bool = True
+    audio_cache_dir: str = "data/audio"
+    audio_cache_max_bytes: int = 2 * 1024 * 1024 * 1024
+    # nginx internal location mapped to audio_cache_dir (e.g. "/cached-audio/");
+    # when set, files are served by nginx via X-Accel-Redirect
+    audio_cache_accel_redirect: str = ""
+    
+    # Per-request phase timings: Server-Timing response header, and a
+    # structured log of requests slower than the threshold (seconds, 0 = off)
+    server_timing_enabled: bool = True
+    slow_request_threshold: float = 2.0
+    
+    # Upstream YTMusic client: "live", "record" (save every response as a
+    # gzip fixture) or "replay" (serve fixtures, no network)
+    ytmusic_mode: str = "live"
+    ytmusic_fixtures_dir: str = "data/fixtures/ytmusic"
+    # Seconds per replayed call; unset replays the recorded latency
+    ytmusic_replay_latency: Optional[float] = None
+    
+    # Outbound rate governor shared by ytmusicapi and yt-dlp: sustained calls
+    # per second, burst, backed-off floor and longest wait for a slot (seconds)
+    governor_enabled: bool = True
+    governor_rate: float = 10.0
+    governor_burst: int = 30
+    governor_min_rate: float = 1.0
+    governor_max_wait: float = 20.0
+    # Minimum seconds between two rate decreases on throttling
+    governor_backoff_cooldown: float = 5.0
+    
     class Config:
         env_file = ".env"
         env_file_encoding = "utf-8"
@@ -1,11 +1,45 @@
 """
 YT Music API - FastAPI Application Entry Point.
 """
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response
 
 from app.config import settings
+from app.middleware import MetricsMiddleware, TimingMiddleware
 from app.routers import search, stream, metadata, download, playlist, album, artist
+from app.services.executor import blocking_executor, ExecutorTimeoutError
+from app.services.audio_cache import audio_cache
+from app.services.audio_relay import audio_relay
+from app.services.download_jobs import download_jobs
+from app.services.http_client import http_client
+from app.services.stream_extractor import stream_extractor_service
+from app.services.stream_prefetch import stream_prefetcher
+from app.services.rate_governor import youtube_governor
+from app.services.response_cache import response_cache
+from app.services.service_metrics import collect_service_metrics
+from app.services.youtube_music import yt_music_service
+from app.utils.metrics import metrics
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start up and tear down shared resources."""
+    # Warm the yt-dlp pool off the event loop so the first streams skip setup
+    try:
+        await blocking_executor.run("extraction", stream_extractor_service.warm_up)
+    except Exception as e:
+        print(f"yt-dlp pool warm-up failed: {e}")
+    # Apply the size cap (it may have shrunk) and learn the cache size
+    audio_cache.evict()
+    yield
+    blocking_executor.shutdown(wait=False)
+    stream_extractor_service.close()
+    http_client.close()
+    await audio_relay.aclose()
+    download_jobs.shutdown()
 
 
 # Create FastAPI application
@@ -13,7 +47,8 @@ app = FastAPI(
     title="YT Music API",
     description="Backend API untuk aplikasi YT Music Personal",
     version="1.0.0",
-    debug=settings.debug
+    debug=settings.debug,
+    lifespan=lifespan
 )
 
 # CORS Middleware - untuk mengizinkan request dari Android app
@@ -25,6 +60,16 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Per-route latency histograms and in-flight gauge for /metrics
+app.add_middleware(MetricsMiddleware)
+# Server-Timing header and slow-request log
+app.add_middleware(
+    TimingMiddleware,
+    server_timing=settings.server_timing_enabled,
+    slow_threshold=settings.slow_request_threshold
+)
+metrics.register_collector(collect_service_metrics)
+
 # Include routers
 app.include_router(search.router, prefix="/api/v1", tags=["Search"])
 app.include_router(stream.router, prefix="/api/v1", tags=["Stream"])
@@ -35,16 +80,41 @@ app.include_router(metadata.router, tags=["Metadata"])
 app.include_router(download.router, tags=["Download"])
 
 
+@app.exception_handler(ExecutorTimeoutError)
+async def executor_timeout_handler(request: Request, exc: ExecutorTimeoutError):
+    """Upstream call took longer than its pool timeout."""
+    return JSONResponse(
+        status_code=504,
+        content={"detail": {"code": "UPSTREAM_TIMEOUT", "message": str(exc)}}
+    )
+
+
 @app.get("/health", tags=["Health"])
 async def health_check():
     """Health check endpoint."""
     return {
         "status": "ok",
         "version": "1.0.0",
-        "message": "YT Music API is running"
+        "message": "YT Music API is running",
+        "executor": blocking_executor.stats(),
+        "stream": stream_extractor_service.stats(),
+        "prefetch": stream_prefetcher.stats(),
+        "relay": audio_relay.stats(),
+        "downloads": download_jobs.stats(),
+        "audio_cache": audio_cache.stats(),
+        "response_cache": response_cache.stats(),
+        "lrclib": yt_music_service.lrclib_breaker.stats(),
+        "suggestions": yt_music_service.suggestion_index.stats(),
+        "governor": youtube_governor.stats()
     }
 
 
+@app.get("/metrics", tags=["Health"], include_in_schema=False)
+async def metrics_endpoint():
+    """Prometheus metrics (per worker process)."""
+    return Response(content=metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+
 @app.get("/", tags=["Root"])
 async def root():
     """Root endpoint with API info."""
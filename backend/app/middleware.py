@@ -0,0 +1,126 @@
+"""
+ASGI middleware: per-route latency metrics, and per-request phase timings
+(Server-Timing header and slow-request log).
+"""
+import json
+import logging
+import time
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.utils.metrics import metrics
+from app.utils.timing import end_trace, start_trace
+
+slow_log = logging.getLogger("app.slow_requests")
+
+
+http_duration = metrics.histogram(
+    "http_request_duration_seconds",
+    "Time from receiving a request to sending the last response byte",
+    ("method", "route", "status")
+)
+http_in_flight = metrics.gauge(
+    "http_requests_in_flight",
+    "Requests currently being handled",
+    ("method",)
+)
+
+
+class MetricsMiddleware:
+    """
+    Times every HTTP request by route template (e.g. /api/v1/album/{browse_id}),
+    so label cardinality stays bounded. Unmatched paths are reported as
+    "unmatched".
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = 500
+        started = time.perf_counter()
+
+        async def send_wrapper(message: Message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        http_in_flight.inc(method)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            http_in_flight.dec(method)
+            http_duration.observe(time.perf_counter() - started, method, route_template(scope), status)
+
+
+def route_template(scope: Scope) -> str:
+    """Path template of the route that handled a request."""
+    # The router stores the matched route in the (shared) scope. Routes of
+    # included routers keep their own path there; the prefixed template is
+    # on the effective route context (newer FastAPI)
+    context = scope.get("fastapi", {}).get("effective_route_context")
+    path = getattr(context, "path", None) or getattr(scope.get("route"), "path", None)
+    return path or "unmatched"
+
+
+class TimingMiddleware:
+    """
+    Traces each HTTP request (see app.utils.timing). Phase timings are added
+    as a Server-Timing header when the response starts; requests whose
+    response started later than slow_threshold are logged as one JSON line
+    with the full span tree. Both measure up to the response start, so a
+    long streamed body (audio relay, progressive download) is not "slow".
+    """
+
+    def __init__(self, app: ASGIApp, server_timing: bool = True, slow_threshold: float = 0.0):
+        """
+        Args:
+            server_timing: Add the Server-Timing header
+            slow_threshold: Seconds above which a request is logged (0 = never)
+        """
+        self.app = app
+        self.server_timing = server_timing
+        self.slow_threshold = slow_threshold
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or not (self.server_timing or self.slow_threshold > 0):
+            await self.app(scope, receive, send)
+            return
+
+        trace, token = start_trace(scope["method"], path=scope["path"])
+        status = 500
+        response_started = None
+
+        async def send_wrapper(message: Message):
+            nonlocal status, response_started
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                response_started = trace.root.elapsed()
+                if self.server_timing:
+                    MutableHeaders(scope=message).append("Server-Timing", trace.server_timing())
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            end_trace(trace, token)
+            total = trace.root.elapsed()
+            elapsed = total if response_started is None else response_started
+            if 0 < self.slow_threshold <= elapsed:
+                slow_log.warning(json.dumps({
+                    "event": "slow_request",
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "route": route_template(scope),
+                    "status": status,
+                    "ms": round(elapsed * 1000, 3),
+                    "total_ms": round(total * 1000, 3),
+                    "spans": trace.to_dict(),
+                }, default=str))
@@ -0,0 +1,46 @@
+"""
+Download job models.
+"""
+from typing import Annotated, List, Literal, Optional
+from pydantic import BaseModel, Field, StringConstraints
+
+# Both end up in file names, so only these shapes are accepted
+VIDEO_ID_PATTERN = r"^[A-Za-z0-9_-]{11}$"
+AudioQuality = Literal["best", "128k", "256k"]
+VideoId = Annotated[str, StringConstraints(pattern=VIDEO_ID_PATTERN)]
+
+
+class DownloadJobRequest(BaseModel):
+    """Request body for enqueuing downloads."""
+    video_ids: List[VideoId] = Field(..., min_length=1)
+    quality: AudioQuality = "best"
+    priority: Literal["high", "normal", "low"] = "normal"
+    # Transcoding happens only when no source in this codec exists
+    codec: Literal["m4a", "opus"] = "m4a"
+
+
+class DownloadJobData(BaseModel):
+    """
+    Status of a download job.
+    
+    Attributes:
+        status: "queued" | "downloading" | "processing" | "done" | "failed"
+        progress: Download progress from 0 to 1
+        delivery: How the file was produced - "passthrough", "remux",
+            "transcode" or "cached"
+        file_url: Where to fetch the file once status is "done"
+    """
+    job_id: str
+    video_id: str
+    quality: str
+    priority: str
+    codec: str
+    status: str
+    progress: float
+    downloaded_bytes: Optional[int] = None
+    total_bytes: Optional[int] = None
+    speed: Optional[float] = None
+    eta_seconds: Optional[int] = None
+    error: Optional[str] = None
+    delivery: Optional[str] = None
+    file_url: Optional[str] = None
@@ -1,12 +1,13 @@
 """
 Song-related models for YouTube Music data.
 """
-from typing import Optional, List, Any
-from pydantic import BaseModel
+from typing import Optional, List, Any, Dict
+from pydantic import BaseModel, Field
 
 from app.models.playlist import Playlist
 from app.models.album import Album
 from app.models.artist import Artist
+from app.models.response import ErrorDetail
 
 
 class Song(BaseModel):
@@ -24,6 +25,8 @@ class SearchMeta(BaseModel):
     """Metadata for search results."""
     query: str
     count: int
+    # Per-section status for unified search: "ok" | "timeout" | "error"
+    sections: Optional[Dict[str, str]] = None
 
 
 class SearchResponse(BaseModel):
@@ -50,6 +53,19 @@ class StreamData(BaseModel):
     expires_in_seconds: int
 
 
+class StreamBatchRequest(BaseModel):
+    """Request body for batch stream resolution."""
+    video_ids: List[str] = Field(..., min_length=1)
+
+
+class StreamBatchItem(BaseModel):
+    """One line of the batch stream response (NDJSON)."""
+    video_id: str
+    success: bool
+    data: Optional[StreamData] = None
+    error: Optional[ErrorDetail] = None
+
+
 class MetadataResponse(BaseModel):
     """Response model for metadata endpoint."""
     video_id: str
@@ -59,6 +75,7 @@ class MetadataResponse(BaseModel):
     duration_seconds: int
     has_lyrics: bool
     lyrics: Optional[Any] = None  # LyricsData dict or None
+    lyrics_status: str = "included"  # "included" | "timeout" | "pending" | "skipped"
 
 
 class RelatedResponse(BaseModel):
@@ -5,6 +5,9 @@ from fastapi import APIRouter, HTTPException
 
 from app.models.response import ApiResponse
 from app.services.youtube_music import yt_music_service
+from app.services.executor import blocking_executor
+from app.utils.json_response import api_response
+from app.services.stream_prefetch import stream_prefetcher
 
 
 router = APIRouter()
@@ -22,24 +25,21 @@ async def get_album(browse_id: str):
     if not browse_id:
         raise HTTPException(status_code=400, detail="Album ID required")
     
-    album_data = yt_music_service.get_album(browse_id)
+    album_data = await blocking_executor.run("browse", yt_music_service.get_album, browse_id)
     
     if not album_data:
         raise HTTPException(status_code=404, detail="Album not found")
     
-    # Convert Song objects to dicts
-    songs_data = [song.model_dump() for song in album_data["songs"]]
+    # Warm stream URLs for the tracks the user is likely to play first
+    stream_prefetcher.schedule(song.video_id for song in album_data["songs"])
     
-    return ApiResponse(
-        success=True,
-        data={
-            "browse_id": album_data["browse_id"],
-            "title": album_data["title"],
-            "artist": album_data["artist"],
-            "thumbnail_url": album_data["thumbnail_url"],
-            "year": album_data["year"],
-            "track_count": album_data["track_count"],
-            "duration": album_data["duration"],
-            "songs": songs_data
-        }
-    )
+    return api_response({
+        "browse_id": album_data["browse_id"],
+        "title": album_data["title"],
+        "artist": album_data["artist"],
+        "thumbnail_url": album_data["thumbnail_url"],
+        "year": album_data["year"],
+        "track_count": album_data["track_count"],
+        "duration": album_data["duration"],
+        "songs": album_data["songs"]
+    })
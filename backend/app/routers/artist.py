@@ -5,6 +5,8 @@ from fastapi import APIRouter, HTTPException
 
 from app.models.response import ApiResponse
 from app.services.youtube_music import yt_music_service
+from app.services.executor import blocking_executor
+from app.utils.json_response import api_response
 
 
 router = APIRouter()
@@ -22,24 +24,17 @@ async def get_artist(browse_id: str):
     if not browse_id:
         raise HTTPException(status_code=400, detail="Artist ID required")
     
-    artist_data = yt_music_service.get_artist(browse_id)
+    artist_data = await blocking_executor.run("browse", yt_music_service.get_artist, browse_id)
     
     if not artist_data:
         raise HTTPException(status_code=404, detail="Artist not found")
     
-    # Convert Song and Album objects to dicts
-    songs_data = [song.model_dump() for song in artist_data["songs"]]
-    albums_data = [album.model_dump() for album in artist_data["albums"]]
-    
-    return ApiResponse(
-        success=True,
-        data={
-            "browse_id": artist_data["browse_id"],
-            "name": artist_data["name"],
-            "thumbnail_url": artist_data["thumbnail_url"],
-            "description": artist_data["description"],
-            "subscribers": artist_data["subscribers"],
-            "songs": songs_data,
-            "albums": albums_data
-        }
-    )
+    return api_response({
+        "browse_id": artist_data["browse_id"],
+        "name": artist_data["name"],
+        "thumbnail_url": artist_data["thumbnail_url"],
+        "description": artist_data["description"],
+        "subscribers": artist_data["subscribers"],
+        "songs": artist_data["songs"],
+        "albums": artist_data["albums"]
+    })
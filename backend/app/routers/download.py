@@ -1,55 +1,198 @@
 """
 Download router for audio files.
+Downloads run as background jobs: POST enqueues, GET polls progress and the
+finished file is fetched separately.
 """
+import asyncio
 import os
-from fastapi import APIRouter, BackgroundTasks, HTTPException
-from fastapi.responses import FileResponse
+import time
+from typing import List, Optional
 
-from app.services.youtube_music import yt_music_service
+from fastapi import APIRouter, HTTPException, Path
+from fastapi.responses import FileResponse, Response, StreamingResponse
+
+from app.config import settings
+from app.models.download import VIDEO_ID_PATTERN, AudioQuality, DownloadJobData, DownloadJobRequest
+from app.models.response import ApiResponse
+from app.services.audio_cache import audio_cache
+from app.utils.json_response import api_response
+from app.services.download_jobs import (
+    download_jobs, iter_progressive, open_progressive, DownloadJob, QueueFullError, DONE
+)
 
 router = APIRouter(prefix="/api/v1", tags=["download"])
 
+MEDIA_TYPES = {".m4a": "audio/mp4", ".webm": "audio/webm", ".opus": "audio/ogg"}
+
+
+def _job_data(job: DownloadJob) -> DownloadJobData:
+    """Build the API representation of a job."""
+    return DownloadJobData(
+        job_id=job.job_id,
+        video_id=job.video_id,
+        quality=job.quality,
+        priority=job.priority,
+        codec=job.codec,
+        status=job.status,
+        progress=job.progress,
+        downloaded_bytes=job.downloaded_bytes,
+        total_bytes=job.total_bytes,
+        speed=job.speed,
+        eta_seconds=job.eta_seconds,
+        error=job.error,
+        delivery=job.delivery,
+        file_url=f"/api/v1/download/jobs/{job.job_id}/file" if job.status == DONE else None
+    )
+
+
+def _file_response(job: DownloadJob) -> Response:
+    """Serve a finished job's file, via nginx X-Accel-Redirect when configured."""
+    if not job.file_path or not os.path.exists(job.file_path):
+        raise HTTPException(status_code=410, detail="Downloaded file is no longer available")
+    ext = os.path.splitext(job.file_path)[1]
+    media_type = MEDIA_TYPES.get(ext, "application/octet-stream")
+    filename = f"{job.video_id}{ext}"
+    prefix = settings.audio_cache_accel_redirect
+    if prefix and audio_cache.contains(job.file_path):
+        # nginx serves the file itself (sendfile), freeing this worker at once
+        return Response(
+            media_type=media_type,
+            headers={
+                "X-Accel-Redirect": prefix.rstrip("/") + "/" + audio_cache.relative_path(job.file_path),
+                "Content-Disposition": f'attachment; filename="{filename}"'
+            }
+        )
+    return FileResponse(
+        path=job.file_path,
+        filename=filename,
+        media_type=media_type
+    )
+
+
+async def _progressive_response(job: DownloadJob, timeout: float) -> Optional[Response]:
+    """
+    Stream a running job's file as it downloads.
+
+    Args:
+        timeout: Seconds to wait for the download to become readable
+
+    Returns:
+        StreamingResponse, or None when the job cannot be read progressively
+    """
+    handle = await open_progressive(job, timeout)
+    if handle is None:
+        return None
+    ext = job.partial_ext or ".m4a"
+    headers = {"Content-Disposition": f'attachment; filename="{job.video_id}{ext}"'}
+    if job.source_bytes:
+        headers["Content-Length"] = str(job.source_bytes)
+    return StreamingResponse(
+        iter_progressive(job, handle),
+        media_type=MEDIA_TYPES.get(ext, "application/octet-stream"),
+        headers=headers
+    )
+
 
-def cleanup_file(path: str):
-    """Remove temporary file after download."""
+@router.post("/download/jobs", response_model=ApiResponse, status_code=202)
+async def create_download_jobs(request: DownloadJobRequest):
+    """
+    Enqueue downloads.
+    
+    - **video_ids**: YouTube video IDs (11 characters of A-Z, a-z, 0-9, "_" or "-")
+    - **quality**: Audio quality (best, 128k, 256k)
+    - **priority**: "high", "normal" or "low" (e.g. bulk offline sync)
+    - **codec**: "m4a" (AAC) or "opus"; a source already in that codec is
+      delivered without re-encoding
+    
+    Videos that already have a pending or finished job reuse it.
+    """
+    jobs: List[DownloadJob] = []
     try:
-        if os.path.exists(path):
-            os.remove(path)
-    except Exception as e:
-        print(f"Error cleaning up {path}: {e}")
+        for video_id in dict.fromkeys(request.video_ids):
+            jobs.append(download_jobs.submit(video_id, request.quality, request.priority, request.codec))
+    except QueueFullError as e:
+        raise HTTPException(status_code=429, detail={"code": "QUEUE_FULL", "message": str(e)})
+    
+    return api_response({"jobs": [_job_data(job) for job in jobs]}, status_code=202)
+
+
+@router.get("/download/jobs/{job_id}", response_model=ApiResponse[DownloadJobData])
+async def get_download_job(job_id: str):
+    """Get the status and progress of a download job."""
+    job = download_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return api_response(_job_data(job))
+
+
+@router.get("/download/jobs/{job_id}/file")
+async def get_download_job_file(job_id: str, progressive: bool = False):
+    """
+    Fetch the file of a finished download job.
+    
+    With progressive=true a running job that needs no transcode is streamed
+    while it downloads.
+    """
+    job = download_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if progressive and job.status != DONE:
+        response = await _progressive_response(job, settings.executor_download_timeout)
+        if response is not None:
+            return response
+    if job.status != DONE:
+        raise HTTPException(
+            status_code=409,
+            detail={"code": "JOB_NOT_DONE", "message": f"Job is {job.status}"}
+        )
+    return _file_response(job)
 
 
 @router.get("/download/{video_id}")
 async def download_audio(
-    video_id: str, 
-    quality: str = "best",
-    background_tasks: BackgroundTasks = None
+    video_id: str = Path(..., pattern=VIDEO_ID_PATTERN, description="YouTube video ID (11 characters)"),
+    quality: AudioQuality = "best",
+    progressive: bool = False
 ):
     """
     Download audio for a song.
     
+    Kept for older clients: enqueues a high-priority job and waits for it
+    without blocking a thread. New clients should use /download/jobs.
+    
     Args:
         video_id: YouTube video ID
         quality: Audio quality (best, 128k, 256k)
+        progressive: Start sending bytes as they arrive from upstream when
+            the download needs no transcode
         
     Returns:
         File stream
     """
-    if len(video_id) != 11:
-        raise HTTPException(status_code=400, detail="Invalid video ID format")
+    try:
+        job = download_jobs.submit(video_id, quality, "high")
+    except QueueFullError as e:
+        raise HTTPException(status_code=429, detail={"code": "QUEUE_FULL", "message": str(e)})
     
-    file_path = yt_music_service.download_audio(video_id, quality)
+    # One timeout for the whole request, however it is split between the waits
+    deadline = time.monotonic() + settings.executor_download_timeout
+    if progressive and not job.finished:
+        response = await _progressive_response(job, settings.executor_download_timeout)
+        if response is not None:
+            return response
     
-    if not file_path or not os.path.exists(file_path):
+    try:
+        # Shielded: timing out here must not cancel the shared job
+        await asyncio.wait_for(
+            asyncio.shield(asyncio.wrap_future(job.future)),
+            timeout=max(0.0, deadline - time.monotonic())
+        )
+    except asyncio.TimeoutError:
+        raise HTTPException(
+            status_code=504,
+            detail={"code": "UPSTREAM_TIMEOUT", "message": "Download is still running", "job_id": job.job_id}
+        )
+    except Exception:
         raise HTTPException(status_code=500, detail="Download failed")
     
-    # Schedule cleanup after response is sent
-    # Note: FileResponse opens the file. BackgroundTasks run after response.
-    if background_tasks:
-        background_tasks.add_task(cleanup_file, file_path)
-    
-    return FileResponse(
-        path=file_path, 
-        filename=f"{video_id}.m4a",
-        media_type="audio/mp4"
-    )
+    return _file_response(job)
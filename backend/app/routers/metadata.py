@@ -1,22 +1,73 @@
 """
 Metadata router for song information and lyrics.
 """
-from fastapi import APIRouter, HTTPException
+import asyncio
+from typing import Literal, Optional
 
+from fastapi import APIRouter, HTTPException, Query
+
+from app.models.lyrics import LyricsData, LyricsResponse
 from app.models.response import ApiResponse
 from app.models.song import MetadataResponse
 from app.services.youtube_music import yt_music_service
+from app.services.executor import blocking_executor, ExecutorTimeoutError
+from app.services.rate_governor import lane
+from app.services.stream_prefetch import stream_prefetcher
+from app.utils.json_response import api_response
+from app.utils.timing import detached
 
 router = APIRouter(prefix="/api/v1", tags=["metadata"])
 
 
+async def _resolve_lyrics(video_id: str, song_task: "asyncio.Task") -> Optional[LyricsData]:
+    """
+    Lyrics pipeline run alongside the song lookup.
+    
+    A cached result is returned without waiting for the song; otherwise the
+    song's title/artist/duration feed LRCLIB directly.
+    """
+    cached = await blocking_executor.run("browse", yt_music_service.get_cached_lyrics, video_id)
+    if cached is not None:
+        return cached[0]
+    try:
+        metadata = await song_task
+    except Exception:
+        # Reported by the metadata path
+        return None
+    if not metadata:
+        return None
+    return await blocking_executor.run(
+        "browse", yt_music_service.get_lyrics, video_id, yt_music_service.lyrics_hints(metadata)
+    )
+
+
+def _prefetch_lyrics(video_id: str, metadata: dict):
+    """Warm the lyrics cache in the background for a later /lyrics call."""
+    try:
+        with detached(), lane("background"):
+            blocking_executor.submit(
+                "browse", yt_music_service.get_lyrics, video_id, yt_music_service.lyrics_hints(metadata)
+            )
+    except RuntimeError:
+        # Executor is shutting down
+        pass
+
+
 @router.get("/metadata/{video_id}", response_model=ApiResponse)
-async def get_metadata(video_id: str):
+async def get_metadata(
+    video_id: str,
+    include_lyrics: Literal["true", "false", "async"] = Query(
+        "true", description="Include lyrics, skip them, or fetch them in the background"
+    )
+):
     """
     Get metadata for a song including lyrics if available.
     
     Args:
         video_id: YouTube video ID (11 characters)
+        include_lyrics: "true" resolves lyrics together with the metadata,
+            "false" skips them, "async" returns the metadata immediately and
+            warms the lyrics cache for GET /api/v1/lyrics/{video_id}
     
     Returns:
         MetadataResponse with song info and lyrics
@@ -24,14 +75,35 @@ async def get_metadata(video_id: str):
     if len(video_id) != 11:
         raise HTTPException(status_code=400, detail="Invalid video ID format")
     
-    # Get basic metadata
-    metadata = yt_music_service.get_song_metadata(video_id)
-    
-    if not metadata:
-        raise HTTPException(status_code=404, detail="Song not found")
+    # Song lookup and lyrics pipeline run concurrently
+    song_task = asyncio.ensure_future(
+        blocking_executor.run("browse", yt_music_service.get_song_metadata, video_id)
+    )
+    lyrics_task = None
+    if include_lyrics == "true":
+        lyrics_task = asyncio.ensure_future(_resolve_lyrics(video_id, song_task))
     
-    # Get lyrics (now returns structured LyricsData)
-    lyrics = yt_music_service.get_lyrics(video_id)
+    try:
+        metadata = await song_task
+        if not metadata:
+            raise HTTPException(status_code=404, detail="Song not found")
+        
+        lyrics = None
+        if lyrics_task is not None:
+            try:
+                lyrics = await lyrics_task
+                lyrics_status = "included"
+            except ExecutorTimeoutError:
+                # Never fail the metadata because lyrics are slow
+                lyrics_status = "timeout"
+        elif include_lyrics == "async":
+            _prefetch_lyrics(video_id, metadata)
+            lyrics_status = "pending"
+        else:
+            lyrics_status = "skipped"
+    finally:
+        if lyrics_task is not None and not lyrics_task.done():
+            lyrics_task.cancel()
     
     # Extract info from metadata
     video_details = metadata.get("videoDetails", {})
@@ -43,10 +115,37 @@ async def get_metadata(video_id: str):
         album=None,  # Not always available in get_song response
         duration_seconds=int(video_details.get("lengthSeconds", 0)),
         has_lyrics=lyrics is not None,
-        lyrics=lyrics.model_dump() if lyrics else None
+        lyrics=lyrics,
+        lyrics_status=lyrics_status
     )
     
-    return ApiResponse(success=True, data=response_data.model_dump())
+    return api_response(response_data)
+
+
+@router.get("/lyrics/{video_id}", response_model=ApiResponse)
+async def get_lyrics(video_id: str):
+    """
+    Get lyrics for a song.
+    
+    Served from the lyrics cache when /metadata was called with
+    include_lyrics=async; otherwise looked up upstream.
+    
+    Args:
+        video_id: YouTube video ID (11 characters)
+    
+    Returns:
+        LyricsResponse
+    """
+    if len(video_id) != 11:
+        raise HTTPException(status_code=400, detail="Invalid video ID format")
+    
+    lyrics = await blocking_executor.run("browse", yt_music_service.get_lyrics, video_id)
+    
+    return api_response(LyricsResponse(
+        video_id=video_id,
+        has_lyrics=lyrics is not None,
+        lyrics=lyrics
+    ))
 
 
 @router.get("/related/{video_id}", response_model=ApiResponse)
@@ -64,11 +163,10 @@ async def get_related(video_id: str, limit: int = 20):
     if len(video_id) != 11:
         raise HTTPException(status_code=400, detail="Invalid video ID format")
     
-    songs = yt_music_service.get_related_songs(video_id, limit)
-    
-    return ApiResponse(
-        success=True,
-        data={
-            "songs": [song.model_dump() for song in songs]
-        }
+    songs = await blocking_executor.run(
+        "browse", yt_music_service.get_related_songs, video_id, limit
     )
+    # The upcoming queue: warm stream URLs for the next tracks
+    stream_prefetcher.schedule(song.video_id for song in songs)
+    
+    return api_response({"songs": songs})
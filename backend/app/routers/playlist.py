@@ -5,6 +5,9 @@ from fastapi import APIRouter, HTTPException
 
 from app.models.response import ApiResponse
 from app.services.youtube_music import yt_music_service
+from app.services.executor import blocking_executor
+from app.utils.json_response import api_response
+from app.services.stream_prefetch import stream_prefetcher
 
 
 router = APIRouter()
@@ -22,23 +25,20 @@ async def get_playlist(playlist_id: str):
     if not playlist_id:
         raise HTTPException(status_code=400, detail="Playlist ID required")
     
-    playlist_data = yt_music_service.get_playlist(playlist_id)
+    playlist_data = await blocking_executor.run("browse", yt_music_service.get_playlist, playlist_id)
     
     if not playlist_data:
         raise HTTPException(status_code=404, detail="Playlist not found")
     
-    # Convert Song objects to dicts
-    songs_data = [song.model_dump() for song in playlist_data["songs"]]
+    # Warm stream URLs for the tracks the user is likely to play first
+    stream_prefetcher.schedule(song.video_id for song in playlist_data["songs"])
     
-    return ApiResponse(
-        success=True,
-        data={
-            "playlist_id": playlist_data["playlist_id"],
-            "title": playlist_data["title"],
-            "description": playlist_data["description"],
-            "thumbnail_url": playlist_data["thumbnail_url"],
-            "author": playlist_data["author"],
-            "song_count": playlist_data["song_count"],
-            "songs": songs_data
-        }
-    )
+    return api_response({
+        "playlist_id": playlist_data["playlist_id"],
+        "title": playlist_data["title"],
+        "description": playlist_data["description"],
+        "thumbnail_url": playlist_data["thumbnail_url"],
+        "author": playlist_data["author"],
+        "song_count": playlist_data["song_count"],
+        "songs": playlist_data["songs"]
+    })
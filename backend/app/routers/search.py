@@ -1,12 +1,16 @@
 """
 Search router - handles song and playlist search endpoints.
 """
+import asyncio
 from fastapi import APIRouter, Query, HTTPException
 from typing import Literal
 
+from app.config import settings
 from app.models.response import ApiResponse
 from app.models.song import SearchResponse, SearchMeta, UnifiedSearchResponse
 from app.services.youtube_music import yt_music_service
+from app.services.executor import blocking_executor, ExecutorTimeoutError
+from app.utils.json_response import api_response
 
 
 router = APIRouter()
@@ -26,40 +30,58 @@ async def search(
     - **type**: Result type - "all", "songs", "playlists", "albums", or "artists" (default: all)
     
     Returns list of songs, playlists, albums, and/or artists based on type parameter.
+    With type "all", sections that time out or fail are returned empty and
+    flagged in meta.sections instead of failing the whole search.
     """
     try:
-        songs = []
-        playlists = []
-        albums = []
-        artists = []
-        
+        # (section, search function, limit) for every requested result type
+        branches = []
         if type in ["all", "songs"]:
-            songs = yt_music_service.search_songs(q, limit)
-        
+            branches.append(("songs", yt_music_service.search_songs, limit))
         if type in ["all", "playlists"]:
-            playlist_limit = 5 if type == "all" else limit
-            playlists = yt_music_service.search_playlists(q, playlist_limit)
-        
+            branches.append(("playlists", yt_music_service.search_playlists, 5 if type == "all" else limit))
         if type in ["all", "albums"]:
-            album_limit = 5 if type == "all" else limit
-            albums = yt_music_service.search_albums(q, album_limit)
-        
+            branches.append(("albums", yt_music_service.search_albums, 5 if type == "all" else limit))
         if type in ["all", "artists"]:
-            artist_limit = 2 if type == "all" else limit
-            artists = yt_music_service.search_artists(q, artist_limit)
+            branches.append(("artists", yt_music_service.search_artists, 2 if type == "all" else limit))
         
-        total_count = len(songs) + len(playlists) + len(albums) + len(artists)
+        # Run all branches concurrently; with type=all each one gets its own
+        # deadline so a slow branch cannot hold back the others
+        deadline = settings.search_section_timeout if type == "all" else None
+        outcomes = await asyncio.gather(*[
+            blocking_executor.run("search", fn, q, section_limit, timeout=deadline)
+            for _, fn, section_limit in branches
+        ], return_exceptions=True)
         
-        return ApiResponse(
-            success=True,
-            data=UnifiedSearchResponse(
-                songs=songs,
-                playlists=playlists,
-                albums=albums,
-                artists=artists,
-                meta=SearchMeta(query=q, count=total_count)
-            )
-        )
+        results = {"songs": [], "playlists": [], "albums": [], "artists": []}
+        statuses = {}
+        errors = []
+        for (section, _, _), outcome in zip(branches, outcomes):
+            if isinstance(outcome, ExecutorTimeoutError):
+                statuses[section] = "timeout"
+                errors.append(outcome)
+            elif isinstance(outcome, Exception):
+                statuses[section] = "error"
+                errors.append(outcome)
+            else:
+                statuses[section] = "ok"
+                results[section] = outcome
+        
+        # Only fail the request when no section produced results
+        if len(errors) == len(branches):
+            raise errors[0]
+        
+        total_count = sum(len(items) for items in results.values())
+        
+        return api_response(UnifiedSearchResponse(
+            songs=results["songs"],
+            playlists=results["playlists"],
+            albums=results["albums"],
+            artists=results["artists"],
+            meta=SearchMeta(query=q, count=total_count, sections=statuses)
+        ))
+    except ExecutorTimeoutError:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -78,12 +100,17 @@ async def get_suggestions(
     
     Returns list of suggestion strings.
     """
+    # Indexed prefixes are answered without a trip through the worker pool
+    suggestions = yt_music_service.cached_search_suggestions(q)
+    if suggestions is not None:
+        return api_response(suggestions)
     try:
-        suggestions = yt_music_service.get_search_suggestions(q)
-        return ApiResponse(
-            success=True,
-            data=suggestions
+        suggestions = await blocking_executor.run(
+            "search", yt_music_service.fetch_search_suggestions, q
         )
+        return api_response(suggestions)
+    except ExecutorTimeoutError:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -1,16 +1,35 @@
 """
 Stream router - handles audio stream URL extraction endpoints.
 """
-from fastapi import APIRouter, HTTPException, Path
+import asyncio
+from typing import AsyncIterator, List, Optional
 
-from app.models.response import ApiResponse
-from app.models.song import StreamData
-from app.services.stream_extractor import stream_extractor_service
+from fastapi import APIRouter, Header, HTTPException, Path
+from fastapi.responses import Response, StreamingResponse
+
+from app.config import settings
+from app.models.response import ApiResponse, ErrorDetail
+from app.models.song import StreamData, StreamBatchRequest, StreamBatchItem
+from app.services.stream_extractor import stream_extractor_service, StreamInfo
+from app.services.executor import blocking_executor, ExecutorTimeoutError
+from app.services.audio_relay import audio_relay, RangeNotSatisfiable
+from app.utils.json_response import api_response
 
 
 router = APIRouter()
 
 
+def _stream_data(video_id: str, stream_info: StreamInfo) -> StreamData:
+    """Build the API representation of an extracted stream."""
+    return StreamData(
+        video_id=video_id,
+        stream_url=stream_info.url,
+        format=stream_info.format,
+        quality=stream_info.quality,
+        expires_in_seconds=stream_info.expires_in_seconds
+    )
+
+
 @router.get("/stream/{video_id}", response_model=ApiResponse[StreamData])
 async def get_stream(
     video_id: str = Path(
@@ -30,20 +49,135 @@ async def get_stream(
     Note: Stream URLs expire after ~6 hours.
     """
     try:
-        stream_info = stream_extractor_service.get_stream_url(video_id)
-        
-        return ApiResponse(
-            success=True,
-            data=StreamData(
-                video_id=video_id,
-                stream_url=stream_info.url,
-                format=stream_info.format,
-                quality=stream_info.quality,
-                expires_in_seconds=stream_info.expires_in_seconds
-            )
+        stream_info = await blocking_executor.run(
+            "extraction", stream_extractor_service.get_stream_url, video_id
         )
+        
+        return api_response(_stream_data(video_id, stream_info))
+    except ExecutorTimeoutError:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail={"code": "STREAM_FAILED", "message": str(e)}
         )
+
+
+@router.get("/stream/{video_id}/audio")
+async def get_stream_audio(
+    video_id: str = Path(
+        ...,
+        min_length=11,
+        max_length=11,
+        description="YouTube video ID (11 characters)"
+    ),
+    range: Optional[str] = Header(None),
+    if_range: Optional[str] = Header(None)
+):
+    """
+    Relay the audio bytes of a video through this server.
+    
+    - **video_id**: YouTube video ID (exactly 11 characters)
+    
+    Honors Range / If-Range (206 Partial Content) for seeking. Use this when
+    the client cannot play the googlevideo URL from /stream/{video_id}
+    directly; the URL is re-resolved transparently if it expires mid-stream.
+    """
+    try:
+        relay = await audio_relay.open(video_id, range, if_range)
+    except RangeNotSatisfiable as e:
+        return Response(status_code=416, headers={"Content-Range": f"bytes */{e.total}"})
+    except ExecutorTimeoutError:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=502,
+            detail={"code": "RELAY_FAILED", "message": str(e)}
+        )
+    
+    return StreamingResponse(
+        relay.body,
+        status_code=relay.status_code,
+        headers=relay.headers,
+        media_type=relay.media_type
+    )
+
+
+@router.post("/stream/batch")
+async def get_stream_batch(request: StreamBatchRequest):
+    """
+    Resolve stream URLs for several videos in one call (queue prefetch).
+    
+    - **video_ids**: YouTube video IDs (11 characters each, max STREAM_BATCH_MAX_IDS)
+    
+    Streams NDJSON: one StreamBatchItem per line. Cached streams are sent
+    immediately, the rest as each extraction finishes (not in request order).
+    A failed video yields an item with success=false instead of failing the batch.
+    """
+    # Deduplicate while keeping the client's order
+    video_ids: List[str] = list(dict.fromkeys(request.video_ids))
+    
+    if len(video_ids) > settings.stream_batch_max_ids:
+        raise HTTPException(
+            status_code=400,
+            detail={
+                "code": "BATCH_TOO_LARGE",
+                "message": f"At most {settings.stream_batch_max_ids} video IDs per batch"
+            }
+        )
+    invalid = [video_id for video_id in video_ids if len(video_id) != 11]
+    if invalid:
+        raise HTTPException(
+            status_code=400,
+            detail={"code": "INVALID_VIDEO_ID", "message": f"Invalid video IDs: {', '.join(invalid)}"}
+        )
+    
+    return StreamingResponse(_resolve_batch(video_ids), media_type="application/x-ndjson")
+
+
+def _batch_concurrency() -> int:
+    """
+    Parallel extractions for one batch: always leaves at least one
+    extraction worker free for interactive /stream/{video_id} requests.
+    """
+    workers = blocking_executor.pool("extraction").max_workers
+    return max(1, min(settings.stream_batch_concurrency, workers - 1))
+
+
+async def _resolve_batch(video_ids: List[str]) -> AsyncIterator[str]:
+    """Yield one NDJSON line per video: cache hits first, then as extractions finish."""
+    pending = []
+    for video_id in video_ids:
+        cached = stream_extractor_service.get_cached_stream(video_id)
+        if cached:
+            item = StreamBatchItem(video_id=video_id, success=True, data=_stream_data(video_id, cached))
+            yield item.model_dump_json() + "\n"
+        else:
+            pending.append(video_id)
+    
+    semaphore = asyncio.Semaphore(_batch_concurrency())
+    
+    async def resolve(video_id: str) -> StreamBatchItem:
+        async with semaphore:
+            try:
+                stream_info = await blocking_executor.run(
+                    "extraction", stream_extractor_service.get_stream_url, video_id
+                )
+                return StreamBatchItem(
+                    video_id=video_id, success=True, data=_stream_data(video_id, stream_info)
+                )
+            except ExecutorTimeoutError as e:
+                error = ErrorDetail(code="UPSTREAM_TIMEOUT", message=str(e))
+            except Exception as e:
+                error = ErrorDetail(code="STREAM_FAILED", message=str(e))
+            return StreamBatchItem(video_id=video_id, success=False, error=error)
+    
+    tasks = [asyncio.ensure_future(resolve(video_id)) for video_id in pending]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            item = await next_done
+            yield item.model_dump_json() + "\n"
+    finally:
+        # Client went away: stop queued extractions
+        for task in tasks:
+            task.cancel()
@@ -1,4 +1,10 @@
 # Services package
 from .youtube_music import yt_music_service
 from .stream_extractor import stream_extractor_service
-
+from .executor import blocking_executor
+from .persistent_cache import persistent_cache
+from .response_cache import response_cache
+from .http_client import http_client
+from .audio_relay import audio_relay
+from .download_jobs import download_jobs
+from .audio_cache import audio_cache
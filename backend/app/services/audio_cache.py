@@ -0,0 +1,262 @@
+"""
+On-disk cache of downloaded / transcoded audio files.
+Files are addressed by video ID and variant (quality and codec), so a
+track transcoded once is served to every device that downloads it again.
+The cache directory is shared by all workers: files are published with an
+atomic rename (readers never see partial files), recency is the file
+mtime, and the least recently used files are evicted once the total size
+exceeds the cap.
+"""
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator, List, Optional, Tuple
+
+from app.config import settings
+
+
+# File types the cache stores (m4a for AAC, webm / opus for Opus)
+AUDIO_EXTENSIONS = (".m4a", ".webm", ".opus")
+
+_VIDEO_ID = re.compile(r"[A-Za-z0-9_-]{11}")
+_VARIANT = re.compile(r"[A-Za-z0-9_-]{1,32}")
+_EXTENSION = re.compile(r"\.[A-Za-z0-9]{1,8}")
+
+
+class AudioFileCache:
+    """Size-bounded LRU cache of audio files in a local directory."""
+
+    STAGING_DIR = ".staging"
+    # Staging directories older than this are leftovers of a crashed download
+    STAGING_MAX_AGE_SECONDS = 24 * 60 * 60
+    # Only rewrite a file's mtime when it is older than this
+    TOUCH_INTERVAL_SECONDS = 60
+    # Evict down to this fraction of max_bytes
+    EVICT_TARGET_RATIO = 0.9
+    # Rescan the directory at least this often to count other workers' files
+    RESCAN_INTERVAL_SECONDS = 5 * 60
+
+    def __init__(self, directory: str, max_bytes: int, enabled: bool = True):
+        """
+        Args:
+            directory: Cache directory (shared by all workers)
+            max_bytes: Cap on the total size of cached files
+            enabled: When False every lookup misses and nothing is stored
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._stores = 0
+        self._evictions = 0
+        # Totals as of the last directory scan (see evict), plus files stored since
+        self._files = 0
+        self._bytes = 0
+        self._scanned_at: Optional[float] = None
+
+    @classmethod
+    def from_settings(cls) -> "AudioFileCache":
+        """Build the cache from application settings."""
+        return cls(
+            directory=settings.audio_cache_dir,
+            max_bytes=settings.audio_cache_max_bytes,
+            enabled=settings.audio_cache_enabled
+        )
+
+    def path_for(self, video_id: str, variant: str, ext: str = ".m4a") -> str:
+        """
+        Cache path of a video/variant (sharded by the first ID characters).
+
+        Raises:
+            ValueError: If the ID, variant or extension is malformed, or the
+                path would resolve outside the cache directory
+        """
+        if not (_VIDEO_ID.fullmatch(video_id) and _VARIANT.fullmatch(variant) and _EXTENSION.fullmatch(ext)):
+            raise ValueError(f"Invalid audio cache key: {video_id!r} / {variant!r} / {ext!r}")
+        path = os.path.join(self.directory, video_id[:2], f"{video_id}.{variant}{ext}")
+        directory = os.path.realpath(self.directory)
+        if os.path.commonpath([directory, os.path.realpath(path)]) != directory:
+            raise ValueError(f"Audio cache path escapes {self.directory}: {path}")
+        return path
+
+    def relative_path(self, path: str) -> str:
+        """Path relative to the cache directory, using forward slashes."""
+        return os.path.relpath(path, self.directory).replace(os.sep, "/")
+
+    def contains(self, path: str) -> bool:
+        """Whether a path lies inside the cache directory."""
+        directory = os.path.abspath(self.directory)
+        return os.path.commonpath([directory, os.path.abspath(path)]) == directory
+
+    def get(self, video_id: str, variant: str) -> Optional[str]:
+        """
+        Get the cached file path, marking it recently used.
+
+        Returns:
+            Path or None on a miss
+        """
+        if not self.enabled:
+            return None
+        for ext in AUDIO_EXTENSIONS:
+            path = self.path_for(video_id, variant, ext)
+            try:
+                mtime = os.stat(path).st_mtime
+                break
+            except FileNotFoundError:
+                continue
+        else:
+            self._count("_misses")
+            return None
+        now = time.time()
+        if now - mtime > self.TOUCH_INTERVAL_SECONDS:
+            try:
+                os.utime(path, (now, now))
+            except OSError:
+                pass
+        self._count("_hits")
+        return path
+
+    @contextmanager
+    def staging(self) -> Iterator[str]:
+        """
+        Private directory for one download on the cache's filesystem, so
+        put() can publish with a rename. Removed on exit.
+        """
+        root = os.path.join(self.directory, self.STAGING_DIR)
+        os.makedirs(root, exist_ok=True)
+        path = tempfile.mkdtemp(dir=root)
+        try:
+            yield path
+        finally:
+            shutil.rmtree(path, ignore_errors=True)
+
+    def put(self, video_id: str, variant: str, source: str) -> str:
+        """
+        Move a finished file into the cache, keeping its extension.
+
+        The file is first moved next to its final name and then renamed over
+        it, so readers see either no file or the complete file.
+
+        The size is added to a running total; the directory is only walked
+        when that goes over the cap, on first use, or every
+        RESCAN_INTERVAL_SECONDS (to pick up files other workers stored).
+
+        Returns:
+            Cached file path
+        """
+        path = self.path_for(video_id, variant, os.path.splitext(source)[1])
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        size = os.stat(source).st_size
+        try:
+            replaced = os.stat(path).st_size
+        except FileNotFoundError:
+            replaced = None
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        shutil.move(source, temp_path)
+        os.replace(temp_path, path)
+        with self._lock:
+            self._stores += 1
+            if replaced is None:
+                self._files += 1
+            self._bytes += size - (replaced or 0)
+            scan = (
+                self._scanned_at is None
+                or self._bytes > self.max_bytes
+                or time.monotonic() - self._scanned_at >= self.RESCAN_INTERVAL_SECONDS
+            )
+        if scan:
+            self.evict()
+        return path
+
+    def _scan(self) -> Tuple[List[Tuple[float, int, str]], int]:
+        """(mtime, size, path) of every cached file, and their total size."""
+        entries = []
+        total = 0
+        for root, dirs, files in os.walk(self.directory):
+            if root == self.directory and self.STAGING_DIR in dirs:
+                dirs.remove(self.STAGING_DIR)
+            for name in files:
+                if not name.endswith(AUDIO_EXTENSIONS):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+        return entries, total
+
+    def evict(self) -> int:
+        """
+        Delete least recently used files until the total size is under the cap,
+        and clear out stale staging directories.
+
+        Returns:
+            Number of files removed
+        """
+        if not self.enabled or not os.path.isdir(self.directory):
+            return 0
+        with self._lock:
+            entries, total = self._scan()
+            removed = 0
+            if total > self.max_bytes:
+                target = int(self.max_bytes * self.EVICT_TARGET_RATIO)
+                for _, size, path in sorted(entries):
+                    if total <= target:
+                        break
+                    try:
+                        os.remove(path)
+                    except FileNotFoundError:
+                        pass
+                    total -= size
+                    removed += 1
+            self._evictions += removed
+            self._files = len(entries) - removed
+            self._bytes = total
+            self._scanned_at = time.monotonic()
+        self._remove_stale_staging()
+        return removed
+
+    def _remove_stale_staging(self):
+        root = os.path.join(self.directory, self.STAGING_DIR)
+        cutoff = time.time() - self.STAGING_MAX_AGE_SECONDS
+        try:
+            names = os.listdir(root)
+        except FileNotFoundError:
+            return
+        for name in names:
+            path = os.path.join(root, name)
+            try:
+                if os.stat(path).st_mtime < cutoff:
+                    shutil.rmtree(path, ignore_errors=True)
+            except FileNotFoundError:
+                pass
+
+    def _count(self, counter: str):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def stats(self) -> dict:
+        """Size (last scan plus files stored since) and hit/miss/store/eviction counters."""
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "files": self._files,
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+                "stores": self._stores,
+                "evictions": self._evictions,
+            }
+
+
+# Singleton cache instance
+audio_cache = AudioFileCache.from_settings()
@@ -0,0 +1,400 @@
+"""
+Audio relay: serves stream bytes through this server instead of handing
+clients a googlevideo URL bound to the server's IP.
+
+Bytes are copied chunk by chunk (never buffered whole), honoring HTTP
+Range / If-Range so seeking stays instant. Upstream is read in bounded
+range requests; when a URL expires or is rejected mid-stream the video is
+re-resolved and the relay continues from the current byte offset, provided
+the new URL serves the same format and size.
+"""
+import asyncio
+import threading
+import time
+from dataclasses import dataclass
+from email.utils import formatdate
+from typing import AsyncIterator, Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+import httpx
+
+from app.config import settings
+from app.services.executor import blocking_executor
+from app.services.stream_extractor import StreamExtractorService, StreamInfo, stream_extractor_service
+
+
+# Upstream statuses that mean the URL expired or was revoked: re-resolve
+RESOLVE_STATUSES = {403, 404, 410}
+
+# Re-resolve before opening a range on a URL this close to its expiry
+URL_EXPIRY_MARGIN_SECONDS = 60
+
+MEDIA_TYPES = {"m4a": "audio/mp4", "mp4": "audio/mp4", "webm": "audio/webm", "opus": "audio/ogg"}
+
+
+class RangeNotSatisfiable(Exception):
+    """Requested range starts beyond the end of the stream."""
+
+    def __init__(self, total: int):
+        super().__init__(f"Range not satisfiable (size {total})")
+        self.total = total
+
+
+class UpstreamError(Exception):
+    """Upstream failed in a way re-resolving cannot fix."""
+
+
+def parse_range_header(header: Optional[str]) -> Optional[Tuple[Optional[int], Optional[int]]]:
+    """
+    Parse a single-range "bytes=" header.
+
+    Returns:
+        (start, end) with end inclusive and either side possibly None
+        ((None, n) is a suffix range of the last n bytes), or None when the
+        header is absent, malformed or asks for several ranges - in which
+        case the full content is served
+    """
+    if not header:
+        return None
+    unit, _, spec = header.strip().partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, sep, last = spec.strip().partition("-")
+    if not sep:
+        return None
+    try:
+        start = int(first) if first.strip() else None
+        end = int(last) if last.strip() else None
+    except ValueError:
+        return None
+    if start is None and not end:
+        return None
+    if start is not None and end is not None and end < start:
+        return None
+    return start, end
+
+
+def _url_param(url: str, name: str) -> Optional[str]:
+    values = parse_qs(urlparse(url).query).get(name)
+    return values[0] if values else None
+
+
+def stream_validators(video_id: str, stream_info: StreamInfo) -> Dict[str, str]:
+    """
+    ETag / Last-Modified for a stream, stable across re-resolved URLs.
+
+    googlevideo URLs carry the format (itag) and its last-modified time in
+    microseconds (lmt); both are unchanged when the same video is
+    extracted again.
+    """
+    validators = {}
+    itag = _url_param(stream_info.url, "itag")
+    lmt = _url_param(stream_info.url, "lmt")
+    if itag and lmt:
+        validators["ETag"] = f'"{video_id}-{itag}-{lmt}"'
+        try:
+            validators["Last-Modified"] = formatdate(int(lmt) / 1_000_000, usegmt=True)
+        except ValueError:
+            pass
+    return validators
+
+
+def same_source(first: StreamInfo, second: StreamInfo) -> bool:
+    """Whether two resolved URLs serve the same file (format and size)."""
+    return all(
+        _url_param(first.url, name) == _url_param(second.url, name) for name in ("itag", "clen")
+    )
+
+
+@dataclass
+class RelayResponse:
+    """Status, headers and body iterator for one relayed request."""
+    status_code: int
+    headers: Dict[str, str]
+    media_type: str
+    body: AsyncIterator[bytes]
+
+
+class AudioRelay:
+    """Relays audio bytes from googlevideo to clients with Range support."""
+
+    def __init__(
+        self,
+        extractor: StreamExtractorService,
+        client: Optional[httpx.AsyncClient] = None,
+        upstream_chunk_bytes: Optional[int] = None,
+        read_chunk_bytes: Optional[int] = None,
+        max_re_resolves: Optional[int] = None
+    ):
+        """
+        Args:
+            extractor: Resolves (and invalidates) stream URLs
+            client: Async HTTP client for googlevideo (default: built from settings)
+            upstream_chunk_bytes: Size of each upstream range request
+            read_chunk_bytes: Size of the chunks handed to the client
+            max_re_resolves: URL re-resolutions allowed per relayed request
+        """
+        self._extractor = extractor
+        self._client = client or httpx.AsyncClient(
+            timeout=httpx.Timeout(settings.relay_read_timeout, connect=settings.relay_connect_timeout),
+            limits=httpx.Limits(max_connections=settings.relay_max_connections),
+            follow_redirects=True
+        )
+        self.upstream_chunk_bytes = upstream_chunk_bytes or settings.relay_upstream_chunk_bytes
+        self.read_chunk_bytes = read_chunk_bytes or settings.relay_read_chunk_bytes
+        self.max_re_resolves = settings.relay_max_re_resolves if max_re_resolves is None else max_re_resolves
+        self._lock = threading.Lock()
+        self._active = 0
+        self._bytes_in_flight = 0
+        self._bytes_relayed = 0
+        self._relay_seconds = 0.0
+        self._relays = 0
+        self._failed = 0
+        self._re_resolves = 0
+
+    async def _resolve(self, video_id: str, refresh: bool = False) -> StreamInfo:
+        if refresh:
+            with self._lock:
+                self._re_resolves += 1
+            return await blocking_executor.run("extraction", self._re_extract, video_id)
+        return await blocking_executor.run("extraction", self._extractor.get_stream_url, video_id)
+
+    def _re_extract(self, video_id: str) -> StreamInfo:
+        """Drop the cached URL (a persistent-cache write) and extract again."""
+        self._extractor.invalidate(video_id)
+        return self._extractor.get_stream_url(video_id)
+
+    async def _re_resolve(self, video_id: str, stream_info: StreamInfo) -> StreamInfo:
+        """
+        Re-resolve an expired URL, insisting on the same file.
+
+        Raises:
+            UpstreamError: If extraction picked another format or size, whose
+                bytes must not be spliced onto the ones already sent
+        """
+        fresh = await self._resolve(video_id, refresh=True)
+        if not same_source(stream_info, fresh):
+            raise UpstreamError("Re-resolved stream is a different format")
+        return fresh
+
+    async def _fetch(
+        self, video_id: str, stream_info: StreamInfo, start: int, end: int, budget: list
+    ) -> Tuple[httpx.Response, StreamInfo]:
+        """
+        Open an upstream range request, re-resolving the URL when it has
+        expired or is rejected.
+
+        Args:
+            budget: One-element list with the remaining re-resolutions,
+                shared by all fetches of one relayed request
+        """
+        while True:
+            # Don't start a range on a URL that expires during the transfer
+            if budget[0] > 0 and stream_info.expires_at - time.time() < URL_EXPIRY_MARGIN_SECONDS:
+                budget[0] -= 1
+                stream_info = await self._re_resolve(video_id, stream_info)
+            request = self._client.build_request(
+                "GET", stream_info.url, headers={"Range": f"bytes={start}-{end}"}
+            )
+            try:
+                response = await self._client.send(request, stream=True)
+            except httpx.TransportError as e:
+                error: Exception = e
+            else:
+                if response.status_code == 206 or (response.status_code == 200 and start == 0):
+                    return response, stream_info
+                await response.aclose()
+                error = UpstreamError(f"Upstream returned HTTP {response.status_code}")
+                if response.status_code not in RESOLVE_STATUSES:
+                    raise error
+            if budget[0] <= 0:
+                raise error
+            budget[0] -= 1
+            stream_info = await self._re_resolve(video_id, stream_info)
+
+    async def open(
+        self, video_id: str, range_header: Optional[str] = None, if_range: Optional[str] = None
+    ) -> RelayResponse:
+        """
+        Resolve a video and open the first upstream range.
+
+        Upstream errors surface here, before any response headers are sent.
+
+        Args:
+            video_id: YouTube video ID
+            range_header: Client Range header
+            if_range: Client If-Range header
+
+        Raises:
+            RangeNotSatisfiable: If the range starts past the end
+            UpstreamError / httpx.HTTPError: If upstream cannot serve the stream
+        """
+        stream_info = await self._resolve(video_id)
+        validators = stream_validators(video_id, stream_info)
+
+        requested = parse_range_header(range_header)
+        # If-Range: only honor Range when the client's copy is still current
+        if requested and if_range and if_range.strip() not in validators.values():
+            requested = None
+
+        total: Optional[int] = None
+        clen = _url_param(stream_info.url, "clen")
+        if clen and clen.isdigit():
+            total = int(clen)
+
+        start = 0
+        if requested and requested[0] is not None:
+            start = requested[0]
+        elif requested and total is not None:
+            start = max(0, total - requested[1])
+        if total is not None and start >= total:
+            raise RangeNotSatisfiable(total)
+
+        budget = [self.max_re_resolves]
+        first_end = start + self.upstream_chunk_bytes - 1
+        response, stream_info = await self._fetch(video_id, stream_info, start, first_end, budget)
+
+        if total is None:
+            try:
+                total = self._total_from(response)
+            except UpstreamError:
+                await response.aclose()
+                raise
+            if requested and requested[0] is None:
+                # Suffix range: now that the size is known, reopen at the right offset
+                await response.aclose()
+                start = max(0, total - requested[1])
+                first_end = start + self.upstream_chunk_bytes - 1
+                response, stream_info = await self._fetch(video_id, stream_info, start, first_end, budget)
+            elif start >= total:
+                await response.aclose()
+                raise RangeNotSatisfiable(total)
+
+        end = total - 1
+        if requested and requested[0] is not None and requested[1] is not None:
+            end = min(requested[1], end)
+
+        headers = dict(validators)
+        headers["Accept-Ranges"] = "bytes"
+        headers["Content-Length"] = str(end - start + 1)
+        headers["Cache-Control"] = "private, no-transform"
+        status_code = 200
+        if requested:
+            status_code = 206
+            headers["Content-Range"] = f"bytes {start}-{end}/{total}"
+        media_type = response.headers.get("Content-Type") or MEDIA_TYPES.get(stream_info.format, "audio/mp4")
+
+        body = self._relay(video_id, stream_info, response, start, end, total, budget)
+        return RelayResponse(status_code=status_code, headers=headers, media_type=media_type, body=body)
+
+    def _total_from(self, response: httpx.Response) -> int:
+        """Total size from Content-Range, or Content-Length of a full response."""
+        content_range = response.headers.get("Content-Range", "")
+        _, _, size = content_range.rpartition("/")
+        if size.isdigit():
+            return int(size)
+        length = response.headers.get("Content-Length", "")
+        if response.status_code == 200 and length.isdigit():
+            return int(length)
+        raise UpstreamError("Upstream did not report the stream size")
+
+    async def _relay(
+        self,
+        video_id: str,
+        stream_info: StreamInfo,
+        response: httpx.Response,
+        start: int,
+        end: int,
+        total: int,
+        budget: list
+    ) -> AsyncIterator[bytes]:
+        """
+        Copy bytes start..end to the client one read chunk at a time.
+
+        The next upstream chunk is only read after the previous one was
+        handed to the server, so a slow client slows the upstream read
+        instead of growing a buffer (backpressure).
+        """
+        position = start
+        started = time.perf_counter()
+        with self._lock:
+            self._active += 1
+            self._relays += 1
+        try:
+            while position <= end:
+                range_start = position
+                dropped = False
+                try:
+                    async for chunk in response.aiter_raw(self.read_chunk_bytes):
+                        chunk = chunk[:end - position + 1]
+                        if not chunk:
+                            break
+                        with self._lock:
+                            self._bytes_in_flight += len(chunk)
+                        try:
+                            yield chunk
+                        finally:
+                            with self._lock:
+                                self._bytes_in_flight -= len(chunk)
+                                self._bytes_relayed += len(chunk)
+                        position += len(chunk)
+                        if position > end:
+                            break
+                except httpx.TransportError:
+                    # Dropped mid-range: reopen below from the current offset
+                    if budget[0] <= 0:
+                        raise
+                    budget[0] -= 1
+                    dropped = True
+                finally:
+                    await response.aclose()
+                if position > end:
+                    break
+                if position == range_start:
+                    # No progress: every empty pass costs a retry, or this never ends
+                    if budget[0] <= 0:
+                        raise UpstreamError("Upstream ended the range without data")
+                    if not dropped:
+                        budget[0] -= 1
+                next_end = min(end, position + self.upstream_chunk_bytes - 1)
+                response, stream_info = await self._fetch(video_id, stream_info, position, next_end, budget)
+                if self._total_from(response) != total:
+                    raise UpstreamError("Upstream stream size changed mid-relay")
+        except (Exception, asyncio.CancelledError):
+            with self._lock:
+                self._failed += 1
+            raise
+        finally:
+            await response.aclose()
+            with self._lock:
+                self._active -= 1
+                self._relay_seconds += time.perf_counter() - started
+
+    async def aclose(self):
+        """Close the upstream connection pool."""
+        await self._client.aclose()
+
+    def stats(self) -> dict:
+        """
+        Relay counters.
+
+        bytes_in_flight is the data read from upstream and not yet taken by
+        the server for sending; throughput is bytes relayed per second of
+        relay time.
+        """
+        with self._lock:
+            return {
+                "active": self._active,
+                "relays": self._relays,
+                "failed": self._failed,
+                "re_resolves": self._re_resolves,
+                "bytes_relayed": self._bytes_relayed,
+                "bytes_in_flight": self._bytes_in_flight,
+                "throughput_bytes_per_second": (
+                    self._bytes_relayed / self._relay_seconds if self._relay_seconds else 0.0
+                ),
+            }
+
+
+# Singleton relay instance
+audio_relay = AudioRelay(stream_extractor_service)
@@ -0,0 +1,434 @@
+"""
+Download job queue.
+Audio downloads (yt-dlp download plus FFmpeg transcode) run as background
+jobs on a bounded set of worker threads instead of holding the HTTP
+request. Jobs are taken highest priority first, report progress from
+yt-dlp hooks, and are deduplicated per video, quality and codec. Finished
+files go into the on-disk audio cache, so a track already transcoded for
+one device is served to the next without downloading it again.
+
+Jobs that need no transcode can also be read progressively: the file yt-dlp
+is still writing is tailed, so the first bytes reach the client right away.
+For a remux that is YouTube's DASH audio as downloaded, a fragmented MP4
+that plays as-is; only the cached file gets the standard container.
+"""
+import asyncio
+import heapq
+import itertools
+import os
+import re
+import threading
+import time
+import uuid
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import AsyncIterator, BinaryIO, Callable, Dict, List, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+from app.config import settings
+from app.services.audio_cache import AudioFileCache, audio_cache
+from app.services.youtube_music import DownloadResult, yt_music_service
+
+
+PRIORITIES = {"high": 0, "normal": 1, "low": 2}
+QUALITIES = ("best", "128k", "256k")
+CODECS = ("m4a", "opus")
+_VIDEO_ID = re.compile(r"[A-Za-z0-9_-]{11}")
+
+# Deliveries whose downloaded bytes are playable while yt-dlp writes them
+PROGRESSIVE_DELIVERIES = ("passthrough", "remux")
+
+# Job states
+QUEUED = "queued"
+DOWNLOADING = "downloading"
+PROCESSING = "processing"
+DONE = "done"
+FAILED = "failed"
+
+
+def cache_variant(quality: str, codec: str) -> str:
+    """Audio cache variant name (plain quality for the default m4a codec)."""
+    return quality if codec == "m4a" else f"{quality}-{codec}"
+
+
+class QueueFullError(Exception):
+    """Raised when the job queue is at its limit."""
+
+
+@dataclass
+class DownloadJob:
+    """State of one download job."""
+    job_id: str
+    video_id: str
+    quality: str
+    priority: str
+    codec: str = "m4a"
+    status: str = QUEUED
+    # "passthrough" | "remux" | "transcode", or "cached" when served from the audio cache
+    delivery: Optional[str] = None
+    downloaded_bytes: Optional[int] = None
+    total_bytes: Optional[int] = None
+    speed: Optional[float] = None  # bytes per second
+    eta_seconds: Optional[int] = None
+    error: Optional[str] = None
+    file_path: Optional[str] = None
+    # File yt-dlp is writing, its final extension and exact size (progressive reads)
+    partial_path: Optional[str] = None
+    partial_ext: Optional[str] = None
+    source_bytes: Optional[int] = None
+    created_at: float = field(default_factory=time.time)
+    finished_at: Optional[float] = None
+    # Resolved when the job is done or failed (for callers that wait)
+    future: Future = field(default_factory=Future, repr=False)
+
+    @property
+    def progress(self) -> float:
+        """Download progress from 0 to 1."""
+        if self.status == DONE:
+            return 1.0
+        if self.status == PROCESSING:
+            return 1.0 if self.total_bytes else 0.0
+        if self.downloaded_bytes and self.total_bytes:
+            return min(1.0, self.downloaded_bytes / self.total_bytes)
+        return 0.0
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (DONE, FAILED)
+
+
+class DownloadJobManager:
+    """
+    Bounded worker pool fed by a priority queue of download jobs.
+
+    Submitting a video/quality/codec that already has a queued, running or
+    finished (file still on disk) job returns that job; a higher priority
+    re-queues it ahead. A variant already in the audio cache completes
+    immediately. Finished jobs are kept for job_ttl seconds; their files
+    then belong to the audio cache, or are deleted when there is none.
+    """
+
+    def __init__(
+        self,
+        download_fn: Callable[..., Optional[DownloadResult]],
+        workers: int,
+        max_queued: int,
+        job_ttl: float,
+        cache: Optional[AudioFileCache] = None
+    ):
+        """
+        Args:
+            download_fn: download_fn(video_id, quality, progress_hook=, output_dir=, codec=)
+                -> DownloadResult or None
+            workers: Number of worker threads (concurrent downloads)
+            max_queued: Maximum jobs waiting for a worker
+            job_ttl: Seconds a finished job (and, without a cache, its file) is kept
+            cache: Optional audio file cache for finished files
+        """
+        self._download_fn = download_fn
+        self.workers = workers
+        self.max_queued = max_queued
+        self.job_ttl = job_ttl
+        self._cache = cache
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._queue: List[Tuple[int, int, str]] = []  # (priority, seq, job_id)
+        self._seq = itertools.count()
+        self._jobs: Dict[str, DownloadJob] = {}
+        self._by_key: Dict[Tuple[str, str, str], str] = {}
+        self._threads: List[threading.Thread] = []
+        self._queued = 0
+        self._running = 0
+        self._stopping = False
+        self._completed = 0
+        self._failed = 0
+        self._deduplicated = 0
+        self._cache_hits = 0
+        self._deliveries: Dict[str, int] = {}
+
+    def submit(
+        self, video_id: str, quality: str = "best", priority: str = "normal", codec: str = "m4a"
+    ) -> DownloadJob:
+        """
+        Enqueue a download, or return the existing job for this video/quality/codec.
+
+        Raises:
+            QueueFullError: If max_queued jobs are already waiting
+            ValueError: If the video ID is malformed or the quality, codec
+                or priority is unknown (they end up in file paths)
+        """
+        rank = PRIORITIES.get(priority)
+        if rank is None:
+            raise ValueError(f"Unknown priority: {priority}")
+        if not _VIDEO_ID.fullmatch(video_id):
+            raise ValueError(f"Invalid video ID: {video_id!r}")
+        if quality not in QUALITIES:
+            raise ValueError(f"Unknown quality: {quality!r}")
+        if codec not in CODECS:
+            raise ValueError(f"Unknown codec: {codec!r}")
+        self._purge_expired()
+        key = (video_id, quality, codec)
+        cached_path = self._cache.get(video_id, cache_variant(quality, codec)) if self._cache else None
+        with self._lock:
+            existing = self._jobs.get(self._by_key.get(key, ""))
+            if existing and self._reusable(existing):
+                self._deduplicated += 1
+                if existing.status == QUEUED and rank < PRIORITIES[existing.priority]:
+                    # Re-queue ahead; the old heap entry is skipped when popped
+                    existing.priority = priority
+                    heapq.heappush(self._queue, (rank, next(self._seq), existing.job_id))
+                    self._wakeup.notify()
+                return existing
+            job = DownloadJob(
+                job_id=uuid.uuid4().hex, video_id=video_id, quality=quality, priority=priority, codec=codec
+            )
+            if cached_path:
+                # Already downloaded for another client
+                job.status = DONE
+                job.delivery = "cached"
+                job.file_path = cached_path
+                job.finished_at = time.time()
+                job.future.set_result(job)
+                self._jobs[job.job_id] = job
+                self._by_key[key] = job.job_id
+                self._cache_hits += 1
+                return job
+            if self._queued >= self.max_queued:
+                raise QueueFullError(f"Download queue is full ({self.max_queued} jobs)")
+
+            self._jobs[job.job_id] = job
+            self._by_key[key] = job.job_id
+            heapq.heappush(self._queue, (rank, next(self._seq), job.job_id))
+            self._queued += 1
+            self._ensure_workers()
+            self._wakeup.notify()
+            return job
+
+    def _reusable(self, job: DownloadJob) -> bool:
+        """Whether a new request can share this job (lock held)."""
+        if job.status == FAILED:
+            return False
+        if job.status == DONE:
+            return bool(job.file_path and os.path.exists(job.file_path))
+        return True
+
+    def get(self, job_id: str) -> Optional[DownloadJob]:
+        """Get a job by ID."""
+        self._purge_expired()
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _ensure_workers(self):
+        """Start worker threads on first use (lock held)."""
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(
+                target=self._worker, name=f"download-job-{len(self._threads)}", daemon=True
+            )
+            self._threads.append(thread)
+            thread.start()
+
+    def _next_job(self) -> Optional[DownloadJob]:
+        """Block until a queued job is available; None when stopping."""
+        with self._lock:
+            while True:
+                if self._stopping:
+                    return None
+                while self._queue:
+                    _, _, job_id = heapq.heappop(self._queue)
+                    job = self._jobs.get(job_id)
+                    # Skip entries superseded by a priority bump
+                    if job is not None and job.status == QUEUED:
+                        job.status = DOWNLOADING
+                        self._queued -= 1
+                        self._running += 1
+                        return job
+                self._wakeup.wait()
+
+    def _worker(self):
+        while True:
+            job = self._next_job()
+            if job is None:
+                return
+            self._run(job)
+
+    def _run(self, job: DownloadJob):
+        def progress_hook(update: dict):
+            self._on_progress(job, update)
+
+        def download(output_dir: Optional[str]):
+            return self._download_fn(
+                job.video_id, job.quality,
+                progress_hook=progress_hook, output_dir=output_dir, codec=job.codec
+            )
+
+        file_path = None
+        try:
+            if self._cache:
+                with self._cache.staging() as staging_dir:
+                    result = download(staging_dir)
+                    if result and os.path.exists(result.file_path):
+                        file_path = self._cache.put(
+                            job.video_id, cache_variant(job.quality, job.codec), result.file_path
+                        )
+            else:
+                result = download(None)
+                file_path = result.file_path if result else None
+            error = None if file_path and os.path.exists(file_path) else "Download failed"
+        except Exception as e:
+            result, error = None, str(e)
+
+        with self._lock:
+            self._running -= 1
+            job.finished_at = time.time()
+            if error:
+                job.status = FAILED
+                job.error = error
+                self._failed += 1
+            else:
+                job.status = DONE
+                job.file_path = file_path
+                job.delivery = result.delivery
+                self._deliveries[result.delivery] = self._deliveries.get(result.delivery, 0) + 1
+                self._completed += 1
+        if error:
+            job.future.set_exception(Exception(error))
+        else:
+            job.future.set_result(job)
+
+    def _on_progress(self, job: DownloadJob, update: dict):
+        """Apply a yt-dlp progress or postprocessor hook update."""
+        with self._lock:
+            if update.get("status") == "planned":
+                job.delivery = update.get("delivery")
+                return
+            if "postprocessor" in update or update.get("status") == "finished":
+                # Download done, FFmpeg transcode running
+                job.status = PROCESSING
+                job.speed = None
+                job.eta_seconds = 0
+                return
+            if update.get("status") == "downloading":
+                job.downloaded_bytes = update.get("downloaded_bytes")
+                job.total_bytes = update.get("total_bytes") or update.get("total_bytes_estimate")
+                job.speed = update.get("speed")
+                eta = update.get("eta")
+                job.eta_seconds = int(eta) if eta is not None else None
+                if job.partial_path is None and update.get("tmpfilename"):
+                    job.partial_path = update["tmpfilename"]
+                    job.partial_ext = os.path.splitext(update.get("filename") or "")[1] or None
+                    job.source_bytes = update.get("total_bytes")
+
+    def _purge_expired(self):
+        """Forget finished jobs past job_ttl and delete files the cache does not own."""
+        cutoff = time.time() - self.job_ttl
+        expired = []
+        with self._lock:
+            for job_id, job in list(self._jobs.items()):
+                if job.finished and job.finished_at is not None and job.finished_at <= cutoff:
+                    del self._jobs[job_id]
+                    key = (job.video_id, job.quality, job.codec)
+                    if self._by_key.get(key) == job_id:
+                        del self._by_key[key]
+                    if job.file_path and not self._cache:
+                        expired.append(job.file_path)
+        for path in expired:
+            try:
+                if os.path.exists(path):
+                    os.remove(path)
+            except OSError as e:
+                print(f"Error cleaning up {path}: {e}")
+
+    def shutdown(self):
+        """Stop the workers after their current job; queued jobs are dropped."""
+        with self._lock:
+            self._stopping = True
+            self._wakeup.notify_all()
+
+    def stats(self) -> dict:
+        """Queue depth and job counters."""
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "queued": self._queued,
+                "running": self._running,
+                "jobs": len(self._jobs),
+                "completed": self._completed,
+                "failed": self._failed,
+                "deduplicated": self._deduplicated,
+                "cache_hits": self._cache_hits,
+                "deliveries": dict(self._deliveries),
+            }
+
+
+async def open_progressive(job: DownloadJob, timeout: float) -> Optional[BinaryIO]:
+    """
+    Wait until a job's download can be read while it is still running.
+
+    The handle is opened on the file yt-dlp is writing; it stays readable
+    after the file is renamed into place, moved into the cache or replaced
+    by the remuxed file. Passthrough and remux jobs qualify: a remux only
+    rewraps the DASH fragmented MP4, which players accept as downloaded. A
+    transcode rewrites the audio after the download.
+
+    Returns as soon as the job's state decides, otherwise after timeout.
+
+    Returns:
+        Open binary handle, or None when the job finished or left the
+        download phase first, is transcoded or timed out - callers then wait
+        for the finished file
+    """
+    poll_interval = settings.download_progressive_poll_interval
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if job.finished or job.delivery not in (None, *PROGRESSIVE_DELIVERIES):
+            return None
+        if job.partial_path and job.delivery in PROGRESSIVE_DELIVERIES:
+            try:
+                return await run_in_threadpool(open, job.partial_path, "rb")
+            except FileNotFoundError:
+                # Already renamed: the job is about to finish
+                return None
+        if job.status == PROCESSING:
+            # Downloaded without reporting a partial file: nothing left to tail
+            return None
+        await asyncio.sleep(poll_interval)
+    return None
+
+
+async def iter_progressive(job: DownloadJob, handle: BinaryIO) -> AsyncIterator[bytes]:
+    """
+    Yield a job's file as yt-dlp writes it, until the download completes.
+
+    Raises:
+        Exception: If the job fails before all bytes were sent
+    """
+    chunk_bytes = settings.download_progressive_chunk_bytes
+    poll_interval = settings.download_progressive_poll_interval
+    sent = 0
+    try:
+        while job.source_bytes is None or sent < job.source_bytes:
+            # Check before reading: bytes written up to completion are then all readable
+            finished = job.finished
+            chunk = await run_in_threadpool(handle.read, chunk_bytes)
+            if chunk:
+                sent += len(chunk)
+                yield chunk
+                continue
+            if job.status == FAILED:
+                raise Exception(job.error or "Download failed")
+            if finished:
+                break
+            await asyncio.sleep(poll_interval)
+    finally:
+        await run_in_threadpool(handle.close)
+
+
+# Singleton job manager
+download_jobs = DownloadJobManager(
+    yt_music_service.download_audio,
+    workers=settings.executor_download_workers,
+    max_queued=settings.download_max_queued,
+    job_ttl=settings.download_job_ttl,
+    cache=audio_cache if audio_cache.enabled else None
+)
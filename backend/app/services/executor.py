@@ -0,0 +1,213 @@
+"""
+Blocking call executor.
+Runs synchronous ytmusicapi / yt-dlp calls on bounded thread pools so the
+async routers never block the event loop.
+
+Each call class (search, browse, extraction, prefetch) gets its own pool,
+so a burst of slow stream extractions cannot starve searches and
+speculative prefetches never hold up an extraction a user is waiting for.
+Audio downloads run on the download job queue (download_jobs.py).
+
+Each pool also sets the rate governor lane of the upstream calls it runs
+(extraction: stream, search/browse: search, prefetch: prefetch), which
+orders them when YouTube calls have to wait for a slot (rate_governor.py).
+"""
+import asyncio
+import contextvars
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, asdict
+from typing import Any, Callable, Dict, Optional
+
+from app.config import settings
+from app.services.rate_governor import set_default_lane
+from app.utils.timing import record, span
+
+
+class ExecutorTimeoutError(TimeoutError):
+    """Raised when a blocking call does not finish within its pool timeout."""
+
+    def __init__(self, pool: str, timeout: float):
+        super().__init__(f"{pool} call timed out after {timeout:g}s")
+        self.pool = pool
+        self.timeout = timeout
+
+
+@dataclass
+class PoolStats:
+    """Counters for a single worker pool."""
+    submitted: int = 0
+    completed: int = 0  # returned a result
+    failed: int = 0  # raised
+    timed_out: int = 0
+    cancelled: int = 0
+    queued: int = 0  # waiting for a free worker
+    running: int = 0
+    max_queued: int = 0
+    total_wait_seconds: float = 0.0
+    max_wait_seconds: float = 0.0
+    total_run_seconds: float = 0.0
+
+
+class WorkerPool:
+    """A named, bounded thread pool that records queue depth and wait time."""
+
+    def __init__(self, name: str, max_workers: int, timeout: float, lane: Optional[str] = None):
+        """
+        Args:
+            lane: Rate governor lane for upstream calls made on this pool,
+                unless the submitting code pinned one (see rate_governor.py)
+        """
+        self.name = name
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.lane = lane
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix=f"{name}-worker"
+        )
+        self._lock = threading.Lock()
+        self._stats = PoolStats()
+
+    def submit(self, fn: Callable[..., Any], *args, **kwargs) -> Future:
+        """
+        Schedule a blocking call on this pool.
+
+        Returns:
+            concurrent.futures.Future for the call result
+        """
+        enqueued_at = time.perf_counter()
+
+        def task():
+            started_at = time.perf_counter()
+            wait = started_at - enqueued_at
+            with self._lock:
+                self._stats.queued -= 1
+                self._stats.running += 1
+                self._stats.total_wait_seconds += wait
+                self._stats.max_wait_seconds = max(self._stats.max_wait_seconds, wait)
+            record(f"queue.{self.name}", wait)
+            if self.lane:
+                set_default_lane(self.lane)
+            failed = True
+            try:
+                with span(self.name):
+                    result = fn(*args, **kwargs)
+                failed = False
+                return result
+            finally:
+                with self._lock:
+                    self._stats.running -= 1
+                    if failed:
+                        self._stats.failed += 1
+                    else:
+                        self._stats.completed += 1
+                    self._stats.total_run_seconds += time.perf_counter() - started_at
+
+        with self._lock:
+            self._stats.submitted += 1
+            self._stats.queued += 1
+            self._stats.max_queued = max(self._stats.max_queued, self._stats.queued)
+
+        # Run in a copy of the caller's context so request spans nest across threads
+        future = self._executor.submit(contextvars.copy_context().run, task)
+        future.add_done_callback(self._on_done)
+        return future
+
+    def _on_done(self, future: Future):
+        """Keep the queue depth honest for calls cancelled before they started."""
+        if future.cancelled():
+            with self._lock:
+                self._stats.queued -= 1
+                self._stats.cancelled += 1
+
+    async def run(self, fn: Callable[..., Any], *args, timeout: Optional[float] = None, **kwargs) -> Any:
+        """
+        Run a blocking call on this pool and await its result.
+
+        Args:
+            fn: Blocking callable
+            timeout: Seconds to wait (queue time included); defaults to the pool timeout
+
+        Raises:
+            ExecutorTimeoutError: If the call does not finish in time. A call that
+                already started keeps running in its worker, but its result is dropped.
+        """
+        timeout = self.timeout if timeout is None else timeout
+        future = self.submit(fn, *args, **kwargs)
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+        except asyncio.TimeoutError:
+            with self._lock:
+                self._stats.timed_out += 1
+            raise ExecutorTimeoutError(self.name, timeout) from None
+
+    def stats(self) -> dict:
+        """Snapshot of pool counters plus derived averages."""
+        with self._lock:
+            data = asdict(self._stats)
+        started = data["submitted"] - data["queued"] - data["cancelled"]
+        data["max_workers"] = self.max_workers
+        data["timeout_seconds"] = self.timeout
+        data["avg_wait_seconds"] = data["total_wait_seconds"] / started if started else 0.0
+        return data
+
+    def shutdown(self, wait: bool = True):
+        """Stop accepting work and release the worker threads."""
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+
+class BlockingExecutor:
+    """Registry of worker pools, one per upstream call class."""
+
+    def __init__(self, pools: Dict[str, WorkerPool]):
+        self._pools = pools
+
+    @classmethod
+    def from_settings(cls) -> "BlockingExecutor":
+        """Build the standard pools from application settings."""
+        return cls({
+            "search": WorkerPool(
+                "search", settings.executor_search_workers, settings.executor_search_timeout, lane="search"
+            ),
+            "browse": WorkerPool(
+                "browse", settings.executor_browse_workers, settings.executor_browse_timeout, lane="search"
+            ),
+            "extraction": WorkerPool(
+                "extraction", settings.executor_extraction_workers, settings.executor_extraction_timeout,
+                lane="stream"
+            ),
+            "prefetch": WorkerPool(
+                "prefetch", settings.executor_prefetch_workers, settings.executor_extraction_timeout,
+                lane="prefetch"
+            ),
+        })
+
+    def pool(self, name: str) -> WorkerPool:
+        """Get a pool by name."""
+        try:
+            return self._pools[name]
+        except KeyError:
+            raise ValueError(f"Unknown executor pool: {name}") from None
+
+    async def run(self, pool: str, fn: Callable[..., Any], *args, timeout: Optional[float] = None, **kwargs) -> Any:
+        """Run a blocking call on the named pool and await its result."""
+        return await self.pool(pool).run(fn, *args, timeout=timeout, **kwargs)
+
+    def submit(self, pool: str, fn: Callable[..., Any], *args, **kwargs) -> Future:
+        """Schedule a blocking call on the named pool without awaiting it."""
+        return self.pool(pool).submit(fn, *args, **kwargs)
+
+    def stats(self) -> Dict[str, dict]:
+        """Per-pool statistics."""
+        return {name: pool.stats() for name, pool in self._pools.items()}
+
+    def shutdown(self, wait: bool = True):
+        """Shut down every pool."""
+        for pool in self._pools.values():
+            pool.shutdown(wait=wait)
+
+
+# Singleton executor instance
+blocking_executor = BlockingExecutor.from_settings()
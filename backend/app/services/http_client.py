@@ -0,0 +1,43 @@
+"""
+Shared HTTP client for outbound calls other than ytmusicapi (e.g. LRCLIB).
+One long-lived connection pool with keep-alive, HTTP/2 when the h2
+package is installed, short connect timeouts and a bounded number of
+connections, so lookups stop paying DNS/TCP/TLS setup on every call.
+"""
+import importlib.util
+
+import httpx
+
+from app.config import settings
+
+
+USER_AGENT = "YTMusic Personal App/1.0"
+
+
+def http2_available() -> bool:
+    """Whether httpx can negotiate HTTP/2 (needs the h2 package)."""
+    return importlib.util.find_spec("h2") is not None
+
+
+def create_http_client() -> httpx.Client:
+    """Build the pooled client from application settings."""
+    return httpx.Client(
+        http2=settings.http_http2 and http2_available(),
+        timeout=httpx.Timeout(
+            settings.http_read_timeout,
+            connect=settings.http_connect_timeout,
+            # Waiting for a free pooled connection is the concurrency bound
+            pool=settings.http_connect_timeout
+        ),
+        limits=httpx.Limits(
+            max_connections=settings.http_max_connections,
+            max_keepalive_connections=settings.http_max_keepalive,
+            keepalive_expiry=settings.http_keepalive_expiry
+        ),
+        headers={"User-Agent": USER_AGENT},
+        follow_redirects=True
+    )
+
+
+# Shared client instance (thread-safe; used from executor worker threads)
+http_client = create_http_client()
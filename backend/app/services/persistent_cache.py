@@ -0,0 +1,278 @@
+"""
+Persistent on-disk cache backed by SQLite.
+Shared by every uvicorn worker process on the host and kept across
+restarts, so a rollout does not start every worker cold.
+
+The database runs in WAL mode: readers never block the writer and each
+read is a single primary-key lookup. Entries expire per namespace TTL and
+the least recently read entries are evicted once the total payload size
+exceeds the configured cap. Each entry records when it was written, so
+callers with a tighter freshness bound can ask for younger entries only.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from app.config import settings
+
+
+class PersistentCache:
+    """Namespaced JSON key/value store in a local SQLite database."""
+
+    # Only rewrite accessed_at when it is older than this, keeping reads read-only
+    TOUCH_INTERVAL_SECONDS = 10 * 60
+    # Check the size cap every this many writes
+    EVICT_EVERY_WRITES = 100
+    # Evict down to this fraction of max_bytes
+    EVICT_TARGET_RATIO = 0.9
+
+    def __init__(
+        self,
+        path: str,
+        max_bytes: int,
+        ttls: Dict[str, int],
+        enabled: bool = True,
+        busy_timeout: float = 5.0
+    ):
+        """
+        Args:
+            path: SQLite database file
+            max_bytes: Cap on the total size of stored values
+            ttls: Default TTL in seconds per namespace
+            enabled: When False every lookup misses and writes are dropped
+            busy_timeout: Seconds to wait for another process's write lock
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttls = ttls
+        self.enabled = enabled
+        self._busy_timeout = busy_timeout
+        self._local = threading.local()
+        self._init_lock = threading.Lock()
+        self._initialized = False
+        self._stats_lock = threading.Lock()
+        self._writes_since_evict = 0
+        self._hits = 0
+        self._misses = 0
+        self._writes = 0
+        self._evictions = 0
+        self._errors = 0
+
+    @classmethod
+    def from_settings(cls) -> "PersistentCache":
+        """Build the cache from application settings."""
+        return cls(
+            path=settings.cache_db_path,
+            max_bytes=settings.cache_max_bytes,
+            ttls={
+                "stream": settings.stream_cache_max_ttl,
+                "song": settings.cache_ttl_song,
+                "album": settings.cache_ttl_album,
+                "artist": settings.cache_ttl_artist,
+                "playlist": settings.cache_ttl_playlist,
+                "lyrics": settings.cache_ttl_lyrics,
+            },
+            enabled=settings.cache_enabled
+        )
+
+    def _connection(self) -> sqlite3.Connection:
+        """Per-thread connection (sqlite3 connections are not thread-safe)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            self._ensure_schema()
+            conn = self._open()
+            self._local.conn = conn
+        return conn
+
+    def _open(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=self._busy_timeout, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _ensure_schema(self):
+        with self._init_lock:
+            if self._initialized:
+                return
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = self._open()
+            try:
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS cache (
+                        namespace TEXT NOT NULL,
+                        key TEXT NOT NULL,
+                        value TEXT NOT NULL,
+                        size INTEGER NOT NULL,
+                        expires_at REAL NOT NULL,
+                        accessed_at REAL NOT NULL,
+                        fetched_at REAL NOT NULL,
+                        PRIMARY KEY (namespace, key)
+                    ) WITHOUT ROWID
+                """)
+                conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_accessed ON cache (accessed_at)")
+                conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_expires ON cache (expires_at)")
+            finally:
+                conn.close()
+            self._initialized = True
+
+    def get(self, namespace: str, key: str, max_age: Optional[float] = None) -> Optional[Any]:
+        """
+        Get a live value.
+
+        Args:
+            max_age: Only accept entries written at most this many seconds ago
+
+        Returns:
+            Decoded value or None on miss, expiry, age or database error
+        """
+        if not self.enabled:
+            return None
+        now = time.time()
+        try:
+            conn = self._connection()
+            row = conn.execute(
+                "SELECT value, expires_at, accessed_at, fetched_at FROM cache "
+                "WHERE namespace = ? AND key = ?",
+                (namespace, key)
+            ).fetchone()
+            if row is None or row[1] <= now or (max_age is not None and now - row[3] > max_age):
+                self._count("_misses")
+                return None
+            if now - row[2] > self.TOUCH_INTERVAL_SECONDS:
+                conn.execute(
+                    "UPDATE cache SET accessed_at = ? WHERE namespace = ? AND key = ?",
+                    (now, namespace, key)
+                )
+            self._count("_hits")
+            return json.loads(row[0])
+        except (sqlite3.Error, ValueError) as e:
+            self._count("_errors")
+            print(f"Persistent cache read error ({namespace}): {e}")
+            return None
+
+    def set(self, namespace: str, key: str, value: Any, ttl: Optional[float] = None):
+        """
+        Store a JSON-serializable value.
+
+        Args:
+            ttl: Seconds to keep the value (default: namespace TTL). Values with
+                a non-positive TTL are not stored.
+        """
+        if not self.enabled:
+            return
+        ttl = self.ttls.get(namespace, 3600) if ttl is None else ttl
+        if ttl <= 0:
+            return
+        now = time.time()
+        try:
+            payload = json.dumps(value, separators=(",", ":"), ensure_ascii=False)
+            self._connection().execute(
+                "INSERT OR REPLACE INTO cache "
+                "(namespace, key, value, size, expires_at, accessed_at, fetched_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (namespace, key, payload, len(payload), now + ttl, now, now)
+            )
+        except (sqlite3.Error, TypeError, ValueError) as e:
+            self._count("_errors")
+            print(f"Persistent cache write error ({namespace}): {e}")
+            return
+        with self._stats_lock:
+            self._writes += 1
+            self._writes_since_evict += 1
+            run_eviction = self._writes_since_evict >= self.EVICT_EVERY_WRITES
+            if run_eviction:
+                self._writes_since_evict = 0
+        if run_eviction:
+            self.evict()
+
+    def delete(self, namespace: str, key: str):
+        """Remove an entry."""
+        if not self.enabled:
+            return
+        try:
+            self._connection().execute(
+                "DELETE FROM cache WHERE namespace = ? AND key = ?", (namespace, key)
+            )
+        except sqlite3.Error as e:
+            self._count("_errors")
+            print(f"Persistent cache delete error ({namespace}): {e}")
+
+    def evict(self) -> int:
+        """
+        Drop expired entries, then least recently read entries until the
+        total size is under the cap.
+
+        Returns:
+            Number of entries removed
+        """
+        if not self.enabled:
+            return 0
+        removed = 0
+        try:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                removed += conn.execute(
+                    "DELETE FROM cache WHERE expires_at <= ?", (time.time(),)
+                ).rowcount
+                total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM cache").fetchone()[0]
+                if total > self.max_bytes:
+                    excess = total - int(self.max_bytes * self.EVICT_TARGET_RATIO)
+                    # Walk entries oldest-read first until enough bytes are covered
+                    cutoff = None
+                    freed = 0
+                    for accessed_at, size in conn.execute(
+                        "SELECT accessed_at, size FROM cache ORDER BY accessed_at"
+                    ):
+                        freed += size
+                        cutoff = accessed_at
+                        if freed >= excess:
+                            break
+                    if cutoff is not None:
+                        removed += conn.execute(
+                            "DELETE FROM cache WHERE accessed_at <= ?", (cutoff,)
+                        ).rowcount
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        except sqlite3.Error as e:
+            self._count("_errors")
+            print(f"Persistent cache eviction error: {e}")
+        with self._stats_lock:
+            self._evictions += removed
+        return removed
+
+    def clear(self):
+        """Remove every entry."""
+        if not self.enabled:
+            return
+        try:
+            self._connection().execute("DELETE FROM cache")
+        except sqlite3.Error as e:
+            print(f"Persistent cache clear error: {e}")
+
+    def _count(self, counter: str):
+        with self._stats_lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def stats(self) -> dict:
+        """Process-local hit/miss/write/eviction counters."""
+        with self._stats_lock:
+            return {
+                "enabled": self.enabled,
+                "hits": self._hits,
+                "misses": self._misses,
+                "writes": self._writes,
+                "evictions": self._evictions,
+                "errors": self._errors,
+            }
+
+
+# Singleton cache instance
+persistent_cache = PersistentCache.from_settings()
@@ -0,0 +1,317 @@
+"""
+Outbound rate governor for YouTube (ytmusicapi and yt-dlp share one budget).
+
+A token bucket caps the sustained call rate with a small burst. Calls waiting
+for a token are served by lane priority, so a user waiting on a stream URL is
+never queued behind searches, searches are not queued behind suggestions or
+prefetches, and background refreshes go last:
+
+    stream > search > suggest > prefetch > background
+
+The lane comes from the worker pool a call runs on (see executor.py) unless
+the code scheduling it pinned one with lane(). When upstream starts
+throttling (429 / "Too Many Requests" / bot checks) the rate is halved, at
+most once per cooldown, and recovers step by step as calls succeed again
+(additive increase, multiplicative decrease).
+"""
+import heapq
+import itertools
+import re
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional
+
+from app.config import settings
+from app.utils.metrics import metrics
+from app.utils.timing import record
+
+
+# Highest priority first
+LANES = ("stream", "search", "suggest", "prefetch", "background")
+DEFAULT_LANE = "search"
+
+# Substrings of upstream errors that mean "slow down"
+THROTTLE_MARKERS = ("too many requests", "rate limit", "rate-limit", "not a bot", "unusual traffic")
+# "HTTP Error 429" (yt-dlp) / "HTTP 429" (ytmusicapi) in a message; never a bare
+# "429", which also appears in video IDs and URLs
+_HTTP_429 = re.compile(r"\bhttp(?: error)? 429\b")
+
+_lane: ContextVar[Optional[str]] = ContextVar("governor_lane", default=None)
+
+governor_wait = metrics.histogram(
+    "governor_wait_seconds",
+    "Time upstream calls waited for a rate governor token",
+    ("lane",),
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+)
+
+
+class RateLimited(Exception):
+    """No token became available within the maximum wait."""
+
+    def __init__(self, lane: str, waited: float):
+        super().__init__(f"Upstream rate limit: {lane} call waited {waited:.1f}s without a slot")
+        self.lane = lane
+        self.waited = waited
+
+
+@contextmanager
+def lane(name: str) -> Iterator[None]:
+    """Run (and schedule) the calls in this block in a governor lane."""
+    if name not in LANES:
+        raise ValueError(f"Unknown lane {name!r} (expected one of {', '.join(LANES)})")
+    token = _lane.set(name)
+    try:
+        yield
+    finally:
+        _lane.reset(token)
+
+
+def current_lane() -> Optional[str]:
+    """Lane pinned in the current context, if any."""
+    return _lane.get()
+
+
+def set_default_lane(name: str):
+    """Pin a lane for the rest of the current context unless one is already pinned."""
+    if _lane.get() is None:
+        _lane.set(name)
+
+
+def _http_status(error: BaseException) -> Optional[int]:
+    """HTTP status carried by an httpx/requests, urllib or yt-dlp error."""
+    response = getattr(error, "response", None)
+    for status in (
+        getattr(error, "status_code", None),
+        getattr(response, "status_code", None),
+        getattr(response, "status", None),
+        getattr(error, "status", None),
+        getattr(error, "code", None),
+    ):
+        if isinstance(status, int):
+            return status
+    return None
+
+
+def is_throttle_error(error: BaseException) -> bool:
+    """Whether an upstream error looks like rate limiting."""
+    # yt-dlp's DownloadError keeps the underlying HTTPError in exc_info
+    exc_info = getattr(error, "exc_info", None)
+    cause = exc_info[1] if isinstance(exc_info, tuple) and len(exc_info) > 1 else None
+    for candidate in (error, cause):
+        if isinstance(candidate, BaseException) and _http_status(candidate) == 429:
+            return True
+    message = str(error).lower()
+    return bool(_HTTP_429.search(message)) or any(marker in message for marker in THROTTLE_MARKERS)
+
+
+class RateGovernor:
+    """Token bucket with priority lanes and AIMD backoff."""
+
+    # Rate multiplier on throttling
+    BACKOFF_FACTOR = 0.5
+    # Fraction of the configured rate regained per successful call
+    RECOVERY_STEP = 0.02
+
+    def __init__(
+        self,
+        rate: float,
+        burst: int,
+        min_rate: float,
+        max_wait: float,
+        backoff_cooldown: float = 5.0,
+        enabled: bool = True,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        """
+        Args:
+            rate: Sustained calls per second
+            burst: Calls allowed back to back after an idle period
+            min_rate: Floor for the backed-off rate
+            max_wait: Seconds a call may wait for a token before RateLimited
+            backoff_cooldown: Minimum seconds between two rate decreases
+            enabled: When False calls pass straight through
+            clock: Time source, overridable for tests
+        """
+        self.max_rate = rate
+        self.rate = rate
+        self.burst = burst
+        self.min_rate = min(min_rate, rate)
+        self.max_wait = max_wait
+        self.backoff_cooldown = backoff_cooldown
+        self.enabled = enabled
+        self._clock = clock
+        self._cond = threading.Condition()
+        self._tokens = float(burst)
+        self._updated = clock()
+        self._last_backoff = float("-inf")
+        self._seq = itertools.count()
+        # (priority, seq) of every waiting call; the smallest is served next
+        self._waiting: list = []
+        self._waiting_by_lane: Dict[str, int] = {name: 0 for name in LANES}
+        self._granted: Dict[str, int] = {name: 0 for name in LANES}
+        self._rejected: Dict[str, int] = {name: 0 for name in LANES}
+        self._throttled = 0
+        self._backoffs = 0
+
+    @classmethod
+    def from_settings(cls) -> "RateGovernor":
+        """Build the governor from application settings."""
+        return cls(
+            rate=settings.governor_rate,
+            burst=settings.governor_burst,
+            min_rate=settings.governor_min_rate,
+            max_wait=settings.governor_max_wait,
+            backoff_cooldown=settings.governor_backoff_cooldown,
+            enabled=settings.governor_enabled
+        )
+
+    def _refill(self, now: float):
+        """Add tokens for the time since the last refill (lock held)."""
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, lane_name: Optional[str] = None, timeout: Optional[float] = None) -> float:
+        """
+        Wait for a token.
+
+        Args:
+            lane_name: Priority lane (default: the lane pinned in the context)
+            timeout: Maximum wait (default max_wait)
+
+        Returns:
+            Seconds waited
+
+        Raises:
+            RateLimited: If no token became available in time
+        """
+        if not self.enabled:
+            return 0.0
+        name = lane_name or _lane.get() or DEFAULT_LANE
+        timeout = self.max_wait if timeout is None else timeout
+        started = self._clock()
+        deadline = started + timeout
+        with self._cond:
+            ticket = (LANES.index(name), next(self._seq))
+            heapq.heappush(self._waiting, ticket)
+            self._waiting_by_lane[name] += 1
+            try:
+                while True:
+                    now = self._clock()
+                    self._refill(now)
+                    if self._waiting[0] == ticket and self._tokens >= 1:
+                        heapq.heappop(self._waiting)
+                        self._tokens -= 1
+                        self._granted[name] += 1
+                        # The next waiter may be able to go right away
+                        self._cond.notify_all()
+                        break
+                    if now >= deadline:
+                        self._waiting.remove(ticket)
+                        heapq.heapify(self._waiting)
+                        self._rejected[name] += 1
+                        self._cond.notify_all()
+                        raise RateLimited(name, now - started)
+                    if self._waiting[0] == ticket:
+                        # Next in line: sleep until the next token is due
+                        self._cond.wait(min(deadline - now, max((1 - self._tokens) / self.rate, 0.001)))
+                    else:
+                        # Woken when the head is served or gives up
+                        self._cond.wait(deadline - now)
+            finally:
+                self._waiting_by_lane[name] -= 1
+        waited = now - started
+        governor_wait.observe(waited, name)
+        if waited >= 0.001:
+            record("governor", waited)
+        return waited
+
+    def record_outcome(self, error: Optional[BaseException] = None):
+        """
+        Adapt the rate to an upstream call's outcome: halve it on throttling
+        (once per cooldown), creep back toward the configured rate on success.
+        """
+        if not self.enabled:
+            return
+        with self._cond:
+            if error is None:
+                if self.rate < self.max_rate:
+                    self.rate = min(self.max_rate, self.rate + self.max_rate * self.RECOVERY_STEP)
+                return
+            if not is_throttle_error(error):
+                return
+            self._throttled += 1
+            now = self._clock()
+            if now - self._last_backoff < self.backoff_cooldown:
+                return
+            self._refill(now)
+            self._last_backoff = now
+            self._backoffs += 1
+            self.rate = max(self.min_rate, self.rate * self.BACKOFF_FACTOR)
+            # Drop any saved-up burst as well
+            self._tokens = min(self._tokens, 0.0)
+
+    @contextmanager
+    def observe(self) -> Iterator[None]:
+        """Learn from the outcome of the upstream call in the block."""
+        try:
+            yield
+        except Exception as e:
+            self.record_outcome(e)
+            raise
+        self.record_outcome()
+
+    @contextmanager
+    def limit(self, lane_name: Optional[str] = None) -> Iterator[None]:
+        """Wait for a token, then run the block and learn from its outcome."""
+        self.acquire(lane_name)
+        with self.observe():
+            yield
+
+    def stats(self) -> dict:
+        """Current rate, waiting calls and grant/reject/backoff counters per lane."""
+        with self._cond:
+            self._refill(self._clock())
+            return {
+                "enabled": self.enabled,
+                "rate": self.rate,
+                "max_rate": self.max_rate,
+                "tokens": self._tokens,
+                "waiting": dict(self._waiting_by_lane),
+                "granted": dict(self._granted),
+                "rejected": dict(self._rejected),
+                "throttled": self._throttled,
+                "backoffs": self._backoffs,
+            }
+
+
+class GovernedClient:
+    """Proxy passing selected client methods through a rate governor."""
+
+    def __init__(self, client: Any, governor: RateGovernor, methods: Iterable[str]):
+        """
+        Args:
+            client: Wrapped client
+            governor: Governor every call of `methods` waits on
+            methods: Method names to govern; other attributes pass through
+        """
+        self._client = client
+        self._governor = governor
+        self._methods = frozenset(methods)
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._client, name)
+        if name not in self._methods:
+            return attr
+
+        def governed(*args, **kwargs):
+            with self._governor.limit():
+                return attr(*args, **kwargs)
+
+        return governed
+
+
+# Singleton governor shared by ytmusicapi and yt-dlp calls
+youtube_governor = RateGovernor.from_settings()
@@ -0,0 +1,418 @@
+"""
+Response cache for YouTubeMusicService results.
+Caches parsed method results (Song / Album lists, album and artist dicts)
+in an in-process LRU or a shared Redis-protocol server, with per-method
+TTLs, normalized keys and stale-while-revalidate: once an entry is past
+its TTL it is still served for a grace period while a background refresh
+fetches the new value.
+
+While a value loads, stored_payload_max_age() tells the service how old
+a payload from its persistent raw-payload cache may be: a miss accepts one
+younger than the namespace TTL (so a fresh worker reuses what another
+worker already fetched), a stale refresh accepts none and goes upstream.
+"""
+import functools
+import inspect
+import json
+import logging
+import pickle
+import socket
+import threading
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Sequence
+from urllib.parse import urlparse
+
+from app.config import settings
+from app.services.executor import blocking_executor
+from app.services.rate_governor import lane
+from app.utils.cache import TTLCache
+from app.utils.circuit_breaker import CircuitBreaker, CircuitOpenError
+from app.utils.singleflight import SingleFlight
+from app.utils.timing import detached, span
+
+logger = logging.getLogger(__name__)
+
+_max_age: ContextVar[Optional[float]] = ContextVar("response_cache_max_age", default=None)
+_refreshing: ContextVar[bool] = ContextVar("response_cache_refreshing", default=False)
+
+
+def stored_payload_max_age() -> Optional[float]:
+    """
+    How old a stored raw payload may be for the value being loaded.
+
+    Returns:
+        None outside a response-cache load (any live payload will do),
+        the namespace TTL on a miss, 0 during a stale-while-revalidate refresh
+    """
+    if _refreshing.get():
+        return 0.0
+    return _max_age.get()
+
+
+@dataclass
+class CacheEntry:
+    """Cached result and the time after which it is stale."""
+    value: Any
+    fresh_until: float
+
+
+class MemoryBackend:
+    """In-process LRU backend."""
+
+    def __init__(self, max_entries: int):
+        self._cache = TTLCache(max_entries=max_entries)
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        return self._cache.get(key)
+
+    def set(self, key: str, entry: CacheEntry, ttl: float):
+        self._cache.set(key, entry, ttl)
+
+    def delete(self, key: str):
+        self._cache.pop(key)
+
+
+class RedisError(Exception):
+    """Error reply or protocol failure from the Redis-protocol server."""
+
+
+class RedisConnectionClosed(RedisError):
+    """The server closed the connection."""
+
+
+class RedisBackend:
+    """
+    Shared backend speaking the Redis protocol (RESP).
+
+    Implements only GET/SET/DEL over one socket per thread, so any
+    Redis-compatible server (Redis, Valkey, KeyDB, or a local stand-in)
+    works without an extra client dependency. Values are pickled; the
+    server must only be reachable by this service.
+
+    Connection failures trip a circuit breaker, so while the server is down
+    lookups miss immediately instead of each waiting out a connect timeout.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        prefix: str = "ytm:",
+        timeout: float = 1.0,
+        failure_threshold: int = 3,
+        retry_after: float = 30.0,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        """
+        Args:
+            url: redis://[:password@]host[:port][/db]
+            prefix: Prepended to every key
+            timeout: Connect and read timeout in seconds
+            failure_threshold: Consecutive connection failures before the
+                server is skipped
+            retry_after: Seconds to skip the server before trying it again
+            clock: Time source, overridable for tests
+        """
+        parsed = urlparse(url)
+        self._host = parsed.hostname or "localhost"
+        self._port = parsed.port or 6379
+        self._password = parsed.password
+        self._db = int(parsed.path.lstrip("/") or 0)
+        self._prefix = prefix
+        self._timeout = timeout
+        self._local = threading.local()
+        self.breaker = CircuitBreaker(
+            "Response cache backend", failure_threshold=failure_threshold, cooldown=retry_after, clock=clock
+        )
+
+    def _connect(self):
+        sock = socket.create_connection((self._host, self._port), timeout=self._timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._local.sock = sock
+        self._local.reader = sock.makefile("rb")
+        if self._password:
+            self._send(b"AUTH", self._password.encode())
+        if self._db:
+            self._send(b"SELECT", str(self._db).encode())
+
+    def _disconnect(self):
+        sock = getattr(self._local, "sock", None)
+        if sock:
+            try:
+                sock.close()
+            except OSError:
+                pass
+        self._local.sock = None
+
+    def _send(self, *parts: bytes) -> Any:
+        payload = b"*%d\r\n" % len(parts) + b"".join(
+            b"$%d\r\n%s\r\n" % (len(part), part) for part in parts
+        )
+        self._local.sock.sendall(payload)
+        return self._read_reply()
+
+    def _read_reply(self) -> Any:
+        line = self._local.reader.readline()
+        if not line.endswith(b"\r\n"):
+            raise RedisConnectionClosed("Connection closed")
+        kind, body = line[:1], line[1:-2]
+        if kind == b"+":
+            return body
+        if kind == b"-":
+            raise RedisError(body.decode(errors="replace"))
+        if kind == b":":
+            return int(body)
+        if kind == b"$":
+            length = int(body)
+            if length < 0:
+                return None
+            data = self._local.reader.read(length + 2)
+            return data[:-2]
+        if kind == b"*":
+            count = int(body)
+            return None if count < 0 else [self._read_reply() for _ in range(count)]
+        raise RedisError(f"Unexpected reply: {line!r}")
+
+    def command(self, *parts: bytes) -> Any:
+        """
+        Run one command, reconnecting once if the connection dropped.
+
+        Raises:
+            CircuitOpenError: If the server is skipped after repeated failures
+            OSError, RedisError: If the command failed
+        """
+        self.breaker.check()
+        try:
+            reply = self._command(*parts)
+        except (OSError, RedisConnectionClosed):
+            self.breaker.record_failure()
+            raise
+        except RedisError:
+            # An error reply (-LOADING, -BUSY, ...): the server is reachable
+            self.breaker.record_success()
+            raise
+        except BaseException:
+            # Protocol garbage: the connection can't be trusted any more
+            self._disconnect()
+            self.breaker.record_failure()
+            raise
+        self.breaker.record_success()
+        return reply
+
+    def _command(self, *parts: bytes) -> Any:
+        for attempt in range(2):
+            if getattr(self._local, "sock", None) is None:
+                try:
+                    self._connect()
+                except Exception:
+                    # Don't keep a half-set-up connection (failed AUTH/SELECT)
+                    self._disconnect()
+                    raise
+            try:
+                return self._send(*parts)
+            except (OSError, RedisConnectionClosed):
+                self._disconnect()
+                if attempt:
+                    raise
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        try:
+            data = self.command(b"GET", (self._prefix + key).encode())
+            return pickle.loads(data) if data is not None else None
+        except CircuitOpenError:
+            return None
+        except (OSError, RedisError, pickle.PickleError, EOFError) as e:
+            logger.warning("Response cache backend error: %s", e)
+            return None
+
+    def set(self, key: str, entry: CacheEntry, ttl: float):
+        try:
+            self.command(
+                b"SET", (self._prefix + key).encode(),
+                pickle.dumps(entry, protocol=pickle.HIGHEST_PROTOCOL),
+                b"PX", str(max(1, int(ttl * 1000))).encode()
+            )
+        except CircuitOpenError:
+            pass
+        except (OSError, RedisError) as e:
+            logger.warning("Response cache backend error: %s", e)
+
+    def delete(self, key: str):
+        try:
+            self.command(b"DEL", (self._prefix + key).encode())
+        except CircuitOpenError:
+            pass
+        except (OSError, RedisError) as e:
+            logger.warning("Response cache backend error: %s", e)
+
+
+def normalize_query(value: Any) -> Any:
+    """Fold case and collapse whitespace so equivalent queries share a key."""
+    if isinstance(value, str):
+        return " ".join(value.split()).casefold()
+    return value
+
+
+class ResponseCache:
+    """Read-through cache with stale-while-revalidate for service methods."""
+
+    def __init__(self, backend, ttls: Dict[str, float], stale_ttl: float, enabled: bool = True):
+        """
+        Args:
+            backend: MemoryBackend or RedisBackend
+            ttls: Fresh lifetime in seconds per namespace
+            stale_ttl: Seconds a stale entry may still be served while refreshing
+            enabled: When False every call goes straight to the method
+        """
+        self.backend = backend
+        self.ttls = ttls
+        self.stale_ttl = stale_ttl
+        self.enabled = enabled
+        self._inflight = SingleFlight()
+        self._lock = threading.Lock()
+        self._refreshing = set()
+        self._stats = {"hits": 0, "stale_hits": 0, "misses": 0, "refreshes": 0, "refresh_errors": 0}
+
+    @classmethod
+    def from_settings(cls) -> "ResponseCache":
+        """Build the cache and its backend from application settings."""
+        if settings.response_cache_backend == "redis":
+            backend = RedisBackend(
+                settings.response_cache_redis_url,
+                retry_after=settings.response_cache_redis_retry_after
+            )
+        else:
+            backend = MemoryBackend(settings.response_cache_max_entries)
+        return cls(
+            backend,
+            ttls={
+                "search": settings.response_cache_ttl_search,
+                "album": settings.response_cache_ttl_album,
+                "artist": settings.response_cache_ttl_artist,
+                "playlist": settings.response_cache_ttl_playlist,
+            },
+            stale_ttl=settings.response_cache_stale_ttl,
+            enabled=settings.response_cache_enabled
+        )
+
+    def _count(self, name: str):
+        with self._lock:
+            self._stats[name] += 1
+
+    def _store(self, namespace: str, key: str, value: Any):
+        ttl = self.ttls.get(namespace, 300)
+        entry = CacheEntry(value=value, fresh_until=time.time() + ttl)
+        self.backend.set(key, entry, ttl + self.stale_ttl)
+
+    def _load(self, namespace: str, key: str, fetch: Callable[[], Any]) -> Any:
+        token = _max_age.set(self.ttls.get(namespace, 300))
+        try:
+            value = fetch()
+        finally:
+            _max_age.reset(token)
+        # None means "not found / failed" for the browse methods: never cache it
+        if value is not None:
+            self._store(namespace, key, value)
+        return value
+
+    def _refresh_in_background(self, namespace: str, key: str, fetch: Callable[[], Any], pool: str):
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def refresh():
+            token = _refreshing.set(True)
+            try:
+                self._inflight.do(key, self._load, namespace, key, fetch)
+                self._count("refreshes")
+            except Exception as e:
+                self._count("refresh_errors")
+                logger.warning("Response cache refresh failed for %s: %s", key, e)
+            finally:
+                _refreshing.reset(token)
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        try:
+            with detached(), lane("background"):
+                blocking_executor.submit(pool, refresh)
+        except RuntimeError:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def get_or_load(self, namespace: str, key: str, fetch: Callable[[], Any], pool: str = "browse") -> Any:
+        """
+        Return a cached value, serving stale entries while refreshing them.
+
+        Args:
+            namespace: TTL namespace
+            key: Full cache key
+            fetch: Loads the fresh value on a miss or refresh
+            pool: Executor pool used for background refreshes
+        """
+        if not self.enabled:
+            return fetch()
+        entry = self.backend.get(key)
+        if entry is not None:
+            if entry.fresh_until > time.time():
+                self._count("hits")
+            else:
+                self._count("stale_hits")
+                self._refresh_in_background(namespace, key, fetch, pool)
+            return entry.value
+        self._count("misses")
+        return self._inflight.do(key, self._load, namespace, key, fetch)
+
+    def stats(self) -> dict:
+        """Hit/stale/miss/refresh counters, plus the Redis backend's circuit state."""
+        with self._lock:
+            stats = dict(self._stats, enabled=self.enabled)
+        breaker = getattr(self.backend, "breaker", None)
+        if breaker is not None:
+            stats["backend"] = breaker.stats()
+        return stats
+
+
+def cached_response(namespace: str, pool: str = "browse", normalize: Sequence[str] = ()):
+    """
+    Cache a YouTubeMusicService method through the instance's response cache.
+
+    The service opts in by setting self._response_cache; without one the
+    method is called directly.
+
+    Args:
+        namespace: TTL namespace and key prefix
+        pool: Executor pool for stale-while-revalidate refreshes
+        normalize: Argument names whose values are case/whitespace folded
+    """
+    def decorator(fn):
+        signature = inspect.signature(fn)
+
+        @functools.wraps(fn)
+        def wrapper(self, *args, **kwargs):
+            cache: Optional[ResponseCache] = getattr(self, "_response_cache", None)
+
+            def load():
+                with span(fn.__name__):
+                    return fn(self, *args, **kwargs)
+
+            if cache is None:
+                return load()
+            bound = signature.bind(self, *args, **kwargs)
+            bound.apply_defaults()
+            params = {
+                name: normalize_query(value) if name in normalize else value
+                for name, value in list(bound.arguments.items())[1:]
+            }
+            key = f"{fn.__name__}:{json.dumps(params, sort_keys=True, default=str)}"
+            with span(f"response_cache.{namespace}"):
+                return cache.get_or_load(namespace, key, load, pool)
+
+        return wrapper
+    return decorator
+
+
+# Singleton response cache instance
+response_cache = ResponseCache.from_settings()
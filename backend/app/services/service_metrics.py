@@ -0,0 +1,127 @@
+"""
+Scrape-time metrics read from the services' own counters.
+
+Cache hit/miss/eviction totals, pool depths and in-flight gauges are
+already counted by each service for /health; exporting them at scrape time
+keeps the request path free of duplicate bookkeeping.
+"""
+from typing import Iterator, Tuple
+
+from app.services.audio_cache import audio_cache
+from app.services.audio_relay import audio_relay
+from app.services.download_jobs import download_jobs
+from app.services.executor import blocking_executor
+from app.services.persistent_cache import persistent_cache
+from app.services.rate_governor import youtube_governor
+from app.services.response_cache import response_cache
+from app.services.stream_extractor import stream_extractor_service
+from app.services.stream_prefetch import stream_prefetcher
+from app.services.youtube_music import yt_music_service
+from app.utils.metrics import Samples
+
+
+def collect_service_metrics() -> Iterator[Tuple[str, str, str, Samples]]:
+    """(name, type, help, samples) for every service counter and gauge."""
+    stream = stream_extractor_service.stats()
+    playable_counts = yt_music_service.playable_count_stats()
+    response = response_cache.stats()
+    persistent = persistent_cache.stats()
+    audio = audio_cache.stats()
+    suggestions = yt_music_service.suggestion_index.stats()
+    caches = {
+        # cache name -> (hits, misses, evictions)
+        "stream_url": (stream["cache_hits"], stream["cache_misses"], stream["cache_evictions"]),
+        "response": (response["hits"] + response["stale_hits"], response["misses"], 0),
+        "persistent": (persistent["hits"], persistent["misses"], persistent["evictions"]),
+        "audio_file": (audio["hits"], audio["misses"], audio["evictions"]),
+        "playlist_count": (playable_counts["hits"], playable_counts["misses"], playable_counts["evictions"]),
+        "suggestions": (suggestions["hits"] + suggestions["derived"], suggestions["misses"], suggestions["evictions"]),
+    }
+    yield "cache_hits_total", "counter", "Cache lookups served from the cache", [
+        ({"cache": name}, values[0]) for name, values in caches.items()
+    ]
+    yield "cache_misses_total", "counter", "Cache lookups that missed", [
+        ({"cache": name}, values[1]) for name, values in caches.items()
+    ]
+    yield "cache_evictions_total", "counter", "Entries evicted to stay under the size cap", [
+        ({"cache": name}, values[2]) for name, values in caches.items()
+    ]
+    yield "cache_expirations_total", "counter", "Entries dropped after their TTL", [
+        ({"cache": "stream_url"}, stream["cache_expirations"]),
+        ({"cache": "playlist_count"}, playable_counts["expirations"]),
+        ({"cache": "suggestions"}, suggestions["expirations"]),
+    ]
+    yield "response_cache_stale_hits_total", "counter", "Expired responses served while refreshing", [
+        ({}, response["stale_hits"]),
+    ]
+    yield "cache_entries", "gauge", "Entries currently cached", [
+        ({"cache": "stream_url"}, stream["cache_entries"]),
+        ({"cache": "playlist_count"}, playable_counts["entries"]),
+        ({"cache": "audio_file"}, audio["files"]),
+        ({"cache": "suggestions"}, suggestions["entries"]),
+    ]
+    yield "suggestions_derived_total", "counter", "Suggestion lookups answered from a shorter cached prefix", [
+        ({}, suggestions["derived"]),
+    ]
+    yield "stream_extractions_total", "counter", "yt-dlp extractions run (coalesced requests excluded)", [
+        ({}, stream["extractions"]),
+    ]
+    yield "stream_extractions_coalesced_total", "counter", "Requests that shared an in-flight extraction", [
+        ({}, stream["coalesced"]),
+    ]
+    yield "stream_extractions_in_flight", "gauge", "yt-dlp extractions currently running", [
+        ({}, stream["in_flight"]),
+    ]
+
+    pools = blocking_executor.stats()
+    yield "executor_queued", "gauge", "Blocking calls waiting for a worker", [
+        ({"pool": name}, pool["queued"]) for name, pool in pools.items()
+    ]
+    yield "executor_running", "gauge", "Blocking calls running", [
+        ({"pool": name}, pool["running"]) for name, pool in pools.items()
+    ]
+    yield "executor_completed_total", "counter", "Blocking calls that returned a result", [
+        ({"pool": name}, pool["completed"]) for name, pool in pools.items()
+    ]
+    yield "executor_failed_total", "counter", "Blocking calls that raised", [
+        ({"pool": name}, pool["failed"]) for name, pool in pools.items()
+    ]
+    yield "executor_timeouts_total", "counter", "Blocking calls that exceeded the pool timeout", [
+        ({"pool": name}, pool["timed_out"]) for name, pool in pools.items()
+    ]
+    yield "ydl_pool_in_use", "gauge", "yt-dlp instances checked out", [
+        ({}, stream["ydl_pool"]["in_use"]),
+    ]
+
+    relay = audio_relay.stats()
+    yield "relay_active", "gauge", "Audio relays in progress", [({}, relay["active"])]
+    yield "relay_bytes_total", "counter", "Bytes relayed to clients", [({}, relay["bytes_relayed"])]
+
+    downloads = download_jobs.stats()
+    yield "download_jobs", "gauge", "Download jobs by state", [
+        ({"state": "queued"}, downloads["queued"]),
+        ({"state": "running"}, downloads["running"]),
+    ]
+    yield "prefetch_pending", "gauge", "Stream prefetches scheduled and not yet run", [
+        ({}, stream_prefetcher.stats()["pending"]),
+    ]
+
+    governor = youtube_governor.stats()
+    yield "governor_rate", "gauge", "Current outbound YouTube calls per second (lowered while throttled)", [
+        ({}, governor["rate"]),
+    ]
+    yield "governor_waiting", "gauge", "Upstream calls waiting for a rate governor slot", [
+        ({"lane": name}, count) for name, count in governor["waiting"].items()
+    ]
+    yield "governor_granted_total", "counter", "Upstream calls granted a slot", [
+        ({"lane": name}, count) for name, count in governor["granted"].items()
+    ]
+    yield "governor_rejected_total", "counter", "Upstream calls that gave up waiting for a slot", [
+        ({"lane": name}, count) for name, count in governor["rejected"].items()
+    ]
+    yield "governor_throttled_total", "counter", "Upstream calls that failed with a throttling error", [
+        ({}, governor["throttled"]),
+    ]
+    yield "governor_backoffs_total", "counter", "Rate decreases after throttling", [
+        ({}, governor["backoffs"]),
+    ]
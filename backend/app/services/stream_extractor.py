@@ -1,12 +1,25 @@
 """
 Stream extractor service using yt-dlp.
 Extracts direct audio stream URLs from YouTube Music.
-Includes simple in-memory caching for performance.
+Caches extracted URLs in a bounded LRU cache (backed by the persistent
+on-disk cache) until shortly before the URL's own expiry, and coalesces
+concurrent extractions of the same video into a single yt-dlp call.
+Extractions run on pooled, long-lived yt-dlp instances.
 """
-import yt_dlp
+import threading
 import time
-from typing import Optional, Dict
-from dataclasses import dataclass
+from typing import Optional
+from dataclasses import dataclass, asdict
+from urllib.parse import urlparse, parse_qs
+
+from app.config import settings
+from app.services.persistent_cache import PersistentCache, persistent_cache
+from app.services.rate_governor import youtube_governor
+from app.services.ydl_pool import YoutubeDLPool
+from app.utils.cache import TTLCache
+from app.utils.metrics import upstream_call
+from app.utils.singleflight import SingleFlight
+from app.utils.timing import span
 
 
 @dataclass
@@ -15,24 +28,49 @@ class StreamInfo:
     url: str
     format: str
     quality: Optional[str]
-    expires_in_seconds: int = 21600  # ~6 hours (YouTube default)
+    expires_at: float  # unix timestamp when the stream URL stops working
+    
+    @property
+    def expires_in_seconds(self) -> int:
+        """Remaining lifetime of the stream URL."""
+        return max(0, int(self.expires_at - time.time()))
 
 
-@dataclass
-class CachedStream:
-    """Cached stream info with expiration."""
-    stream_info: StreamInfo
-    created_at: float  # timestamp
+def parse_url_expiry(url: str) -> Optional[float]:
+    """
+    Read the expiry timestamp from a googlevideo stream URL.
+    
+    Stream URLs carry an `expire` query parameter with the unix time after
+    which YouTube rejects them.
+    
+    Returns:
+        Expiry timestamp or None if the URL has no usable `expire` parameter
+    """
+    try:
+        values = parse_qs(urlparse(url).query).get("expire")
+        return float(values[0]) if values else None
+    except (ValueError, TypeError):
+        return None
+
+
+def _stream_size(stream_info: StreamInfo) -> int:
+    """Approximate memory footprint of a cached stream entry."""
+    return 200 + len(stream_info.url) + len(stream_info.format) + len(stream_info.quality or "")
 
 
 class StreamExtractorService:
     """Service for extracting audio stream URLs using yt-dlp."""
     
-    # Cache duration: 5 hours (leave 1 hour buffer before YouTube expires)
-    CACHE_DURATION_SECONDS = 5 * 60 * 60
+    # Assumed URL lifetime when the URL has no expire parameter (~6 hours)
+    DEFAULT_URL_LIFETIME_SECONDS = 6 * 60 * 60
     
-    def __init__(self):
-        """Initialize yt-dlp options for audio extraction."""
+    def __init__(self, store: Optional[PersistentCache] = None):
+        """
+        Initialize yt-dlp options for audio extraction.
+        
+        Args:
+            store: Optional persistent cache shared with other workers
+        """
         self._ydl_opts = {
             'format': 'm4a/bestaudio/best',
             'quiet': True,
@@ -42,13 +80,32 @@ class StreamExtractorService:
             # Socket timeout
             'socket_timeout': 30,
         }
-        # Simple in-memory cache: video_id -> CachedStream
-        self._cache: Dict[str, CachedStream] = {}
+        # Reusable yt-dlp instances (extractor and signature caches stay warm)
+        self._ydl_pool = YoutubeDLPool(
+            self._ydl_opts,
+            size=settings.ydl_pool_size,
+            max_uses=settings.ydl_pool_max_uses
+        )
+        # Bounded LRU cache: video_id -> StreamInfo, expiring before the URL does
+        self._cache = TTLCache(
+            max_entries=settings.stream_cache_max_entries,
+            max_bytes=settings.stream_cache_max_bytes,
+            sizeof=_stream_size
+        )
+        self._store = store
+        # In-flight extractions keyed by video_id
+        self._inflight = SingleFlight()
+        # Videos extracted speculatively and not yet requested
+        self._prefetched = TTLCache(max_entries=settings.stream_cache_max_entries)
+        self._stats_lock = threading.Lock()
+        self._prefetches = 0
+        self._prefetch_hits = 0
     
     def get_stream_url(self, video_id: str) -> StreamInfo:
         """
         Extract direct audio stream URL for a video.
-        Uses cache if available and not expired.
+        Uses cache if available and not expired. Concurrent calls for the
+        same uncached video share a single extraction.
         
         Args:
             video_id: YouTube video ID (11 characters)
@@ -62,18 +119,87 @@ class StreamExtractorService:
         # Check cache first
         cached = self._cache.get(video_id)
         if cached:
-            age = time.time() - cached.created_at
-            if age < self.CACHE_DURATION_SECONDS:
-                return cached.stream_info
-            else:
-                # Expired, remove from cache
-                del self._cache[video_id]
+            if self._prefetched.pop(video_id) is not None:
+                with self._stats_lock:
+                    self._prefetch_hits += 1
+            return cached
         
-        # Extract fresh stream URL
+        with span("extract"):
+            return self._inflight.do(video_id, self._extract, video_id)
+    
+    def prefetch(self, video_id: str):
+        """
+        Extract a video speculatively, ahead of a likely request.
+        
+        Prefetches run in their own flights: a user request never joins one
+        and so never waits behind the prefetch pool and governor lane (it
+        may extract the same video in parallel instead). Only real
+        extractions count as prefetches; the first later request served
+        from the cache counts as a prefetch hit.
+        """
+        if self._cache.peek(video_id) is not None or self._inflight.running(video_id):
+            return
+        stream_info = self._inflight.do(("prefetch", video_id), self._prefetch_extract, video_id)
+        if stream_info is None:
+            return
+        self._prefetched.set(video_id, True, max(1.0, self._cache_ttl(stream_info)))
+        with self._stats_lock:
+            self._prefetches += 1
+    
+    def get_cached_stream(self, video_id: str) -> Optional[StreamInfo]:
+        """Get a cached stream without extracting or touching cache stats."""
+        return self._cache.peek(video_id)
+    
+    def invalidate(self, video_id: str):
+        """Drop a cached stream, e.g. after YouTube rejected its URL."""
+        self._cache.pop(video_id)
+        if self._store:
+            self._store.delete("stream", video_id)
+    
+    def _cache_ttl(self, stream_info: StreamInfo) -> float:
+        """Cache until shortly before YouTube expires the URL."""
+        return min(
+            stream_info.expires_at - time.time() - settings.stream_cache_expiry_margin,
+            settings.stream_cache_max_ttl
+        )
+    
+    def _load_stored(self, video_id: str) -> Optional[StreamInfo]:
+        """Get a stream extracted by any worker from the persistent cache."""
+        if not self._store:
+            return None
+        data = self._store.get("stream", video_id)
+        if not data:
+            return None
+        stream_info = StreamInfo(**data)
+        ttl = self._cache_ttl(stream_info)
+        if ttl <= 0:
+            return None
+        self._cache.set(video_id, stream_info, ttl)
+        return stream_info
+    
+    def _extract(self, video_id: str) -> StreamInfo:
+        """Run yt-dlp extraction for a video and cache the result."""
+        # A previous in-flight extraction may have just filled the cache
+        cached = self._cache.peek(video_id) or self._load_stored(video_id)
+        if cached:
+            return cached
+        return self._extract_uncached(video_id)
+    
+    def _prefetch_extract(self, video_id: str) -> Optional[StreamInfo]:
+        """Extract unless already cached here or by another worker (then None)."""
+        if self._cache.peek(video_id) or self._load_stored(video_id):
+            return None
+        return self._extract_uncached(video_id)
+    
+    def _extract_uncached(self, video_id: str) -> StreamInfo:
+        """Extract a fresh stream URL with yt-dlp and cache it."""
         url = f"https://music.youtube.com/watch?v={video_id}"
         
-        with yt_dlp.YoutubeDL(self._ydl_opts) as ydl:
-            info = ydl.extract_info(url, download=False)
+        # Wait for an upstream slot before tying up a pooled yt-dlp instance
+        youtube_governor.acquire()
+        with self._ydl_pool.acquire(timeout=settings.executor_extraction_timeout) as ydl:
+            with youtube_governor.observe(), upstream_call("yt-dlp", "extract_info"):
+                info = ydl.extract_info(url, download=False)
             
             # Get available formats
             formats = info.get('formats', [])
@@ -86,33 +212,60 @@ class StreamExtractorService:
             quality = audio_format.get('abr')
             quality_str = f"{int(quality)}kbps" if quality else None
             
+            expires_at = parse_url_expiry(audio_format['url'])
+            if expires_at is None:
+                expires_at = time.time() + self.DEFAULT_URL_LIFETIME_SECONDS
+            
             stream_info = StreamInfo(
                 url=audio_format['url'],
                 format=audio_format.get('ext', 'm4a'),
                 quality=quality_str,
+                expires_at=expires_at,
             )
             
-            # Cache the result
-            self._cache[video_id] = CachedStream(
-                stream_info=stream_info,
-                created_at=time.time()
-            )
-            
-            # Clean old cache entries periodically (keep max 100)
-            if len(self._cache) > 100:
-                self._cleanup_old_cache()
+            # Cache until shortly before YouTube expires the URL, so clients
+            # never get a URL that is about to stop working
+            ttl = self._cache_ttl(stream_info)
+            self._cache.set(video_id, stream_info, ttl)
+            if self._store:
+                self._store.set("stream", video_id, asdict(stream_info), ttl=ttl)
             
             return stream_info
     
-    def _cleanup_old_cache(self):
-        """Remove expired entries from cache."""
-        current_time = time.time()
-        expired_keys = [
-            k for k, v in self._cache.items()
-            if current_time - v.created_at > self.CACHE_DURATION_SECONDS
-        ]
-        for k in expired_keys:
-            del self._cache[k]
+    def warm_up(self):
+        """Pre-create the pooled yt-dlp instances."""
+        self._ydl_pool.warm()
+    
+    def close(self):
+        """Release pooled yt-dlp instances."""
+        self._ydl_pool.close()
+    
+    def stats(self) -> dict:
+        """
+        Cache, extraction and yt-dlp pool counters.
+        
+        "coalesced" counts requests that waited on an in-flight extraction
+        instead of running their own; "prefetch_hits" counts cache hits on
+        streams that were extracted speculatively (also in cache_hits).
+        """
+        cache = self._cache.stats()
+        inflight = self._inflight.stats()
+        with self._stats_lock:
+            prefetches, prefetch_hits = self._prefetches, self._prefetch_hits
+        return {
+            "cache_entries": cache["entries"],
+            "cache_bytes": cache["bytes"],
+            "cache_hits": cache["hits"],
+            "cache_misses": cache["misses"],
+            "cache_evictions": cache["evictions"],
+            "cache_expirations": cache["expirations"],
+            "extractions": inflight["executions"],
+            "coalesced": inflight["shared"],
+            "in_flight": inflight["in_flight"],
+            "prefetches": prefetches,
+            "prefetch_hits": prefetch_hits,
+            "ydl_pool": self._ydl_pool.stats(),
+        }
     
     def _get_best_audio_format(self, formats: list) -> Optional[dict]:
         """
@@ -148,5 +301,5 @@ class StreamExtractorService:
 
 
 # Singleton service instance
-stream_extractor_service = StreamExtractorService()
+stream_extractor_service = StreamExtractorService(store=persistent_cache)
 
@@ -0,0 +1,159 @@
+"""
+Speculative stream URL prefetch.
+After /related, /album and /playlist responses the first few tracks are
+extracted in the background, so skipping to the next track is a cache hit
+instead of a cold yt-dlp extraction. Prefetches run on their own low
+priority pool, are skipped while user extractions are queued, and share a
+global token-bucket budget so browsing cannot flood YouTube.
+"""
+import threading
+import time
+from typing import Callable, Iterable, Set
+
+from app.config import settings
+from app.services.executor import BlockingExecutor, blocking_executor
+from app.services.stream_extractor import StreamExtractorService, stream_extractor_service
+from app.utils.timing import detached
+
+
+class StreamPrefetcher:
+    """Schedules speculative extractions under a rate budget."""
+
+    def __init__(
+        self,
+        extractor: StreamExtractorService,
+        executor: BlockingExecutor,
+        tracks: int,
+        per_minute: float,
+        burst: int,
+        enabled: bool = True,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        """
+        Args:
+            extractor: Stream extractor whose cache is filled
+            executor: Executor with "prefetch" and "extraction" pools
+            tracks: Tracks prefetched per response
+            per_minute: Budget refill rate (extractions per minute, all responses)
+            burst: Budget capacity
+            enabled: When False nothing is scheduled
+            clock: Monotonic time source
+        """
+        self._extractor = extractor
+        self._executor = executor
+        self.tracks = tracks
+        self.per_minute = per_minute
+        self.burst = burst
+        self.enabled = enabled
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._tokens = float(burst)
+        self._refilled_at = clock()
+        self._pending: Set[str] = set()
+        self._scheduled = 0
+        self._throttled = 0
+        self._deferred = 0
+        self._failed = 0
+
+    @classmethod
+    def from_settings(cls) -> "StreamPrefetcher":
+        """Build the prefetcher from application settings."""
+        return cls(
+            stream_extractor_service,
+            blocking_executor,
+            tracks=settings.stream_prefetch_tracks,
+            per_minute=settings.stream_prefetch_per_minute,
+            burst=settings.stream_prefetch_burst,
+            enabled=settings.stream_prefetch_enabled
+        )
+
+    def _take_token(self) -> bool:
+        """Spend one unit of the rate budget (lock held)."""
+        now = self._clock()
+        self._tokens = min(
+            float(self.burst), self._tokens + (now - self._refilled_at) * self.per_minute / 60
+        )
+        self._refilled_at = now
+        if self._tokens < 1:
+            return False
+        self._tokens -= 1
+        return True
+
+    def schedule(self, video_ids: Iterable[str]) -> int:
+        """
+        Queue the first tracks of a response for background extraction.
+
+        Tracks already cached or pending are skipped. Nothing is queued while
+        user extractions are waiting for a worker.
+
+        Returns:
+            Number of extractions queued
+        """
+        if not self.enabled or self.tracks <= 0:
+            return 0
+        candidates = []
+        for video_id in video_ids:
+            if len(candidates) >= self.tracks:
+                break
+            if video_id and self._extractor.get_cached_stream(video_id) is None:
+                candidates.append(video_id)
+        if not candidates:
+            return 0
+        if self._executor.pool("extraction").stats()["queued"] > 0:
+            with self._lock:
+                self._deferred += 1
+            return 0
+
+        queued = []
+        with self._lock:
+            for video_id in candidates:
+                if video_id in self._pending:
+                    continue
+                if not self._take_token():
+                    self._throttled += 1
+                    break
+                self._pending.add(video_id)
+                self._scheduled += 1
+                queued.append(video_id)
+        for video_id in queued:
+            try:
+                with detached():
+                    self._executor.submit("prefetch", self._prefetch, video_id)
+            except RuntimeError:
+                # Executor shut down
+                with self._lock:
+                    self._pending.discard(video_id)
+        return len(queued)
+
+    def _prefetch(self, video_id: str):
+        try:
+            self._extractor.prefetch(video_id)
+        except Exception as e:
+            with self._lock:
+                self._failed += 1
+            print(f"Stream prefetch failed for {video_id}: {e}")
+        finally:
+            with self._lock:
+                self._pending.discard(video_id)
+
+    def stats(self) -> dict:
+        """
+        Scheduling counters.
+
+        "throttled" counts responses cut short by the rate budget,
+        "deferred" responses skipped because user extractions were queued.
+        Prefetch hits are in the stream extractor stats.
+        """
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "pending": len(self._pending),
+                "scheduled": self._scheduled,
+                "throttled": self._throttled,
+                "deferred": self._deferred,
+                "failed": self._failed,
+            }
+
+
+# Singleton prefetcher instance
+stream_prefetcher = StreamPrefetcher.from_settings()
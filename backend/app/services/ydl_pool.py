@@ -0,0 +1,186 @@
+"""
+Pool of long-lived yt-dlp instances.
+Reusing YoutubeDL objects keeps the extractor registry, cookie jar, HTTP
+opener and the player-JS / signature function caches warm between
+extractions instead of rebuilding them on every cache miss.
+"""
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator, Optional
+
+import yt_dlp
+
+
+class PoolExhaustedError(Exception):
+    """Raised when no yt-dlp instance becomes free within the wait timeout."""
+
+
+class _PooledInstance:
+    """A YoutubeDL instance and how often it has been used."""
+
+    def __init__(self, ydl):
+        self.ydl = ydl
+        self.uses = 0
+
+
+class YoutubeDLPool:
+    """
+    Thread-safe pool of YoutubeDL instances.
+
+    Each instance is used by one thread at a time. Instances are recycled
+    (closed and replaced) after max_uses extractions or when an extraction
+    raises, so a broken opener or stale session never sticks around.
+    """
+
+    def __init__(self, opts: dict, size: int, max_uses: int, factory: Optional[Callable] = None):
+        """
+        Args:
+            opts: yt-dlp options shared by every instance
+            size: Maximum number of instances
+            max_uses: Extractions per instance before it is replaced
+            factory: Instance constructor (default yt_dlp.YoutubeDL)
+        """
+        self._opts = opts
+        self.size = size
+        self.max_uses = max_uses
+        self._factory = factory
+        # LIFO keeps the most recently used (hottest) instances in rotation
+        self._idle: "queue.LifoQueue[_PooledInstance]" = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._total = 0  # live instances, idle + in use
+        self._in_use = 0
+        self._created = 0
+        self._recycled = 0
+        self._acquisitions = 0
+        self._waits = 0
+        self._total_wait_seconds = 0.0
+
+    def _create(self) -> _PooledInstance:
+        factory = self._factory or yt_dlp.YoutubeDL
+        ydl = factory(dict(self._opts))
+        with self._lock:
+            self._created += 1
+        return _PooledInstance(ydl)
+
+    def _close(self, instance: _PooledInstance):
+        close = getattr(instance.ydl, "close", None)
+        if close:
+            try:
+                close()
+            except Exception as e:
+                print(f"Error closing yt-dlp instance: {e}")
+
+    def warm(self, count: Optional[int] = None):
+        """
+        Create instances up front so the first requests skip initialization.
+
+        Args:
+            count: Number of instances to have ready (default: pool size)
+        """
+        target = min(self.size, count or self.size)
+        while True:
+            with self._lock:
+                if self._total >= target:
+                    return
+                self._total += 1
+            try:
+                instance = self._create()
+                # Instantiate the YouTube extractor now rather than on first use
+                instance.ydl.get_info_extractor("Youtube")
+            except Exception:
+                with self._lock:
+                    self._total -= 1
+                raise
+            self._idle.put(instance)
+
+    def _take(self, timeout: Optional[float]) -> _PooledInstance:
+        """Get an idle instance, create one if below size, or wait for one."""
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            can_create = self._total < self.size
+            if can_create:
+                self._total += 1
+        if can_create:
+            try:
+                return self._create()
+            except Exception:
+                with self._lock:
+                    self._total -= 1
+                raise
+
+        started = time.perf_counter()
+        try:
+            instance = self._idle.get(timeout=timeout)
+        except queue.Empty:
+            raise PoolExhaustedError(f"No yt-dlp instance free after {timeout}s") from None
+        with self._lock:
+            self._waits += 1
+            self._total_wait_seconds += time.perf_counter() - started
+        return instance
+
+    def _discard(self, instance: _PooledInstance):
+        with self._lock:
+            self._total -= 1
+            self._recycled += 1
+        self._close(instance)
+
+    @contextmanager
+    def acquire(self, timeout: Optional[float] = None) -> Iterator:
+        """
+        Borrow a YoutubeDL instance for one extraction.
+
+        Args:
+            timeout: Seconds to wait for a free instance (None waits forever)
+
+        Raises:
+            PoolExhaustedError: If no instance becomes free in time
+        """
+        instance = self._take(timeout)
+        with self._lock:
+            self._in_use += 1
+            self._acquisitions += 1
+        healthy = False
+        try:
+            yield instance.ydl
+            healthy = True
+        finally:
+            instance.uses += 1
+            with self._lock:
+                self._in_use -= 1
+            if healthy and instance.uses < self.max_uses:
+                self._idle.put(instance)
+            else:
+                self._discard(instance)
+
+    def close(self):
+        """Close every idle instance."""
+        while True:
+            try:
+                instance = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            with self._lock:
+                self._total -= 1
+            self._close(instance)
+
+    def stats(self) -> dict:
+        """Pool utilization counters."""
+        with self._lock:
+            return {
+                "size": self.size,
+                "instances": self._total,
+                "in_use": self._in_use,
+                "idle": self._idle.qsize(),
+                "utilization": self._in_use / self.size if self.size else 0.0,
+                "created": self._created,
+                "recycled": self._recycled,
+                "acquisitions": self._acquisitions,
+                "waits": self._waits,
+                "total_wait_seconds": self._total_wait_seconds,
+            }
@@ -2,25 +2,118 @@
 YouTube Music service using ytmusicapi.
 Handles search, metadata, lyrics, and related songs.
 """
+import logging
 import re
-from typing import List, Optional
-from ytmusicapi import YTMusic
+import threading
+import time
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from dataclasses import dataclass
+from typing import Any, Callable, List, Optional, Tuple
+
+import httpx
+
+from app.config import settings
 
 from app.models.song import Song
 from app.models.playlist import Playlist
 from app.models.album import Album
 from app.models.artist import Artist
 from app.models.lyrics import LyricsData, LyricsLine
+from app.services.executor import blocking_executor
+from app.services.http_client import http_client
+from app.services.persistent_cache import PersistentCache, persistent_cache
+from app.services.rate_governor import GovernedClient, lane, youtube_governor
+from app.services.response_cache import ResponseCache, cached_response, response_cache, stored_payload_max_age
+from app.services.ytmusic_fixtures import YTMUSIC_METHODS, create_ytmusic_client
+from app.utils.cache import TTLCache
+from app.utils.circuit_breaker import CircuitBreaker
+from app.utils.metrics import InstrumentedClient, upstream_call, upstream_duration
+from app.utils.singleflight import SingleFlight
+from app.utils.suggestion_index import SuggestionIndex, suggestion_key
 from app.utils.thumbnail import transform_thumbnail_url
+from app.utils.timing import detached, span
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class DownloadResult:
+    """A downloaded audio file and how it was produced."""
+    file_path: str
+    delivery: str  # "passthrough" | "remux" | "transcode"
+    source_codec: Optional[str] = None
 
 
 class YouTubeMusicService:
     """Service for interacting with YouTube Music API."""
     
-    def __init__(self):
-        """Initialize YTMusic client (unauthenticated)."""
-        self._client = YTMusic()
+    def __init__(
+        self,
+        store: Optional[PersistentCache] = None,
+        response_cache: Optional[ResponseCache] = None,
+        http: Optional[httpx.Client] = None,
+        client: Any = None
+    ):
+        """
+        Initialize YTMusic client (unauthenticated).
+        
+        Args:
+            store: Optional persistent cache for raw upstream payloads
+            response_cache: Optional cache for parsed search/browse results
+            http: HTTP client for LRCLIB (default: the shared pooled client)
+            client: YTMusic-compatible client (default: per ytmusic_mode,
+                live / recording / replaying)
+        """
+        # Governor outermost, so waiting for a slot isn't counted as upstream time
+        self._client = GovernedClient(
+            InstrumentedClient(client or create_ytmusic_client(), "ytmusic", YTMUSIC_METHODS),
+            youtube_governor,
+            YTMUSIC_METHODS
+        )
+        self._store = store
+        self._response_cache = response_cache
+        # Playable track count index: playlist_id -> count of tracks with a videoId
+        self._playable_counts = TTLCache(max_entries=settings.playlist_count_cache_entries)
+        self._count_lock = threading.Lock()
+        self._count_refreshing = set()
+        self._lyrics_inflight = SingleFlight()
+        # Autocomplete: prefix -> suggestions, plus coalescing of identical misses
+        self.suggestion_index = SuggestionIndex(
+            max_entries=settings.suggestion_index_max_entries,
+            ttl=settings.suggestion_index_ttl,
+            page_size=settings.suggestion_page_size,
+            enabled=settings.suggestion_index_enabled
+        )
+        self._suggestions_inflight = SingleFlight()
+        self._http = http or http_client
+        self.lrclib_breaker = CircuitBreaker(
+            "LRCLIB",
+            failure_threshold=settings.lrclib_breaker_threshold,
+            cooldown=settings.lrclib_breaker_cooldown
+        )
+    
+    def _cached_fetch(self, namespace: str, key: str, fetch: Callable[[], Any]) -> Any:
+        """
+        Get a raw upstream payload from the persistent cache, fetching and
+        storing it on a miss. Empty payloads are not cached.
+        
+        While the response cache loads a value, only payloads younger than
+        its TTL are used, and a stale refresh always goes upstream: an older
+        payload would hand the response cache data past its TTL and make
+        refreshes no-ops.
+        """
+        with span(f"fetch.{namespace}"):
+            if self._store:
+                max_age = stored_payload_max_age()
+                cached = self._store.get(namespace, key, max_age=max_age) if max_age != 0 else None
+                if cached is not None:
+                    return cached
+            data = fetch()
+            if self._store and data:
+                self._store.set(namespace, key, data)
+            return data
     
+    @cached_response("search", pool="search", normalize=("query",))
     def search_songs(self, query: str, limit: int = 20) -> List[Song]:
         """
         Search for songs on YouTube Music.
@@ -59,35 +152,82 @@ class YouTubeMusicService:
         """
         Get search suggestions for a query.
         
+        Served from the prefix index when possible; only misses go upstream.
+        Callers on the event loop use cached_search_suggestions first and
+        fetch_search_suggestions on a worker, so each request is looked up
+        in the index once.
+        
         Args:
             query: Partial search query
         
         Returns:
             List of suggestion strings
         """
+        cached = self.cached_search_suggestions(query)
+        if cached is not None:
+            return cached
+        return self.fetch_search_suggestions(query)
+    
+    def cached_search_suggestions(self, query: str) -> Optional[List[str]]:
+        """
+        Suggestions from the prefix index only (cheap enough for the event loop).
+        
+        Returns:
+            Indexed or derived suggestions, or None if upstream is needed
+        """
         if not query or len(query) < 2:
             return []
-        
+        return self.suggestion_index.lookup(query)
+    
+    def fetch_search_suggestions(self, query: str) -> List[str]:
+        """
+        Fetch suggestions upstream (no index lookup) and index them.
+        Identical concurrent fetches share one upstream call.
+        """
+        if not query or len(query) < 2:
+            return []
+        return self._suggestions_inflight.do(
+            suggestion_key(query), self._load_search_suggestions, query
+        )
+    
+    def _load_search_suggestions(self, query: str) -> List[str]:
         try:
-            results = self._client.get_search_suggestions(query)
+            with lane("suggest"):
+                results = self._client.get_search_suggestions(query)
             # Results is a list of suggestion strings
-            return results[:10]  # Limit to 10 suggestions
+            suggestions = results[:10]  # Limit to 10 suggestions
         except Exception:
             return []
+        self.suggestion_index.add(query, suggestions)
+        return suggestions
     
-    def search_playlists(self, query: str, limit: int = 10) -> List[Playlist]:
+    def search_playlists(
+        self,
+        query: str,
+        limit: int = 10,
+        exact_counts: Optional[bool] = None
+    ) -> List[Playlist]:
         """
         Search for playlists on YouTube Music.
-        Returns actual playable song count (excluding unavailable songs).
+        Returns playable song count (excluding unavailable songs) from the
+        playable-count index when known.
+        
+        On an index miss, "exact" mode fetches the playlists to count their
+        playable tracks before returning (up to the browse pool timeout, then
+        falling back to the upstream item count); "fast" mode returns YouTube Music's
+        own item count and fills the index in the background, so a follow-up
+        search gets the exact count.
         
         Args:
             query: Search query string
             limit: Maximum number of results (default 10)
+            exact_counts: Override PLAYLIST_COUNT_MODE (True = exact, False = fast)
         
         Returns:
-            List of Playlist objects with accurate song counts
+            List of Playlist objects
         """
-        from concurrent.futures import ThreadPoolExecutor, as_completed
+        if exact_counts is None:
+            exact_counts = settings.playlist_count_mode == "exact"
         
         results = self._client.search(query, filter="playlists", limit=limit)
         
@@ -109,46 +249,119 @@ class YouTubeMusicService:
                 "title": item.get("title", "Unknown Playlist"),
                 "description": item.get("description"),
                 "thumbnail_url": thumbnail_url,
-                "author": item.get("author", None)
+                "author": item.get("author", None),
+                "item_count": self._parse_item_count(item.get("itemCount"))
             })
         
-        # Fetch actual song counts concurrently
-        def get_playable_count(playlist_id: str) -> int:
-            try:
-                data = self._client.get_playlist(playlist_id)
-                # Count only tracks with valid videoId
-                count = sum(1 for t in data.get("tracks", []) if t.get("videoId"))
-                return count
-            except:
-                return 0
-        
         song_counts = {}
-        with ThreadPoolExecutor(max_workers=5) as executor:
-            future_to_id = {
-                executor.submit(get_playable_count, p["playlist_id"]): p["playlist_id"]
-                for p in playlist_data
+        missing = []
+        for data in playlist_data:
+            count = self._get_indexed_playable_count(data["playlist_id"])
+            if count is not None:
+                song_counts[data["playlist_id"]] = count
+            else:
+                missing.append(data["playlist_id"])
+        
+        if exact_counts:
+            # Count the misses concurrently on the shared browse pool
+            futures = {
+                pid: blocking_executor.submit("browse", self._fetch_playable_count, pid)
+                for pid in missing
             }
-            for future in as_completed(future_to_id):
-                pid = future_to_id[future]
+            # One deadline for all counts; a late count still fills the index
+            deadline = time.monotonic() + settings.executor_browse_timeout
+            for pid, future in futures.items():
                 try:
-                    song_counts[pid] = future.result()
-                except:
+                    song_counts[pid] = future.result(timeout=max(0.0, deadline - time.monotonic()))
+                except FutureTimeoutError:
+                    pass  # Falls back to the upstream item count
+                except Exception:
                     song_counts[pid] = 0
+        else:
+            for pid in missing:
+                self._schedule_playable_count(pid)
         
-        # Build playlist list with actual counts
+        # Build playlist list
         playlists = []
         for data in playlist_data:
+            song_count = song_counts.get(data["playlist_id"])
+            if song_count is None:
+                song_count = data["item_count"]
             playlists.append(Playlist(
                 playlist_id=data["playlist_id"],
                 title=data["title"],
                 description=data["description"],
                 thumbnail_url=data["thumbnail_url"],
-                song_count=song_counts.get(data["playlist_id"], 0),
+                song_count=song_count,
                 author=data["author"]
             ))
         
         return playlists
     
+    def _parse_item_count(self, item_count: Any) -> Optional[int]:
+        """Parse the upstream item count ("174", "1,204" or int); None if unknown."""
+        if isinstance(item_count, int):
+            return item_count
+        if isinstance(item_count, str):
+            digits = item_count.replace(",", "").split(" ")[0]
+            if digits.isdigit():
+                return int(digits)
+        return None
+    
+    def playable_count_stats(self) -> dict:
+        """Size and hit/miss/eviction counters of the in-memory playable count index."""
+        return self._playable_counts.stats()
+    
+    def _get_indexed_playable_count(self, playlist_id: str) -> Optional[int]:
+        """Get a known playable track count from memory or the persistent cache."""
+        count = self._playable_counts.get(playlist_id)
+        if count is None and self._store:
+            count = self._store.get("playlist_count", playlist_id)
+            if count is not None:
+                self._playable_counts.set(playlist_id, count, settings.playlist_count_ttl)
+        return count
+    
+    def _index_playable_count(self, playlist_id: str, count: int):
+        """Record a playlist's playable track count."""
+        self._playable_counts.set(playlist_id, count, settings.playlist_count_ttl)
+        if self._store:
+            self._store.set("playlist_count", playlist_id, count, ttl=settings.playlist_count_ttl)
+    
+    def _fetch_playable_count(self, playlist_id: str) -> int:
+        """Fetch a playlist and index its playable track count."""
+        data = self._cached_fetch(
+            "playlist", playlist_id, lambda: self._client.get_playlist(playlist_id)
+        )
+        # Count only tracks with valid videoId
+        count = sum(1 for t in (data or {}).get("tracks", []) if t.get("videoId"))
+        self._index_playable_count(playlist_id, count)
+        return count
+    
+    def _schedule_playable_count(self, playlist_id: str):
+        """Fill the playable-count index for a playlist in the background (once)."""
+        with self._count_lock:
+            if playlist_id in self._count_refreshing:
+                return
+            self._count_refreshing.add(playlist_id)
+        
+        def fill():
+            try:
+                self._fetch_playable_count(playlist_id)
+            except Exception as e:
+                logger.warning("Error counting playlist %s: %s", playlist_id, e)
+            finally:
+                with self._count_lock:
+                    self._count_refreshing.discard(playlist_id)
+        
+        try:
+            with detached(), lane("background"):
+                blocking_executor.submit("browse", fill)
+        except RuntimeError:
+            # Executor already shut down
+            with self._count_lock:
+                self._count_refreshing.discard(playlist_id)
+    
+    @cached_response("search", pool="search", normalize=("query",))
     def search_albums(self, query: str, limit: int = 10) -> List[Album]:
         """
         Search for albums on YouTube Music.
@@ -188,6 +401,7 @@ class YouTubeMusicService:
         
         return albums
     
+    @cached_response("search", pool="search", normalize=("query",))
     def search_artists(self, query: str, limit: int = 10) -> List[Artist]:
         """
         Search for artists on YouTube Music.
@@ -219,6 +433,7 @@ class YouTubeMusicService:
         
         return artists
     
+    @cached_response("album")
     def get_album(self, browse_id: str) -> Optional[dict]:
         """
         Get album details including all tracks.
@@ -230,7 +445,9 @@ class YouTubeMusicService:
             Dict with album info and songs, or None if not found
         """
         try:
-            data = self._client.get_album(browse_id)
+            data = self._cached_fetch(
+                "album", browse_id, lambda: self._client.get_album(browse_id)
+            )
             
             # Get thumbnail
             thumbnail_url = ""
@@ -281,6 +498,7 @@ class YouTubeMusicService:
             print(f"Error getting album: {e}")
             return None
     
+    @cached_response("artist")
     def get_artist(self, browse_id: str) -> Optional[dict]:
         """
         Get artist details including top songs and albums.
@@ -292,7 +510,9 @@ class YouTubeMusicService:
             Dict with artist info, songs, and albums, or None if not found
         """
         try:
-            data = self._client.get_artist(browse_id)
+            data = self._cached_fetch(
+                "artist", browse_id, lambda: self._client.get_artist(browse_id)
+            )
             
             # Get thumbnail
             thumbnail_url = ""
@@ -357,6 +577,7 @@ class YouTubeMusicService:
             print(f"Error getting artist: {e}")
             return None
     
+    @cached_response("playlist")
     def get_playlist(self, playlist_id: str) -> Optional[dict]:
         """
         Get playlist details including all songs.
@@ -368,7 +589,9 @@ class YouTubeMusicService:
             Dict with playlist info and songs, or None if not found
         """
         try:
-            data = self._client.get_playlist(playlist_id)
+            data = self._cached_fetch(
+                "playlist", playlist_id, lambda: self._client.get_playlist(playlist_id)
+            )
             
             # Get thumbnail
             thumbnail_url = ""
@@ -400,6 +623,8 @@ class YouTubeMusicService:
                     thumbnail_url=song_thumbnail
                 ))
             
+            self._index_playable_count(playlist_id, len(songs))
+            
             return {
                 "playlist_id": playlist_id,
                 "title": data.get("title", "Unknown Playlist"),
@@ -428,8 +653,9 @@ class YouTubeMusicService:
             Song metadata dict or None if not found
         """
         try:
-            data = self._client.get_song(video_id)
-            return data
+            return self._cached_fetch(
+                "song", video_id, lambda: self._client.get_song(video_id)
+            )
         except Exception:
             return None
     
@@ -494,120 +720,164 @@ class YouTubeMusicService:
         except Exception:
             return []
     
-    def get_lyrics(self, video_id: str) -> Optional[LyricsData]:
+    def get_lyrics(self, video_id: str, hints: Optional[dict] = None) -> Optional[LyricsData]:
         """
         Get lyrics for a song with timing information if available.
         Tries LRCLIB first for synced lyrics, then falls back to YouTube Music.
         
+        Results are cached persistently by video ID. "No lyrics" is cached
+        too, with a shorter TTL, so instrumentals stop re-querying LRCLIB;
+        lookups that hit an upstream error are not cached. Concurrent
+        lookups for the same video share one upstream pipeline.
+        
         Args:
             video_id: YouTube video ID
+            hints: Optional title/artist/duration_sec (see lyrics_hints). When
+                given, LRCLIB is queried without a watch-playlist round trip.
         
         Returns:
             LyricsData with structured lyrics or None
         """
-        # First, get song info from YouTube Music to get title/artist
-        try:
-            watch = self._client.get_watch_playlist(video_id)
-            if not watch or not watch.get("tracks"):
-                return None
-            
-            current_track = watch["tracks"][0]
-            title = current_track.get("title", "")
-            artist = self._get_artist_name(current_track)
-            duration_sec = self._parse_duration(current_track.get("length", "0:00"))
-            
-            # Try LRCLIB for synced lyrics
-            synced_lyrics = self._get_lrclib_lyrics(title, artist, duration_sec)
-            if synced_lyrics:
-                return synced_lyrics
-            
-            # Fallback to YouTube Music lyrics (usually plain text)
-            lyrics_id = watch.get("lyrics")
-            if lyrics_id:
-                lyrics_data = self._client.get_lyrics(lyrics_id)
-                raw_lyrics = lyrics_data.get("lyrics")
-                if raw_lyrics:
-                    # Parse as plain lyrics
-                    plain_lines = [
-                        line.strip() for line in raw_lyrics.split('\n') 
-                        if line.strip()
-                    ]
-                    lyrics_lines = [
-                        LyricsLine(text=line) for line in plain_lines
-                    ]
-                    
-                    return LyricsData(
-                        type="plain",
-                        lines=lyrics_lines,
-                        source="youtube_music"
-                    )
-            
+        cached = self.get_cached_lyrics(video_id)
+        if cached is not None:
+            return cached[0]
+        return self._lyrics_inflight.do(video_id, self._load_lyrics, video_id, hints)
+    
+    def get_cached_lyrics(self, video_id: str) -> Optional[tuple]:
+        """
+        Look up lyrics in the persistent cache only.
+        
+        Returns:
+            (LyricsData or None,) when cached - None inside means "no lyrics" -
+            or None on a cache miss
+        """
+        return self._get_cached_lyrics("lyrics", video_id)
+    
+    def lyrics_hints(self, metadata: Optional[dict]) -> Optional[dict]:
+        """
+        Build LRCLIB lookup hints from a get_song payload.
+        
+        Args:
+            metadata: Result of get_song_metadata
+        
+        Returns:
+            Dict with title, artist and duration_sec, or None if incomplete
+        """
+        details = (metadata or {}).get("videoDetails") or {}
+        title = details.get("title")
+        artist = details.get("author")
+        if not title or not artist:
             return None
+        # Auto-generated artist channels are named "<Artist> - Topic"
+        if artist.endswith(" - Topic"):
+            artist = artist[:-len(" - Topic")]
+        try:
+            duration_sec = int(details.get("lengthSeconds") or 0)
+        except (TypeError, ValueError):
+            duration_sec = 0
+        return {"title": title, "artist": artist, "duration_sec": duration_sec}
+    
+    def _load_lyrics(self, video_id: str, hints: Optional[dict]) -> Optional[LyricsData]:
+        """Fetch lyrics upstream and cache the result (single-flight leader)."""
+        try:
+            lyrics, complete = self._fetch_lyrics(video_id, hints)
         except Exception as e:
-            print(f"Lyrics error: {e}")
+            logger.warning("Lyrics error: %s", e)
             return None
+        
+        if lyrics or complete:
+            self._cache_lyrics("lyrics", video_id, lyrics)
+        return lyrics
     
-    def _get_lrclib_lyrics(self, title: str, artist: str, duration_sec: int) -> Optional[LyricsData]:
+    def _get_cached_lyrics(self, namespace: str, key: str) -> Optional[tuple]:
         """
-        Fetch synced lyrics from LRCLIB API.
+        Look up a cached lyrics result.
         
-        Args:
-            title: Song title
-            artist: Artist name
-            duration_sec: Song duration in seconds
+        Returns:
+            (LyricsData or None,) when cached - None inside means "no lyrics" -
+            or None on a cache miss
+        """
+        if not self._store:
+            return None
+        cached = self._store.get(namespace, key)
+        if cached is None:
+            return None
+        # Entries written before negative caching hold the LyricsData itself
+        lyrics = cached.get("lyrics") if "lyrics" in cached else cached
+        return (LyricsData.model_validate(lyrics) if lyrics else None,)
+    
+    def _cache_lyrics(self, namespace: str, key: str, lyrics: Optional[LyricsData]):
+        """Cache a lyrics result; misses use the shorter negative TTL."""
+        if not self._store:
+            return
+        ttl = settings.cache_ttl_lyrics if lyrics else settings.cache_ttl_lyrics_negative
+        self._store.set(
+            namespace, key, {"lyrics": lyrics.model_dump() if lyrics else None}, ttl=ttl
+        )
+    
+    def _fetch_lyrics(
+        self, video_id: str, hints: Optional[dict] = None
+    ) -> Tuple[Optional[LyricsData], bool]:
+        """
+        Look up lyrics upstream (LRCLIB, then YouTube Music).
+        
+        With hints the watch playlist is only fetched when LRCLIB has no
+        lyrics; if its track metadata differs from the hints (e.g. a music
+        video title), LRCLIB is retried with it before the YouTube Music
+        fallback.
         
         Returns:
-            LyricsData with synced lyrics or None
+            (lyrics, complete) - complete is False when LRCLIB could not be
+            queried, so a miss must not be cached as "no lyrics"
+        
+        Raises:
+            Exception: If YouTube Music fails
         """
-        import requests
-        import urllib.parse
+        complete = True
+        tried = set()
         
-        try:
-            # Try to get synced lyrics from LRCLIB
-            url = f"https://lrclib.net/api/get?artist_name={urllib.parse.quote(artist)}&track_name={urllib.parse.quote(title)}&duration={duration_sec}"
-            
-            headers = {"User-Agent": "YTMusic Personal App/1.0"}
-            response = requests.get(url, timeout=10, headers=headers)
-            if response.status_code != 200:
+        def try_lrclib(title: str, artist: str, duration_sec: int) -> Optional[LyricsData]:
+            nonlocal complete
+            key = self._lrclib_key(title, artist, duration_sec)
+            if key in tried:
                 return None
-            
-            data = response.json()
-            synced_lyrics = data.get("syncedLyrics")
-            
+            tried.add(key)
+            try:
+                return self._get_lrclib_lyrics(title, artist, duration_sec)
+            except Exception as e:
+                logger.warning("LRCLIB error: %s", e)
+                complete = False
+                return None
+        
+        # Try LRCLIB for synced lyrics straight from the song metadata
+        if hints:
+            synced_lyrics = try_lrclib(hints["title"], hints["artist"], hints["duration_sec"])
             if synced_lyrics:
-                # Parse LRC format: [mm:ss.xx] lyrics text
-                lrc_pattern = r'\[(\d{2}):(\d{2})\.(\d{2,3})\](.+)'
-                lines_with_time = re.findall(lrc_pattern, synced_lyrics)
-                
-                if lines_with_time:
-                    lyrics_lines = []
-                    for i, (minutes, seconds, ms, text) in enumerate(lines_with_time):
-                        start_ms = (int(minutes) * 60 + int(seconds)) * 1000 + int(ms.ljust(3, '0')[:3])
-                        
-                        # Calculate end time (start of next line or +5 seconds)
-                        if i < len(lines_with_time) - 1:
-                            next_min, next_sec, next_ms, _ = lines_with_time[i + 1]
-                            end_ms = (int(next_min) * 60 + int(next_sec)) * 1000 + int(next_ms.ljust(3, '0')[:3])
-                        else:
-                            end_ms = start_ms + 5000
-                        
-                        lyrics_lines.append(LyricsLine(
-                            text=text.strip(),
-                            start_time_ms=start_ms,
-                            end_time_ms=end_ms
-                        ))
-                    
-                    return LyricsData(
-                        type="synced",
-                        lines=lyrics_lines,
-                        source="lrclib"
-                    )
-            
-            # Try plain lyrics from LRCLIB if no synced
-            plain_lyrics = data.get("plainLyrics")
-            if plain_lyrics:
+                return synced_lyrics, True
+        
+        # Get song info from the watch playlist for title/artist and the lyrics ID
+        watch = self._client.get_watch_playlist(video_id)
+        if not watch or not watch.get("tracks"):
+            return None, complete
+        
+        current_track = watch["tracks"][0]
+        synced_lyrics = try_lrclib(
+            current_track.get("title", ""),
+            self._get_artist_name(current_track),
+            self._parse_duration(current_track.get("length", "0:00"))
+        )
+        if synced_lyrics:
+            return synced_lyrics, True
+        
+        # Fallback to YouTube Music lyrics (usually plain text)
+        lyrics_id = watch.get("lyrics")
+        if lyrics_id:
+            lyrics_data = self._client.get_lyrics(lyrics_id)
+            raw_lyrics = lyrics_data.get("lyrics")
+            if raw_lyrics:
+                # Parse as plain lyrics
                 plain_lines = [
-                    line.strip() for line in plain_lyrics.split('\n') 
+                    line.strip() for line in raw_lyrics.split('\n') 
                     if line.strip()
                 ]
                 lyrics_lines = [
@@ -617,13 +887,109 @@ class YouTubeMusicService:
                 return LyricsData(
                     type="plain",
                     lines=lyrics_lines,
+                    source="youtube_music"
+                ), True
+        
+        return None, complete
+    
+    def _lrclib_key(self, title: str, artist: str, duration_sec: int) -> str:
+        """Cache key for an LRCLIB lookup."""
+        return f"{' '.join(artist.split()).casefold()}|{' '.join(title.split()).casefold()}|{duration_sec}"
+    
+    def _get_lrclib_lyrics(self, title: str, artist: str, duration_sec: int) -> Optional[LyricsData]:
+        """
+        Fetch synced lyrics from LRCLIB API, cached by title/artist/duration.
+        
+        Args:
+            title: Song title
+            artist: Artist name
+            duration_sec: Song duration in seconds
+        
+        Returns:
+            LyricsData with synced lyrics or None
+        
+        Raises:
+            CircuitOpenError: If LRCLIB is being skipped after repeated failures
+            Exception: If LRCLIB is unreachable or returns an error status
+        """
+        key = self._lrclib_key(title, artist, duration_sec)
+        cached = self._get_cached_lyrics("lrclib", key)
+        if cached is not None:
+            return cached[0]
+        
+        # Try to get synced lyrics from LRCLIB
+        self.lrclib_breaker.check()
+        try:
+            with upstream_call("lrclib", "get"):
+                response = self._http.get(
+                    "https://lrclib.net/api/get",
+                    params={"artist_name": artist, "track_name": title, "duration": duration_sec}
+                )
+            if response.status_code == 404:
+                lyrics = None
+            elif response.status_code != 200:
+                raise Exception(f"LRCLIB returned HTTP {response.status_code}")
+            else:
+                lyrics = self._parse_lrclib_payload(response.json())
+        except Exception:
+            self.lrclib_breaker.record_failure()
+            raise
+        self.lrclib_breaker.record_success()
+        
+        self._cache_lyrics("lrclib", key, lyrics)
+        return lyrics
+    
+    def _parse_lrclib_payload(self, data: dict) -> Optional[LyricsData]:
+        """Parse an LRCLIB /api/get response into LyricsData."""
+        synced_lyrics = data.get("syncedLyrics")
+        
+        if synced_lyrics:
+            # Parse LRC format: [mm:ss.xx] lyrics text
+            lrc_pattern = r'\[(\d{2}):(\d{2})\.(\d{2,3})\](.+)'
+            lines_with_time = re.findall(lrc_pattern, synced_lyrics)
+            
+            if lines_with_time:
+                lyrics_lines = []
+                for i, (minutes, seconds, ms, text) in enumerate(lines_with_time):
+                    start_ms = (int(minutes) * 60 + int(seconds)) * 1000 + int(ms.ljust(3, '0')[:3])
+                    
+                    # Calculate end time (start of next line or +5 seconds)
+                    if i < len(lines_with_time) - 1:
+                        next_min, next_sec, next_ms, _ = lines_with_time[i + 1]
+                        end_ms = (int(next_min) * 60 + int(next_sec)) * 1000 + int(next_ms.ljust(3, '0')[:3])
+                    else:
+                        end_ms = start_ms + 5000
+                    
+                    lyrics_lines.append(LyricsLine(
+                        text=text.strip(),
+                        start_time_ms=start_ms,
+                        end_time_ms=end_ms
+                    ))
+                
+                return LyricsData(
+                    type="synced",
+                    lines=lyrics_lines,
                     source="lrclib"
                 )
+        
+        # Try plain lyrics from LRCLIB if no synced
+        plain_lyrics = data.get("plainLyrics")
+        if plain_lyrics:
+            plain_lines = [
+                line.strip() for line in plain_lyrics.split('\n') 
+                if line.strip()
+            ]
+            lyrics_lines = [
+                LyricsLine(text=line) for line in plain_lines
+            ]
             
-            return None
-        except Exception as e:
-            print(f"LRCLIB error: {e}")
-            return None
+            return LyricsData(
+                type="plain",
+                lines=lyrics_lines,
+                source="lrclib"
+            )
+        
+        return None
     
     def _parse_duration(self, duration_str: str) -> int:
         """Parse duration string (e.g., '3:45') to seconds."""
@@ -659,63 +1025,136 @@ class YouTubeMusicService:
         return None
 
 
-    def download_audio(self, video_id: str, quality: str = "best") -> Optional[str]:
+    def download_audio(
+        self,
+        video_id: str,
+        quality: str = "best",
+        progress_hook: Optional[Callable[[dict], None]] = None,
+        output_dir: Optional[str] = None,
+        codec: str = "m4a"
+    ) -> Optional[DownloadResult]:
         """
         Download audio for a song.
         
+        Format selection prefers a source already in the requested codec, so
+        it is kept as-is (or only remuxed by yt-dlp's container fixup);
+        FFmpeg re-encodes only when no such source exists.
+        
         Args:
             video_id: YouTube video ID
             quality: Audio quality (best, 128k, 256k)
+            progress_hook: Optional callback for yt-dlp download and
+                postprocessor progress updates, plus a {"status": "planned",
+                "delivery": ...} update once the format is chosen
+            output_dir: Directory for the file (default: a shared temp directory)
+            codec: Requested codec, "m4a" (AAC) or "opus"
             
         Returns:
-            Path to downloaded file or None
+            DownloadResult or None
         """
         import yt_dlp
+        from yt_dlp.postprocessor import FFmpegExtractAudioPP
         import tempfile
         import os
         
         try:
             # Create temp directory specific to our app
-            temp_dir = os.path.join(tempfile.gettempdir(), "ytmusic_downloads")
+            temp_dir = output_dir or os.path.join(tempfile.gettempdir(), "ytmusic_downloads")
             os.makedirs(temp_dir, exist_ok=True)
             
-            output_template = os.path.join(temp_dir, f"{video_id}.%(ext)s")
-            
-            # Map quality to format
-            # formats: bestaudio/best, or specific bitrate
-            if quality == "best":
-                format_spec = "bestaudio/best"
-            else:
-                # fallback to best if specific not found, but try to limit size?
-                # for now just use bestaudio which is usually opus/m4a
-                format_spec = "bestaudio/best"
+            # One file per video, quality and codec, so concurrent jobs never collide
+            output_template = os.path.join(temp_dir, f"{video_id}.{quality}.{codec}.%(ext)s")
             
             ydl_opts = {
-                'format': format_spec,
+                'format': self._download_format(quality, codec),
                 'outtmpl': output_template,
                 'quiet': True,
                 'no_warnings': True,
                 'extract_flat': False,
-                'postprocessors': [{
-                    'key': 'FFmpegExtractAudio',
-                    'preferredcodec': 'm4a', # m4a is widely supported on Android
-                    'preferredquality': '192',
-                }],
             }
+            ydl_opts['postprocessor_hooks'] = [self._postprocessor_timer()]
+            if progress_hook:
+                ydl_opts['progress_hooks'] = [progress_hook]
+                ydl_opts['postprocessor_hooks'].append(progress_hook)
             
             with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                info = ydl.extract_info(video_id, download=True)
-                filename = ydl.prepare_filename(info)
-                # FFmpeg converter changes extension to m4a
-                final_filename = os.path.splitext(filename)[0] + ".m4a"
+                # Pick the format first, then decide whether FFmpeg is needed
+                with youtube_governor.limit(), upstream_call("yt-dlp", "extract_info"):
+                    info = ydl.extract_info(video_id, download=False)
+                delivery = self._plan_delivery(info, codec)
+                if progress_hook:
+                    # Lets progressive readers know whether the download is the final file
+                    progress_hook({'status': 'planned', 'delivery': delivery})
+                if delivery == "transcode":
+                    ydl.add_post_processor(FFmpegExtractAudioPP(
+                        ydl,
+                        preferredcodec=codec,
+                        preferredquality=quality[:-1] if quality.endswith("k") else '192'
+                    ), when='post_process')
                 
-                if os.path.exists(final_filename):
-                    return final_filename
+                with upstream_call("yt-dlp", "download"):
+                    info = ydl.process_ie_result(info, download=True)
+                file_path = (info.get('requested_downloads') or [{}])[0].get('filepath')
+                
+                if file_path and os.path.exists(file_path):
+                    return DownloadResult(
+                        file_path=file_path,
+                        delivery=delivery,
+                        source_codec=info.get('acodec')
+                    )
                 
             return None
         except Exception as e:
-            print(f"Download error: {e}")
+            logger.warning("Download error for %s: %s", video_id, e)
             return None
+    
+    def _postprocessor_timer(self) -> Callable[[dict], None]:
+        """
+        yt-dlp postprocessor hook recording each step's duration (FFmpeg
+        ExtractAudio / FixupM4a, ...) under upstream="postprocessor".
+        """
+        started = {}
+        
+        def hook(update: dict):
+            name = update.get('postprocessor')
+            if update.get('status') == 'started':
+                started[name] = time.perf_counter()
+            elif update.get('status') == 'finished' and name in started:
+                upstream_duration.observe(time.perf_counter() - started.pop(name), "postprocessor", name)
+        
+        return hook
+    
+    def _download_format(self, quality: str, codec: str) -> str:
+        """
+        yt-dlp format spec preferring sources in the requested codec.
+        
+        128k / 256k cap the bitrate when such a source exists.
+        """
+        cap = f"[abr<={quality[:-1]}]" if quality in ("128k", "256k") else ""
+        same_codec = "[acodec^=mp4a]" if codec == "m4a" else "[acodec=opus]"
+        return "/".join([
+            f"bestaudio{same_codec}{cap}",
+            f"bestaudio{same_codec}",
+            f"bestaudio{cap}",
+            "bestaudio/best",
+        ])
+    
+    def _plan_delivery(self, info: dict, codec: str) -> str:
+        """
+        How the selected format becomes the requested codec.
+        
+        Returns:
+            "passthrough" (file used as downloaded), "remux" (stream copy
+            into a standard container) or "transcode" (re-encoded)
+        """
+        acodec = (info.get('acodec') or '').lower()
+        if codec == "m4a" and acodec.startswith('mp4a'):
+            # YouTube's DASH m4a gets yt-dlp's FixupM4a, a stream copy
+            return "remux" if info.get('container') == 'm4a_dash' else "passthrough"
+        if codec == "opus" and acodec == 'opus':
+            return "passthrough"
+        return "transcode"
+
 
 # Singleton service instance
-yt_music_service = YouTubeMusicService()
+yt_music_service = YouTubeMusicService(store=persistent_cache, response_cache=response_cache)
@@ -0,0 +1,185 @@
+"""
+Record / replay of raw ytmusicapi responses.
+
+RecordingYTMusic wraps a real YTMusic client and writes every response to a
+gzip-compressed JSON fixture together with the measured call latency.
+ReplayYTMusic serves those fixtures without touching the network, sleeping
+for the recorded (or a fixed) latency, so parsing and serialization of real
+payloads can be profiled offline and compared across versions.
+
+Selected with the ytmusic_mode setting ("live", "record" or "replay").
+"""
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from ytmusicapi import YTMusic
+
+from app.config import settings
+
+
+# YTMusic methods the service calls; everything else passes through
+YTMUSIC_METHODS = frozenset({
+    "search",
+    "get_search_suggestions",
+    "get_song",
+    "get_album",
+    "get_artist",
+    "get_playlist",
+    "get_watch_playlist",
+    "get_lyrics",
+})
+
+FIXTURE_SUFFIX = ".json.gz"
+
+
+class FixtureNotFound(LookupError):
+    """No recorded response for a replayed call."""
+
+
+def fixture_name(method: str, args: tuple, kwargs: dict) -> str:
+    """File name of a call's fixture: method plus a digest of its arguments."""
+    call = json.dumps([list(args), kwargs], sort_keys=True, ensure_ascii=False, default=str)
+    digest = hashlib.sha1(call.encode()).hexdigest()[:16]
+    return f"{method}-{digest}{FIXTURE_SUFFIX}"
+
+
+class RecordingYTMusic:
+    """YTMusic proxy writing each response to a fixture file."""
+
+    def __init__(self, client: Any, directory: str):
+        """
+        Args:
+            client: Real ytmusicapi.YTMusic instance
+            directory: Fixture directory (created if missing)
+        """
+        self._client = client
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._recorded = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._client, name)
+        if name not in YTMUSIC_METHODS:
+            return attr
+
+        def record(*args, **kwargs):
+            started = time.perf_counter()
+            response = attr(*args, **kwargs)
+            latency = time.perf_counter() - started
+            self._write(name, args, kwargs, latency, response)
+            return response
+
+        return record
+
+    def _write(self, method: str, args: tuple, kwargs: dict, latency: float, response: Any):
+        path = os.path.join(self.directory, fixture_name(method, args, kwargs))
+        fixture = {
+            "method": method,
+            "args": list(args),
+            "kwargs": kwargs,
+            "latency": latency,
+            "recorded_at": time.time(),
+            "response": response,
+        }
+        # Concurrent workers may record the same call: publish with a rename
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with gzip.open(temp_path, "wt", encoding="utf-8") as f:
+            json.dump(fixture, f, ensure_ascii=False, default=str)
+        os.replace(temp_path, path)
+        with self._lock:
+            self._recorded += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"mode": "record", "directory": self.directory, "recorded": self._recorded}
+
+
+class ReplayYTMusic:
+    """YTMusic stand-in serving recorded fixtures."""
+
+    def __init__(self, directory: str, latency: Optional[float] = None):
+        """
+        Args:
+            directory: Fixture directory written by RecordingYTMusic
+            latency: Seconds to sleep per call; None replays the recorded latency
+        """
+        self.directory = directory
+        self.latency = latency
+        self._lock = threading.Lock()
+        # Decompressed fixture bytes; each call decodes a fresh copy so
+        # callers can't mutate what later calls return
+        self._loaded: Dict[str, Tuple[bytes, float]] = {}
+        self._replayed = 0
+        self._missing = 0
+
+    def __getattr__(self, name: str) -> Any:
+        if name not in YTMUSIC_METHODS:
+            raise AttributeError(f"{type(self).__name__} does not replay {name!r}")
+
+        def replay(*args, **kwargs):
+            return self._replay(name, args, kwargs)
+
+        return replay
+
+    def _load(self, name: str) -> Optional[Tuple[bytes, float]]:
+        with self._lock:
+            loaded = self._loaded.get(name)
+        if loaded is not None:
+            return loaded
+        try:
+            with gzip.open(os.path.join(self.directory, name), "rb") as f:
+                fixture = json.loads(f.read())
+        except FileNotFoundError:
+            return None
+        loaded = (json.dumps(fixture["response"], ensure_ascii=False).encode(), fixture.get("latency", 0.0))
+        with self._lock:
+            self._loaded[name] = loaded
+        return loaded
+
+    def _replay(self, method: str, args: tuple, kwargs: dict) -> Any:
+        name = fixture_name(method, args, kwargs)
+        loaded = self._load(name)
+        if loaded is None:
+            with self._lock:
+                self._missing += 1
+            raise FixtureNotFound(f"No fixture for {method}{args!r} {kwargs!r} ({name})")
+        payload, recorded_latency = loaded
+        latency = recorded_latency if self.latency is None else self.latency
+        if latency > 0:
+            time.sleep(latency)
+        with self._lock:
+            self._replayed += 1
+        return json.loads(payload)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "mode": "replay",
+                "directory": self.directory,
+                "loaded": len(self._loaded),
+                "replayed": self._replayed,
+                "missing": self._missing,
+            }
+
+
+def create_ytmusic_client() -> Any:
+    """
+    YTMusic client for the configured ytmusic_mode.
+
+    Raises:
+        ValueError: If ytmusic_mode is not "live", "record" or "replay"
+    """
+    mode = settings.ytmusic_mode
+    if mode == "replay":
+        return ReplayYTMusic(settings.ytmusic_fixtures_dir, latency=settings.ytmusic_replay_latency)
+    if mode == "record":
+        return RecordingYTMusic(YTMusic(), settings.ytmusic_fixtures_dir)
+    if mode == "live":
+        return YTMusic()
+    raise ValueError(f"Unknown ytmusic_mode {mode!r} (expected live, record or replay)")
@@ -1,2 +1,8 @@
 # Utils package
 from .thumbnail import transform_thumbnail_url
+from .singleflight import SingleFlight
+from .cache import TTLCache
+from .suggestion_index import SuggestionIndex
+from .circuit_breaker import CircuitBreaker, CircuitOpenError
+from .json_response import FastJSONResponse, api_response
+from .metrics import metrics, upstream_call, InstrumentedClient
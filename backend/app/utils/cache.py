@@ -0,0 +1,193 @@
+"""
+In-memory cache utilities.
+Thread-safe LRU cache with per-entry expiry and entry/byte caps.
+"""
+import heapq
+import sys
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Hashable, List, Optional, Tuple
+
+
+@dataclass
+class _Entry:
+    """Cached value with its expiry timestamp and accounted size."""
+    value: Any
+    expires_at: float
+    size: int
+
+
+class TTLCache:
+    """
+    LRU cache where every entry carries its own expiry time.
+
+    Lookups are O(1): an expired entry is dropped when it is read. Expired
+    entries that are never read again are purged from a min-heap ordered by
+    expiry before falling back to LRU eviction, so the cache never holds
+    more than max_entries items or max_bytes of accounted size.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1000,
+        max_bytes: Optional[int] = None,
+        sizeof: Optional[Callable[[Any], int]] = None,
+        clock: Callable[[], float] = time.time
+    ):
+        """
+        Args:
+            max_entries: Maximum number of live entries
+            max_bytes: Optional cap on the total accounted size
+            sizeof: Size function for max_bytes accounting (default sys.getsizeof)
+            clock: Time source, overridable for tests
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._sizeof = sizeof or sys.getsizeof
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._data: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self._expiry_heap: List[Tuple[float, int, Hashable]] = []
+        self._heap_seq = 0
+        self._bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Get a live value, marking it most recently used."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self._misses += 1
+                return default
+            if entry.expires_at <= self._clock():
+                self._remove(key)
+                self._expirations += 1
+                self._misses += 1
+                return default
+            self._data.move_to_end(key)
+            self._hits += 1
+            return entry.value
+
+    def peek(self, key: Hashable, default: Any = None) -> Any:
+        """Get a live value without touching LRU order or hit counters."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry.expires_at <= self._clock():
+                return default
+            return entry.value
+
+    def expires_at(self, key: Hashable) -> Optional[float]:
+        """Expiry timestamp of a live entry, or None."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry.expires_at <= self._clock():
+                return None
+            return entry.expires_at
+
+    def set(self, key: Hashable, value: Any, ttl: float):
+        """
+        Store a value for ttl seconds.
+
+        Values with a non-positive ttl are not stored.
+        """
+        if ttl <= 0:
+            self.pop(key)
+            return
+        size = self._sizeof(value)
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            expires_at = self._clock() + ttl
+            self._data[key] = _Entry(value=value, expires_at=expires_at, size=size)
+            self._bytes += size
+            self._heap_seq += 1
+            heapq.heappush(self._expiry_heap, (expires_at, self._heap_seq, key))
+            self._enforce_limits()
+            self._compact_heap()
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """Remove an entry and return its value."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            self._remove(key)
+            return entry.value
+
+    def clear(self):
+        """Remove every entry."""
+        with self._lock:
+            self._data.clear()
+            self._expiry_heap.clear()
+            self._bytes = 0
+
+    def purge_expired(self) -> int:
+        """Drop every expired entry; returns the number removed."""
+        with self._lock:
+            return self._purge_expired()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.expires_at(key) is not None
+
+    def stats(self) -> dict:
+        """Size and hit/miss/eviction counters."""
+        with self._lock:
+            return {
+                "entries": len(self._data),
+                "bytes": self._bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "expirations": self._expirations,
+            }
+
+    def _remove(self, key: Hashable):
+        """Remove a key (lock held). Its heap record is discarded lazily."""
+        entry = self._data.pop(key)
+        self._bytes -= entry.size
+
+    def _purge_expired(self) -> int:
+        """Pop expired records off the expiry heap (lock held)."""
+        now = self._clock()
+        removed = 0
+        while self._expiry_heap and self._expiry_heap[0][0] <= now:
+            expires_at, _, key = heapq.heappop(self._expiry_heap)
+            entry = self._data.get(key)
+            # Skip heap records left behind by overwritten or removed keys
+            if entry is not None and entry.expires_at == expires_at:
+                self._remove(key)
+                self._expirations += 1
+                removed += 1
+        return removed
+
+    def _over_limit(self) -> bool:
+        if len(self._data) > self.max_entries:
+            return True
+        return self.max_bytes is not None and self._bytes > self.max_bytes
+
+    def _enforce_limits(self):
+        """Expire, then evict least recently used entries (lock held)."""
+        if not self._over_limit():
+            return
+        self._purge_expired()
+        while self._over_limit() and self._data:
+            key = next(iter(self._data))
+            self._remove(key)
+            self._evictions += 1
+
+    def _compact_heap(self):
+        """Drop heap records of overwritten or evicted keys (lock held)."""
+        if len(self._expiry_heap) > 2 * max(len(self._data), 16):
+            self._expiry_heap = [
+                record for record in self._expiry_heap
+                if record[2] in self._data and self._data[record[2]].expires_at == record[0]
+            ]
+            heapq.heapify(self._expiry_heap)
@@ -0,0 +1,115 @@
+"""
+Circuit breaker for flaky upstream services.
+After repeated failures calls are skipped for a cool-down window instead
+of each one waiting out the upstream timeout.
+"""
+import threading
+import time
+from typing import Callable
+
+
+class CircuitOpenError(Exception):
+    """Raised when a call is skipped because the circuit is open."""
+
+
+class CircuitBreaker:
+    """
+    Thread-safe closed / open / half-open circuit breaker.
+    
+    The circuit opens after failure_threshold consecutive failures. While
+    open, allow() returns False until cooldown seconds have passed; then a
+    single trial call is let through (half-open). Its success closes the
+    circuit, its failure re-opens it for another cool-down.
+    """
+    
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+    
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        cooldown: float = 60.0,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        """
+        Args:
+            name: Upstream name, used in error messages
+            failure_threshold: Consecutive failures before opening
+            cooldown: Seconds to skip calls once open
+            clock: Time source, overridable for tests
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._opened = 0
+        self._rejected = 0
+    
+    @property
+    def state(self) -> str:
+        """Current state, moving open to half-open once the cool-down is over."""
+        with self._lock:
+            return self._current_state()
+    
+    def _current_state(self) -> str:
+        if self._state == self.OPEN and self._clock() - self._opened_at >= self.cooldown:
+            self._state = self.HALF_OPEN
+            self._trial_in_flight = False
+        return self._state
+    
+    def allow(self) -> bool:
+        """Whether a call may go upstream now."""
+        with self._lock:
+            state = self._current_state()
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            self._rejected += 1
+            return False
+    
+    def check(self):
+        """
+        Raise unless a call may go upstream now.
+        
+        Raises:
+            CircuitOpenError: If the circuit is open
+        """
+        if not self.allow():
+            raise CircuitOpenError(f"{self.name} circuit is open, skipping call")
+    
+    def record_success(self):
+        """Close the circuit and reset the failure count."""
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._trial_in_flight = False
+    
+    def record_failure(self):
+        """Count a failure, opening the circuit at the threshold."""
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    self._opened += 1
+                self._state = self.OPEN
+                self._opened_at = self._clock()
+                self._trial_in_flight = False
+    
+    def stats(self) -> dict:
+        """State and counters."""
+        with self._lock:
+            return {
+                "state": self._current_state(),
+                "consecutive_failures": self._failures,
+                "opened": self._opened,
+                "rejected": self._rejected,
+            }
@@ -0,0 +1,39 @@
+"""
+Single-pass JSON responses.
+Routers build their pydantic models once and return them through
+api_response(); the whole envelope is then encoded in one pass by
+pydantic-core's Rust serializer. This skips the model_dump() dicts and the
+response_model re-validation FastAPI would otherwise run on every response.
+The bytes match the response_model output: compact separators, raw UTF-8,
+fields in declaration order.
+"""
+from typing import Any, Mapping, Optional
+
+import pydantic_core
+from starlette.responses import JSONResponse
+
+from app.utils.timing import span
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse encoded by pydantic-core; models are serialized natively."""
+
+    def render(self, content: Any) -> bytes:
+        # NaN / Infinity become null, as with pydantic's model serialization
+        with span("serialize"):
+            return pydantic_core.to_json(content, by_alias=True, inf_nan_mode="null")
+
+
+def api_response(
+    data: Any = None, status_code: int = 200, headers: Optional[Mapping[str, str]] = None
+) -> FastJSONResponse:
+    """
+    Success envelope ({"success": true, "data": ..., "error": null}).
+
+    Args:
+        data: Response data; pydantic models may be nested anywhere and are
+            serialized without a model_dump() copy
+    """
+    return FastJSONResponse(
+        {"success": True, "data": data, "error": None}, status_code=status_code, headers=headers
+    )
@@ -0,0 +1,87 @@
+"""
+Single-flight call deduplication.
+Concurrent calls sharing a key run the underlying function once; every
+caller gets the same result or error.
+"""
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+class _Call:
+    """An in-flight call that followers wait on."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """Thread-safe request coalescing keyed by an arbitrary hashable key."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self._executions = 0
+        self._shared = 0
+
+    def do(self, key: Hashable, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        Run fn once for all concurrent callers with the same key.
+
+        The first caller (leader) executes fn; callers arriving while it is
+        running block until it finishes and receive its result or exception.
+
+        Args:
+            key: Deduplication key (e.g. video ID)
+            fn: Function to execute
+
+        Returns:
+            Result of fn
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = _Call()
+                self._calls[key] = call
+                self._executions += 1
+                leader = True
+            else:
+                self._shared += 1
+                leader = False
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def running(self, key: Hashable) -> bool:
+        """Whether a call for this key is in flight."""
+        with self._lock:
+            return key in self._calls
+
+    def in_flight(self) -> int:
+        """Number of keys currently being executed."""
+        with self._lock:
+            return len(self._calls)
+
+    def stats(self) -> dict:
+        """Execution counters: shared calls are executions that were saved."""
+        with self._lock:
+            return {
+                "executions": self._executions,
+                "shared": self._shared,
+                "in_flight": len(self._calls),
+            }
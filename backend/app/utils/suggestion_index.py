@@ -0,0 +1,182 @@
+"""
+Prefix index of search suggestions for autocomplete.
+
+Upstream suggestion lists are stored under their normalized prefix, so a
+repeated prefix is a single dict lookup. A longer prefix that was never
+fetched can often be answered from a shorter one: when the shorter
+prefix's list was complete (shorter than a full upstream page, whose size
+is configured, so YouTube had no further completions), the suggestions for
+the longer prefix are exactly those that still start with it. Typing
+"lofi h" after "lofi" then costs no upstream call.
+
+Entries are evicted least frequently used first, with hit counts halved on
+every eviction pass so yesterday's popular prefixes don't stay forever.
+"""
+import heapq
+import re
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# Shortest prefix the service asks upstream for
+MIN_PREFIX = 2
+# Share of entries dropped per eviction pass
+EVICT_FRACTION = 0.1
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def suggestion_key(query: str) -> str:
+    """Index key: lowercase, runs of whitespace collapsed, trailing space kept."""
+    return _WHITESPACE.sub(" ", query.lower()).lstrip()
+
+
+@dataclass
+class _Entry:
+    """Suggestions of one prefix as (normalized, original) pairs."""
+    suggestions: Tuple[Tuple[str, str], ...]
+    expires_at: float
+    # Filtered from a complete list, so complete itself
+    derived: bool = False
+    hits: int = 0
+
+
+class SuggestionIndex:
+    """Thread-safe prefix -> suggestions index with LFU eviction."""
+
+    def __init__(
+        self,
+        max_entries: int = 20000,
+        ttl: float = 6 * 60 * 60,
+        page_size: int = 0,
+        enabled: bool = True,
+        clock: Callable[[], float] = time.time
+    ):
+        """
+        Args:
+            max_entries: Maximum number of indexed prefixes
+            ttl: Seconds a fetched list is served
+            page_size: Suggestions in a full upstream page; shorter lists are
+                complete and answer longer prefixes (0 = never derive)
+            enabled: When False every lookup misses and nothing is stored
+            clock: Time source, overridable for tests
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.page_size = page_size
+        self.enabled = enabled
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: Dict[str, _Entry] = {}
+        self._hits = 0
+        self._derived = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+
+    def lookup(self, query: str) -> Optional[List[str]]:
+        """
+        Suggestions for a prefix from the index.
+
+        Returns:
+            The indexed or derived suggestions, or None on a miss
+        """
+        if not self.enabled:
+            return None
+        key = suggestion_key(query)
+        now = self._clock()
+        with self._lock:
+            entry = self._live(key, now)
+            if entry is not None:
+                entry.hits += 1
+                self._hits += 1
+                return [original for _, original in entry.suggestions]
+            for end in range(len(key) - 1, MIN_PREFIX - 1, -1):
+                parent = self._live(key[:end], now)
+                if parent is None or not self._complete(parent):
+                    continue
+                parent.hits += 1
+                suggestions = tuple(pair for pair in parent.suggestions if pair[0].startswith(key))
+                # Index the derived list too; it can't outlive its source
+                self._store(key, _Entry(suggestions, parent.expires_at, derived=True, hits=1))
+                self._derived += 1
+                return [original for _, original in suggestions]
+            self._misses += 1
+            return None
+
+    def add(self, query: str, suggestions: Sequence[str]):
+        """Index an upstream suggestion list for a prefix."""
+        if not self.enabled:
+            return
+        key = suggestion_key(query)
+        pairs = tuple((suggestion_key(suggestion), suggestion) for suggestion in suggestions)
+        with self._lock:
+            previous = self._entries.get(key)
+            hits = previous.hits if previous is not None else 0
+            self._store(key, _Entry(pairs, self._clock() + self.ttl, hits=hits))
+
+    def clear(self):
+        """Remove every entry."""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        """Size and hit/derived/miss/eviction counters."""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self._hits,
+                "derived": self._derived,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "expirations": self._expirations,
+            }
+
+    def _live(self, key: str, now: float) -> Optional[_Entry]:
+        """Unexpired entry for a key, dropping an expired one (lock held)."""
+        entry = self._entries.get(key)
+        if entry is not None and entry.expires_at <= now:
+            del self._entries[key]
+            self._expirations += 1
+            return None
+        return entry
+
+    def _complete(self, entry: _Entry) -> bool:
+        """Whether an entry holds every completion of its prefix (lock held)."""
+        return entry.derived or len(entry.suggestions) < self.page_size
+
+    def _store(self, key: str, entry: _Entry):
+        """Insert an entry, evicting others if over the cap (lock held)."""
+        self._entries[key] = entry
+        if len(self._entries) > self.max_entries:
+            self._evict(keep=key)
+
+    def _evict(self, keep: str):
+        """
+        Drop expired entries, then the least used tenth, and age hit counts (lock held).
+
+        Freeing a tenth at once keeps the O(n) pass to one per tenth of
+        max_entries inserts; only the victims are ordered (a bounded heap,
+        not a sort of every entry).
+        """
+        now = self._clock()
+        for key in [key for key, entry in self._entries.items() if entry.expires_at <= now and key != keep]:
+            del self._entries[key]
+            self._expirations += 1
+        excess = len(self._entries) - self.max_entries
+        if excess > 0:
+            count = max(excess, int(self.max_entries * EVICT_FRACTION))
+            victims = heapq.nsmallest(
+                count,
+                (item for item in self._entries.items() if item[0] != keep),
+                key=lambda item: item[1].hits
+            )
+            for key, _ in victims:
+                del self._entries[key]
+                self._evictions += 1
+        for entry in self._entries.values():
+            entry.hits //= 2
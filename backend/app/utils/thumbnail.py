@@ -3,7 +3,10 @@ Thumbnail URL utilities for YouTube Music images.
 """
 import re
 
+from app.utils.timing import timed
 
+
+@timed("thumbnail")
 def transform_thumbnail_url(url: str, width: int = 800, height: int = 800) -> str:
     """
     Transform YouTube thumbnail URL to higher resolution.
@@ -0,0 +1,200 @@
+"""
+Per-request timing spans.
+
+A trace is started for each request (see app.middleware.TimingMiddleware)
+and carried in a context variable; blocking pools copy the context, so
+spans opened in worker threads nest under the span that submitted them.
+Outside a traced request every helper is a near no-op.
+
+    with span("fetch.album", cached=False):
+        ...
+
+    @timed("thumbnail")   # many small calls: counted and summed, no child spans
+    def transform(...): ...
+
+The finished trace renders as a Server-Timing header (exclusive time per
+phase) and as a span tree for the slow-request log.
+"""
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, TypeVar
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+# Server-Timing entries per response
+MAX_SERVER_TIMING_ENTRIES = 20
+
+
+class Span:
+    """A timed phase with nested phases and aggregated small calls."""
+
+    __slots__ = ("name", "attributes", "started", "duration", "children", "aggregates")
+
+    def __init__(self, name: str, attributes: Optional[dict] = None):
+        self.name = name
+        self.attributes = attributes or {}
+        self.started = time.perf_counter()
+        self.duration: Optional[float] = None
+        self.children: List["Span"] = []
+        # name -> [calls, total seconds]
+        self.aggregates: Dict[str, List[float]] = {}
+
+    def elapsed(self) -> float:
+        return self.duration if self.duration is not None else time.perf_counter() - self.started
+
+    def self_time(self) -> float:
+        """Time not spent in children or aggregated calls (0 if they overlapped)."""
+        nested = sum(child.elapsed() for child in self.children)
+        nested += sum(total for _, total in self.aggregates.values())
+        return max(0.0, self.elapsed() - nested)
+
+    def to_dict(self) -> dict:
+        data = {
+            "name": self.name,
+            "ms": round(self.elapsed() * 1000, 3),
+            "self_ms": round(self.self_time() * 1000, 3),
+        }
+        if self.attributes:
+            data["attributes"] = self.attributes
+        if self.aggregates:
+            data["aggregates"] = {
+                name: {"calls": int(calls), "ms": round(total * 1000, 3)}
+                for name, (calls, total) in self.aggregates.items()
+            }
+        if self.children:
+            data["children"] = [child.to_dict() for child in self.children]
+        return data
+
+
+class Trace:
+    """Span tree of one request."""
+
+    def __init__(self, name: str, attributes: Optional[dict] = None):
+        self.root = Span(name, attributes)
+        self.closed = False
+        # Spans are added from worker threads as well as the event loop
+        self.lock = threading.Lock()
+
+    def close(self):
+        """Stop recording; spans of work still running are dropped."""
+        self.root.duration = self.root.elapsed()
+        self.closed = True
+
+    def to_dict(self) -> dict:
+        with self.lock:
+            return self.root.to_dict()
+
+    def phases(self) -> List[Tuple[str, int, float]]:
+        """(name, calls, exclusive seconds) per phase, in first-seen order."""
+        totals: Dict[str, List[float]] = {}
+
+        def add(name: str, calls: float, seconds: float):
+            entry = totals.setdefault(name, [0, 0.0])
+            entry[0] += calls
+            entry[1] += seconds
+
+        with self.lock:
+            stack = list(reversed(self.root.children))
+            while stack:
+                current = stack.pop()
+                add(current.name, 1, current.self_time())
+                for name, (calls, total) in current.aggregates.items():
+                    add(name, calls, total)
+                stack.extend(reversed(current.children))
+            for name, (calls, total) in self.root.aggregates.items():
+                add(name, calls, total)
+        return [(name, int(calls), seconds) for name, (calls, seconds) in totals.items()]
+
+    def server_timing(self) -> str:
+        """Server-Timing header value: exclusive time per phase plus the total."""
+        entries = []
+        for name, calls, seconds in self.phases()[:MAX_SERVER_TIMING_ENTRIES]:
+            desc = f';desc="{calls} calls"' if calls > 1 else ""
+            entries.append(f"{name}{desc};dur={seconds * 1000:.1f}")
+        entries.append(f"total;dur={self.root.elapsed() * 1000:.1f}")
+        return ", ".join(entries)
+
+
+_current: ContextVar[Optional[Tuple[Trace, Span]]] = ContextVar("timing_span", default=None)
+
+
+def start_trace(name: str, **attributes: Any) -> Tuple[Trace, Any]:
+    """
+    Start a trace in the current context.
+
+    Returns:
+        (trace, token); pass the token to end_trace
+    """
+    trace = Trace(name, attributes)
+    return trace, _current.set((trace, trace.root))
+
+
+def end_trace(trace: Trace, token: Any):
+    trace.close()
+    _current.reset(token)
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Optional[Span]]:
+    """Time a phase as a child of the current span (no-op when untraced)."""
+    current = _current.get()
+    if current is None or current[0].closed:
+        yield None
+        return
+    trace, parent = current
+    child = Span(name, attributes)
+    with trace.lock:
+        parent.children.append(child)
+    token = _current.set((trace, child))
+    try:
+        yield child
+    finally:
+        child.duration = time.perf_counter() - child.started
+        _current.reset(token)
+
+
+def record(name: str, seconds: float):
+    """Add one call of `seconds` to the current span's aggregate `name`."""
+    current = _current.get()
+    if current is None or current[0].closed:
+        return
+    trace, parent = current
+    with trace.lock:
+        entry = parent.aggregates.get(name)
+        if entry is None:
+            parent.aggregates[name] = [1, seconds]
+        else:
+            entry[0] += 1
+            entry[1] += seconds
+
+
+def timed(name: str) -> Callable[[F], F]:
+    """Aggregate a frequently called function's time into the current span."""
+    def decorator(fn: F) -> F:
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if _current.get() is None:
+                return fn(*args, **kwargs)
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                record(name, time.perf_counter() - started)
+        return wrapper
+    return decorator
+
+
+@contextmanager
+def detached() -> Iterator[None]:
+    """
+    Don't record work scheduled in this block in the current request
+    (background refreshes and prefetches outlive the request).
+    """
+    token = _current.set(None)
+    try:
+        yield
+    finally:
+        _current.reset(token)
@@ -0,0 +1,253 @@
+"""
+Offline endpoint benchmark.
+
+Drives every API endpoint in-process (httpx over ASGI, no sockets) against
+the deterministic upstream stubs in benchmarks/stubs.py, at increasing
+concurrency, and writes throughput, p50/p95/p99 latency and RSS per
+endpoint and concurrency level to a JSON file.
+
+Usage (from backend/):
+    python -m benchmarks.bench_endpoints
+    python -m benchmarks.bench_endpoints --concurrency 1,8,32 --requests 300 --latency 0.02
+    python -m benchmarks.bench_endpoints --compare benchmarks/results/endpoints-<commit>.json
+
+--keys sets how many distinct IDs / queries each endpoint cycles through
+(0 = a new one per request, i.e. every request misses the caches).
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import asdict
+from typing import Callable, Dict, List, Optional
+
+# Keep caches and downloads out of the working tree; must precede app imports
+_data_dir = tempfile.mkdtemp(prefix="ytmusic-bench-")
+os.environ.setdefault("CACHE_DB_PATH", os.path.join(_data_dir, "cache.sqlite3"))
+os.environ.setdefault("AUDIO_CACHE_DIR", os.path.join(_data_dir, "audio"))
+
+import httpx  # noqa: E402
+
+from benchmarks import stubs  # noqa: E402
+
+
+# Endpoint name -> builds (method, path, json body) for the n-th key
+RequestFactory = Callable[[int], tuple]
+
+
+def _video_id(n: int) -> str:
+    return f"v{n:010d}"
+
+
+ENDPOINTS: Dict[str, RequestFactory] = {
+    "health": lambda n: ("GET", "/health", None),
+    "search": lambda n: ("GET", f"/api/v1/search?q=query+{n}", None),
+    "search_songs": lambda n: ("GET", f"/api/v1/search?q=query+{n}&type=songs", None),
+    "suggestions": lambda n: ("GET", f"/api/v1/search/suggestions?q=query+{n}", None),
+    "metadata": lambda n: ("GET", f"/api/v1/metadata/{_video_id(n)}", None),
+    "lyrics": lambda n: ("GET", f"/api/v1/lyrics/{_video_id(n)}", None),
+    "related": lambda n: ("GET", f"/api/v1/related/{_video_id(n)}", None),
+    "album": lambda n: ("GET", f"/api/v1/album/MPREb{n:08d}", None),
+    "playlist": lambda n: ("GET", f"/api/v1/playlist/VLPL{n:08d}", None),
+    "artist": lambda n: ("GET", f"/api/v1/artist/UC{n:08d}", None),
+    "stream": lambda n: ("GET", f"/api/v1/stream/{_video_id(n)}", None),
+    "stream_batch": lambda n: (
+        "POST", "/api/v1/stream/batch", {"video_ids": [_video_id(n * 5 + i) for i in range(5)]}
+    ),
+    "stream_audio": lambda n: ("GET", f"/api/v1/stream/{_video_id(n)}/audio", None),
+    "download": lambda n: ("GET", f"/api/v1/download/{_video_id(n)}", None),
+}
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def rss_bytes() -> Dict[str, Optional[int]]:
+    """Current and peak resident set size of this process."""
+    current = peak = None
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    current = int(line.split()[1]) * 1024
+                elif line.startswith("VmHWM:"):
+                    peak = int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    if peak is None:
+        try:
+            import resource
+            peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            # kilobytes on Linux, bytes on macOS
+            peak = peak if sys.platform == "darwin" else peak * 1024
+        except ImportError:
+            pass
+    return {"rss_bytes": current, "peak_rss_bytes": peak}
+
+
+async def run_level(
+    client: httpx.AsyncClient, factory: RequestFactory, concurrency: int, requests: int, keys: int, offset: int
+) -> dict:
+    """Send `requests` requests with `concurrency` in flight; collect latencies."""
+    latencies: List[float] = []
+    errors = 0
+    counter = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for i in counter:
+            key = offset + (i % keys if keys else i)
+            method, path, body = factory(key)
+            started = time.perf_counter()
+            try:
+                response = await client.request(method, path, json=body)
+                if response.status_code >= 400:
+                    errors += 1
+            except Exception:
+                errors += 1
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "concurrency": concurrency,
+        "requests": requests,
+        "errors": errors,
+        "seconds": elapsed,
+        "throughput_rps": requests / elapsed if elapsed else 0.0,
+        "latency_ms": {
+            "p50": percentile(latencies, 50) * 1000,
+            "p95": percentile(latencies, 95) * 1000,
+            "p99": percentile(latencies, 99) * 1000,
+            "mean": sum(latencies) / len(latencies) * 1000 if latencies else 0.0,
+            "max": latencies[-1] * 1000 if latencies else 0.0,
+        },
+        **rss_bytes(),
+    }
+
+
+async def run_suite(
+    endpoints: List[str], levels: List[int], requests: int, keys: int, profile: stubs.UpstreamProfile
+) -> List[dict]:
+    """Benchmark each endpoint at each concurrency level against the stubs."""
+    from app.main import app
+
+    restore = stubs.install(profile)
+    results = []
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+            for index, name in enumerate(endpoints):
+                for level in levels:
+                    # Fresh key range per endpoint/level: earlier levels don't warm later ones
+                    offset = (index * len(levels) + levels.index(level)) * 1_000_000
+                    result = await run_level(client, ENDPOINTS[name], level, requests, keys, offset)
+                    result["endpoint"] = name
+                    results.append(result)
+                    latency = result["latency_ms"]
+                    print(
+                        f"{name:<14}c={level:<4}{result['throughput_rps']:>9.1f} req/s"
+                        f"  p50 {latency['p50']:>8.1f}  p95 {latency['p95']:>8.1f}"
+                        f"  p99 {latency['p99']:>8.1f} ms  errors {result['errors']}",
+                        flush=True
+                    )
+    finally:
+        restore()
+    return results
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: List[dict], baseline_path: str):
+    """Print throughput and p95 changes against an earlier results file."""
+    with open(baseline_path) as f:
+        baseline = {(r["endpoint"], r["concurrency"]): r for r in json.load(f)["results"]}
+    print(f"\n{'endpoint':<14}{'c':>4}{'req/s':>16}{'p95 ms':>20}")
+    for result in results:
+        before = baseline.get((result["endpoint"], result["concurrency"]))
+        if not before:
+            continue
+        rps_change = (result["throughput_rps"] / before["throughput_rps"] - 1) * 100 if before["throughput_rps"] else 0
+        p95_before = before["latency_ms"]["p95"]
+        p95_change = (result["latency_ms"]["p95"] / p95_before - 1) * 100 if p95_before else 0
+        print(
+            f"{result['endpoint']:<14}{result['concurrency']:>4}"
+            f"{result['throughput_rps']:>9.1f} {rps_change:>+5.0f}%"
+            f"{result['latency_ms']['p95']:>13.1f} {p95_change:>+5.0f}%"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline endpoint benchmark against upstream stubs")
+    parser.add_argument("--endpoints", default=",".join(ENDPOINTS), help="Comma-separated endpoint names")
+    parser.add_argument("--concurrency", default="1,4,16,64", help="Comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per endpoint and level")
+    parser.add_argument("--keys", type=int, default=50, help="Distinct IDs per endpoint (0 = all distinct)")
+    parser.add_argument("--latency", type=float, default=0.05, help="Upstream API latency (seconds)")
+    parser.add_argument("--extraction-latency", type=float, default=0.2, help="yt-dlp latency (seconds)")
+    parser.add_argument("--payload-size", type=int, default=20, help="Tracks per upstream list")
+    parser.add_argument("--audio-bytes", type=int, default=512 * 1024, help="Bytes per relayed/downloaded file")
+    parser.add_argument("--output", help="Results file (default benchmarks/results/endpoints-<commit>.json)")
+    parser.add_argument("--compare", help="Earlier results file to compare against")
+    args = parser.parse_args()
+
+    endpoints = [name for name in args.endpoints.split(",") if name]
+    unknown = [name for name in endpoints if name not in ENDPOINTS]
+    if unknown:
+        parser.error(f"Unknown endpoints: {', '.join(unknown)} (known: {', '.join(ENDPOINTS)})")
+    levels = [int(level) for level in args.concurrency.split(",")]
+    profile = stubs.UpstreamProfile(
+        latency=args.latency,
+        extraction_latency=args.extraction_latency,
+        payload_size=args.payload_size,
+        audio_bytes=args.audio_bytes
+    )
+
+    results = asyncio.run(run_suite(endpoints, levels, args.requests, args.keys, profile))
+
+    commit = git_commit()
+    output = args.output or os.path.join(
+        os.path.dirname(__file__), "results", f"endpoints-{commit or int(time.time())}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump({
+            "meta": {
+                "commit": commit,
+                "timestamp": time.time(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "requests": args.requests,
+                "keys": args.keys,
+                "profile": asdict(profile),
+            },
+            "results": results,
+        }, f, indent=2)
+    print(f"\nResults written to {output}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
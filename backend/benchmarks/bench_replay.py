@@ -0,0 +1,146 @@
+"""
+Parse + serialize cost of recorded upstream payloads.
+
+Replays every fixture recorded with YTMUSIC_MODE=record through the
+YouTubeMusicService method that issued it (no latency, no caches) and times
+the service's parsing and the api_response() encoding separately, so
+changes to either can be compared across versions on real, large payloads
+(e.g. 1000+ track playlists).
+
+Usage (from backend/):
+    python -m benchmarks.bench_replay [--fixtures data/fixtures/ytmusic] [--iterations 50]
+    python -m benchmarks.bench_replay --compare benchmarks/results/replay-<commit>.json
+"""
+import argparse
+import gzip
+import json
+import os
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from app.config import settings
+from app.services.youtube_music import YouTubeMusicService
+from app.services.ytmusic_fixtures import FIXTURE_SUFFIX, ReplayYTMusic
+from app.utils.json_response import api_response
+from benchmarks.bench_endpoints import git_commit
+
+SEARCH_METHODS = {
+    "songs": "search_songs",
+    "playlists": "search_playlists",
+    "albums": "search_albums",
+    "artists": "search_artists",
+}
+
+
+def service_call(service: YouTubeMusicService, fixture: dict) -> Optional[Callable[[], Any]]:
+    """The service call that issues a fixture's upstream request (None if not replayable)."""
+    method, args, kwargs = fixture["method"], fixture["args"], fixture["kwargs"]
+    if method == "search":
+        name = SEARCH_METHODS.get(kwargs.get("filter"))
+        if not name:
+            return None
+        return lambda: getattr(service, name)(args[0], limit=kwargs.get("limit"))
+    calls = {
+        "get_search_suggestions": service.get_search_suggestions,
+        "get_song": service.get_song_metadata,
+        "get_album": service.get_album,
+        "get_artist": service.get_artist,
+        "get_playlist": service.get_playlist,
+        "get_watch_playlist": service.get_related_songs,
+    }
+    # Lyrics go through LRCLIB first; not replayable offline
+    call = calls.get(method)
+    return (lambda: call(*args)) if call else None
+
+
+def time_call(fn: Callable[[], Any], iterations: int) -> float:
+    """Mean seconds per call."""
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - started) / iterations
+
+
+def run(directory: str, iterations: int) -> List[dict]:
+    service = YouTubeMusicService(client=ReplayYTMusic(directory, latency=0))
+    # No background playlist counting while timing
+    service._schedule_playable_count = lambda playlist_id: None
+    results = []
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith(FIXTURE_SUFFIX):
+            continue
+        path = os.path.join(directory, name)
+        with gzip.open(path, "rb") as f:
+            raw = f.read()
+        fixture = json.loads(raw)
+        call = service_call(service, fixture)
+        if call is None:
+            continue
+        result = call()  # warm-up, also loads the fixture
+        body = api_response(result).body
+        parse = time_call(call, iterations)
+        serialize = time_call(lambda: api_response(result).body, iterations)
+        results.append({
+            "fixture": name,
+            "method": fixture["method"],
+            "args": fixture["args"],
+            "payload_bytes": len(raw),
+            "response_bytes": len(body),
+            "recorded_latency_ms": fixture.get("latency", 0.0) * 1000,
+            "parse_ms": parse * 1000,
+            "serialize_ms": serialize * 1000,
+        })
+        print(
+            f"{fixture['method']:<24}{str(fixture['args'][:1])[:28]:<30}{len(raw) / 1024:>9.1f} KB"
+            f"  parse {parse * 1000:>8.3f} ms  serialize {serialize * 1000:>8.3f} ms",
+            flush=True
+        )
+    return results
+
+
+def compare(results: List[dict], baseline_path: str):
+    """Print parse/serialize changes against an earlier results file."""
+    with open(baseline_path) as f:
+        baseline: Dict[str, dict] = {r["fixture"]: r for r in json.load(f)["results"]}
+    print(f"\n{'method':<24}{'parse ms':>20}{'serialize ms':>24}")
+    for result in results:
+        before = baseline.get(result["fixture"])
+        if not before:
+            continue
+        changes = []
+        for key in ("parse_ms", "serialize_ms"):
+            change = (result[key] / before[key] - 1) * 100 if before[key] else 0
+            changes.append(f"{result[key]:>13.3f} {change:>+5.0f}%")
+        print(f"{result['method']:<24}" + "    ".join(changes))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parse/serialize cost of recorded YTMusic payloads")
+    parser.add_argument("--fixtures", default=settings.ytmusic_fixtures_dir, help="Fixture directory")
+    parser.add_argument("--iterations", type=int, default=50, help="Timed calls per fixture")
+    parser.add_argument("--output", help="Results file (default benchmarks/results/replay-<commit>.json)")
+    parser.add_argument("--compare", help="Earlier results file to compare against")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.fixtures):
+        parser.error(f"No fixtures in {args.fixtures}; record some with YTMUSIC_MODE=record")
+    results = run(args.fixtures, args.iterations)
+
+    commit = git_commit()
+    output = args.output or os.path.join(
+        os.path.dirname(__file__), "results", f"replay-{commit or int(time.time())}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump({
+            "meta": {"commit": commit, "timestamp": time.time(), "iterations": args.iterations},
+            "results": results,
+        }, f, indent=2)
+    print(f"\nResults written to {output}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""
+Serialization CPU per endpoint: the old model_dump() + response_model path
+against the single-pass api_response() path.
+
+Usage (from backend/):
+    python -m benchmarks.bench_serialization [--iterations 2000]
+
+"before" reproduces what each router returned before and what FastAPI then
+did with it: dump every model to a dict, dump the ApiResponse envelope
+again, re-validate it against the declared response_model and serialize
+that. "after" is the api_response() body. Both outputs are checked to be
+byte-identical before timing.
+"""
+import argparse
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+from pydantic import TypeAdapter
+
+from app.models.album import Album
+from app.models.artist import Artist
+from app.models.lyrics import LyricsData, LyricsLine
+from app.models.playlist import Playlist
+from app.models.response import ApiResponse
+from app.models.song import MetadataResponse, SearchMeta, Song, UnifiedSearchResponse
+from app.utils.json_response import api_response
+
+
+def make_songs(count: int) -> List[Song]:
+    return [
+        Song(
+            video_id=f"v{i:010d}",
+            title=f"Lagu nomor {i} – Überlänge (Remastered)",
+            artist=f"Artist {i % 7}",
+            artist_id=f"UC{i:022d}",
+            album=f"Album {i % 3}" if i % 4 else None,
+            duration_text=f"{3 + i % 3}:{i % 60:02d}",
+            thumbnail_url=f"https://lh3.googleusercontent.com/thumb{i}=w800-h800-l90-rj"
+        )
+        for i in range(count)
+    ]
+
+
+def make_search() -> UnifiedSearchResponse:
+    return UnifiedSearchResponse(
+        songs=make_songs(20),
+        playlists=[
+            Playlist(playlist_id=f"PL{i}", title=f"Playlist {i}", thumbnail_url="https://x/p.jpg",
+                     song_count=40 + i, author="YouTube Music")
+            for i in range(5)
+        ],
+        albums=[
+            Album(browse_id=f"MPREb{i}", title=f"Album {i}", artist="Artist", thumbnail_url="https://x/a.jpg",
+                  year="2024")
+            for i in range(5)
+        ],
+        artists=[
+            Artist(browse_id=f"UC{i}", name=f"Artist {i}", thumbnail_url="https://x/r.jpg", subscribers="1.2M")
+            for i in range(2)
+        ],
+        meta=SearchMeta(query="lagu populer", count=32, sections={"songs": "ok", "playlists": "ok",
+                                                                  "albums": "ok", "artists": "ok"})
+    )
+
+
+def make_lyrics() -> LyricsData:
+    return LyricsData(
+        type="synced",
+        lines=[LyricsLine(text=f"Baris lirik ke-{i} ♪", start_time_ms=i * 3000, end_time_ms=i * 3000 + 2900)
+               for i in range(60)],
+        source="lrclib"
+    )
+
+
+def _legacy(envelope: ApiResponse, response_model: Any) -> bytes:
+    """What FastAPI does with a returned ApiResponse: dump, validate, serialize."""
+    adapter = _adapters.setdefault(response_model, TypeAdapter(response_model))
+    value = adapter.validate_python(envelope.model_dump(by_alias=True))
+    return adapter.dump_json(value, by_alias=True)
+
+
+_adapters: Dict[Any, TypeAdapter] = {}
+
+
+def cases() -> Dict[str, Tuple[Callable[[], bytes], Callable[[], bytes]]]:
+    """endpoint -> (before, after) producing the response body."""
+    search = make_search()
+    playlist = make_songs(100)
+    album = make_songs(15)
+    related = make_songs(20)
+    lyrics = make_lyrics()
+    playlist_info = {"playlist_id": "PL1", "title": "Top 100", "description": None,
+                     "thumbnail_url": "https://x/p.jpg", "author": "YouTube Music", "song_count": 100}
+    album_info = {"browse_id": "MPREb1", "title": "Album", "artist": "Artist", "thumbnail_url": "https://x/a.jpg",
+                  "year": "2024", "track_count": 15, "duration": "52 minutes"}
+
+    def metadata(lyrics_value):
+        return MetadataResponse(video_id="v0000000001", title="Lagu", artist="Artist", duration_seconds=215,
+                                has_lyrics=True, lyrics=lyrics_value)
+
+    return {
+        "search": (
+            lambda: _legacy(ApiResponse(success=True, data=search), ApiResponse[UnifiedSearchResponse]),
+            lambda: api_response(search).body,
+        ),
+        "playlist_100": (
+            lambda: _legacy(ApiResponse(success=True, data=dict(
+                playlist_info, songs=[song.model_dump() for song in playlist])), ApiResponse),
+            lambda: api_response(dict(playlist_info, songs=playlist)).body,
+        ),
+        "album": (
+            lambda: _legacy(ApiResponse(success=True, data=dict(
+                album_info, songs=[song.model_dump() for song in album])), ApiResponse),
+            lambda: api_response(dict(album_info, songs=album)).body,
+        ),
+        "related": (
+            lambda: _legacy(ApiResponse(success=True, data={
+                "songs": [song.model_dump() for song in related]}), ApiResponse),
+            lambda: api_response({"songs": related}).body,
+        ),
+        "metadata": (
+            lambda: _legacy(ApiResponse(success=True, data=metadata(lyrics.model_dump()).model_dump()), ApiResponse),
+            lambda: api_response(metadata(lyrics)).body,
+        ),
+    }
+
+
+def cpu_per_call(fn: Callable[[], bytes], iterations: int) -> float:
+    """Mean process CPU seconds per call."""
+    fn()
+    started = time.process_time()
+    for _ in range(iterations):
+        fn()
+    return (time.process_time() - started) / iterations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    print(f"{'endpoint':<14}{'bytes':>8}{'before µs':>12}{'after µs':>11}{'speedup':>9}")
+    for name, (before, after) in cases().items():
+        body = after()
+        if before() != body:
+            raise SystemExit(f"{name}: fast path output differs from the response_model output")
+        before_cpu = cpu_per_call(before, args.iterations)
+        after_cpu = cpu_per_call(after, args.iterations)
+        print(f"{name:<14}{len(body):>8}{before_cpu * 1e6:>12.1f}{after_cpu * 1e6:>11.1f}"
+              f"{before_cpu / after_cpu:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
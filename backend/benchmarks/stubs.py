@@ -0,0 +1,262 @@
+"""
+Deterministic local stand-ins for every upstream the API talks to.
+
+StubYTMusic replaces ytmusicapi's YTMusic, StubYoutubeDL replaces
+yt_dlp.YoutubeDL, StubHttp replaces the LRCLIB client and
+googlevideo_transport() serves stream bytes to the audio relay. Each call
+sleeps for a fixed latency (simulating the network round trip, releasing
+the GIL like real I/O) and returns payloads whose size is set by
+payload_size, derived only from the request arguments.
+"""
+import os
+import time
+from dataclasses import dataclass
+from typing import Callable, List, Optional
+
+import httpx
+
+from app.services.youtube_music import DownloadResult
+from app.services.ytmusic_fixtures import YTMUSIC_METHODS
+from app.utils.metrics import InstrumentedClient
+
+
+@dataclass
+class UpstreamProfile:
+    """Latency and payload size of the stubbed upstreams."""
+    latency: float = 0.05  # seconds per upstream call
+    extraction_latency: float = 0.2  # seconds per yt-dlp extraction
+    payload_size: int = 20  # tracks per search / album / playlist / watch list
+    audio_bytes: int = 512 * 1024  # size of each relayed / downloaded file
+
+
+def _thumbnails(seed: str) -> List[dict]:
+    return [
+        {"url": f"https://lh3.googleusercontent.com/{seed}=w60-h60-l90-rj", "width": 60, "height": 60},
+        {"url": f"https://lh3.googleusercontent.com/{seed}=w120-h120-l90-rj", "width": 120, "height": 120},
+    ]
+
+
+def _track(seed: str, i: int) -> dict:
+    return {
+        "videoId": f"{seed[:5]}{i:06d}"[-11:].rjust(11, "v"),
+        "title": f"Track {i} of {seed}",
+        "artists": [{"name": f"Artist {i % 5}", "id": f"UCartist{i % 5:016d}"}],
+        "album": {"name": f"Album of {seed}", "id": f"MPREb{seed}"},
+        "duration": f"{3 + i % 2}:{i % 60:02d}",
+        "length": f"{3 + i % 2}:{i % 60:02d}",
+        "thumbnails": _thumbnails(f"{seed}-{i}"),
+        "thumbnail": _thumbnails(f"{seed}-{i}"),
+    }
+
+
+class StubYTMusic:
+    """ytmusicapi.YTMusic stand-in with fixed latency and sized payloads."""
+
+    def __init__(self, profile: UpstreamProfile):
+        self.profile = profile
+
+    def _wait(self):
+        if self.profile.latency > 0:
+            time.sleep(self.profile.latency)
+
+    def search(self, query: str, filter: Optional[str] = None, limit: int = 20) -> List[dict]:
+        self._wait()
+        count = min(limit, self.profile.payload_size)
+        if filter == "playlists":
+            return [{"browseId": f"VLPL{query[:8]}{i}", "title": f"{query} mix {i}", "author": "YouTube Music",
+                     "itemCount": f"{40 + i} songs", "thumbnails": _thumbnails(f"pl{i}")} for i in range(count)]
+        if filter == "albums":
+            return [{"browseId": f"MPREb{query[:8]}{i}", "title": f"{query} album {i}", "year": "2024",
+                     "artists": [{"name": f"Artist {i}"}], "thumbnails": _thumbnails(f"al{i}")} for i in range(count)]
+        if filter == "artists":
+            return [{"browseId": f"UC{query[:8]}{i}", "artist": f"{query} artist {i}", "subscribers": "1.2M",
+                     "thumbnails": _thumbnails(f"ar{i}")} for i in range(count)]
+        return [_track(query.replace(" ", ""), i) for i in range(count)]
+
+    def get_search_suggestions(self, query: str) -> List[str]:
+        self._wait()
+        # A full page, so the suggestion index never derives from stub lists
+        return [f"{query} {suffix}" for suffix in (
+            "lyrics", "live", "remix", "acoustic", "cover", "slowed", "instrumental", "karaoke", "piano", "sped up"
+        )]
+
+    def get_song(self, video_id: str) -> dict:
+        self._wait()
+        return {"videoDetails": {"videoId": video_id, "title": f"Song {video_id}",
+                                 "author": "Artist - Topic", "lengthSeconds": "215"}}
+
+    def get_watch_playlist(self, video_id: str) -> dict:
+        self._wait()
+        return {"tracks": [_track(video_id, i) for i in range(self.profile.payload_size + 1)],
+                "lyrics": f"MPLY{video_id}"}
+
+    def get_lyrics(self, browse_id: str) -> dict:
+        self._wait()
+        return {"lyrics": "\n".join(f"Line {i} of the song" for i in range(40))}
+
+    def get_album(self, browse_id: str) -> dict:
+        self._wait()
+        return {"title": f"Album {browse_id}", "year": "2024", "duration": "48 minutes",
+                "artists": [{"name": "Album Artist"}], "thumbnails": _thumbnails(browse_id),
+                "tracks": [_track(browse_id, i) for i in range(self.profile.payload_size)]}
+
+    def get_playlist(self, playlist_id: str, limit: int = 100) -> dict:
+        self._wait()
+        return {"title": f"Playlist {playlist_id}", "description": "Benchmark playlist",
+                "author": {"name": "YouTube Music"}, "thumbnails": _thumbnails(playlist_id),
+                "tracks": [_track(playlist_id, i) for i in range(self.profile.payload_size)]}
+
+    def get_artist(self, browse_id: str) -> dict:
+        self._wait()
+        return {"name": f"Artist {browse_id}", "description": "Benchmark artist", "subscribers": "1.2M",
+                "thumbnails": _thumbnails(browse_id),
+                "songs": {"results": [_track(browse_id, i) for i in range(10)]},
+                "albums": {"results": [{"browseId": f"MPREb{browse_id}{i}", "title": f"Album {i}",
+                                        "year": "2020", "thumbnails": _thumbnails(f"{browse_id}{i}")}
+                                       for i in range(5)]}}
+
+
+def stream_url(video_id: str, profile: UpstreamProfile) -> str:
+    """googlevideo-style URL carrying expire / itag / lmt / clen."""
+    return (
+        f"https://rr1---sn-bench.googlevideo.com/videoplayback?id={video_id}"
+        f"&expire={int(time.time()) + 6 * 3600}&itag=140&lmt=1700000000000000"
+        f"&clen={profile.audio_bytes}&mime=audio%2Fmp4"
+    )
+
+
+class StubYoutubeDL:
+    """yt_dlp.YoutubeDL stand-in for stream extraction."""
+
+    profile = UpstreamProfile()
+
+    def __init__(self, opts: Optional[dict] = None):
+        self.opts = opts or {}
+
+    def extract_info(self, url: str, download: bool = False) -> dict:
+        if self.profile.extraction_latency > 0:
+            time.sleep(self.profile.extraction_latency)
+        video_id = url.rsplit("v=", 1)[-1]
+        return {"id": video_id, "formats": [
+            {"format_id": "251", "ext": "webm", "acodec": "opus", "vcodec": "none", "abr": 130,
+             "url": stream_url(video_id, self.profile).replace("itag=140", "itag=251")},
+            {"format_id": "140", "ext": "m4a", "acodec": "mp4a.40.2", "vcodec": "none", "abr": 129,
+             "url": stream_url(video_id, self.profile)},
+        ]}
+
+    def get_info_extractor(self, name: str):
+        return None
+
+    def close(self):
+        pass
+
+
+class StubResponse:
+    """Minimal httpx.Response stand-in for LRCLIB."""
+
+    def __init__(self, status_code: int, payload: dict):
+        self.status_code = status_code
+        self._payload = payload
+
+    def json(self) -> dict:
+        return self._payload
+
+
+class StubHttp:
+    """LRCLIB client stand-in returning synced lyrics."""
+
+    def __init__(self, profile: UpstreamProfile):
+        self.profile = profile
+
+    def get(self, url: str, params: Optional[dict] = None, **kwargs) -> StubResponse:
+        if self.profile.latency > 0:
+            time.sleep(self.profile.latency)
+        synced = "\n".join(f"[00:{i:02d}.00] Line {i}" for i in range(40))
+        return StubResponse(200, {"syncedLyrics": synced})
+
+
+class _ByteStream(httpx.AsyncByteStream):
+    """Streamed body (content= would be pre-read and could not be relayed)."""
+
+    CHUNK_BYTES = 64 * 1024
+
+    def __init__(self, data: bytes):
+        self.data = data
+
+    async def __aiter__(self):
+        for i in range(0, len(self.data), self.CHUNK_BYTES):
+            yield self.data[i:i + self.CHUNK_BYTES]
+
+
+def googlevideo_transport(profile: UpstreamProfile) -> httpx.MockTransport:
+    """Serves deterministic audio bytes with Range support for the relay."""
+    audio = bytes(range(256)) * (profile.audio_bytes // 256 + 1)
+    audio = audio[:profile.audio_bytes]
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        start, _, end = request.headers.get("Range", "bytes=0-").split("=", 1)[1].partition("-")
+        first = int(start or 0)
+        last = min(int(end) if end else len(audio) - 1, len(audio) - 1)
+        return httpx.Response(
+            206, stream=_ByteStream(audio[first:last + 1]),
+            headers={"Content-Range": f"bytes {first}-{last}/{len(audio)}", "Content-Type": "audio/mp4"}
+        )
+
+    return httpx.MockTransport(handler)
+
+
+def stub_downloader(profile: UpstreamProfile) -> Callable[..., Optional[DownloadResult]]:
+    """Download function for the job manager writing audio_bytes per file."""
+
+    def download(video_id, quality, progress_hook=None, output_dir=None, codec="m4a"):
+        if profile.extraction_latency > 0:
+            time.sleep(profile.extraction_latency)
+        path = os.path.join(output_dir or ".", f"{video_id}.{quality}.{codec}.m4a")
+        with open(path, "wb") as f:
+            f.write(b"\0" * profile.audio_bytes)
+        if progress_hook:
+            progress_hook({"status": "finished"})
+        return DownloadResult(file_path=path, delivery="passthrough", source_codec="mp4a.40.2")
+
+    return download
+
+
+def install(profile: UpstreamProfile) -> Callable[[], None]:
+    """
+    Point the service singletons at the stubs.
+
+    Returns:
+        Callable restoring the real upstream clients
+    """
+    from app.services.audio_relay import audio_relay
+    from app.services.download_jobs import download_jobs
+    from app.services.rate_governor import youtube_governor
+    from app.services.stream_extractor import stream_extractor_service
+    from app.services.youtube_music import yt_music_service
+
+    StubYoutubeDL.profile = profile
+    saved = [
+        (yt_music_service, "_client", yt_music_service._client),
+        (yt_music_service, "_http", yt_music_service._http),
+        (stream_extractor_service._ydl_pool, "_factory", stream_extractor_service._ydl_pool._factory),
+        (audio_relay, "_client", audio_relay._client),
+        (download_jobs, "_download_fn", download_jobs._download_fn),
+        (youtube_governor, "enabled", youtube_governor.enabled),
+    ]
+    # Keep the per-call metrics / spans the real client gets
+    yt_music_service._client = InstrumentedClient(StubYTMusic(profile), "ytmusic", YTMUSIC_METHODS)
+    yt_music_service._http = StubHttp(profile)
+    # Idle real instances would bypass the factory
+    stream_extractor_service._ydl_pool.close()
+    stream_extractor_service._ydl_pool._factory = StubYoutubeDL
+    audio_relay._client = httpx.AsyncClient(transport=googlevideo_transport(profile))
+    download_jobs._download_fn = stub_downloader(profile)
+    # Stubs don't rate limit; measure the server, not the outbound budget
+    youtube_governor.enabled = False
+
+    def restore():
+        stream_extractor_service._ydl_pool.close()
+        for target, name, value in saved:
+            setattr(target, name, value)
+
+    return restore
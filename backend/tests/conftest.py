@@ -0,0 +1,31 @@
+"""
+Shared pytest configuration.
+"""
+import os
+import tempfile
+
+import pytest
+
+# Keep the persistent cache out of the working tree during tests.
+# Must run before app.config is imported.
+_test_data_dir = tempfile.mkdtemp(prefix="ytmusic-tests-")
+os.environ.setdefault("CACHE_DB_PATH", os.path.join(_test_data_dir, "cache.sqlite3"))
+os.environ.setdefault("AUDIO_CACHE_DIR", os.path.join(_test_data_dir, "audio"))
+# No speculative background extractions against YouTube from tests
+os.environ.setdefault("STREAM_PREFETCH_ENABLED", "false")
+
+
+class FakeClock:
+    """Manually advanced time source."""
+    
+    def __init__(self, now: float = 0.0):
+        self.now = now
+    
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    """Fake clock starting at 0; advance it by changing clock.now."""
+    return FakeClock()
@@ -0,0 +1,93 @@
+"""
+Unit tests for the on-disk audio file cache.
+"""
+import os
+import time
+
+import pytest
+
+from app.services.audio_cache import AudioFileCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return AudioFileCache(str(tmp_path / "audio"), max_bytes=1000)
+
+
+def _put(cache, video_id, size, quality="best"):
+    """Store a file of the given size as a finished download would."""
+    with cache.staging() as staging_dir:
+        path = os.path.join(staging_dir, "download.m4a")
+        with open(path, "wb") as f:
+            f.write(b"x" * size)
+        return cache.put(video_id, quality, path)
+
+
+class TestAudioFileCache:
+    """Tests for AudioFileCache storage and eviction."""
+    
+    def test_put_and_get(self, cache):
+        path = _put(cache, "aaaaaaaaaaa", 100)
+        
+        assert cache.get("aaaaaaaaaaa", "best") == path
+        assert cache.get("aaaaaaaaaaa", "128k") is None
+        assert open(path, "rb").read() == b"x" * 100
+        assert not [name for name in os.listdir(os.path.dirname(path)) if name.endswith(".tmp")]
+        stats = cache.stats()
+        assert (stats["hits"], stats["misses"], stats["stores"]) == (1, 1, 1)
+        assert (stats["files"], stats["bytes"]) == (1, 100)
+    
+    def test_evicts_least_recently_used(self, cache):
+        old = _put(cache, "aaaaaaaaaaa", 400)
+        recent = _put(cache, "bbbbbbbbbbb", 400)
+        past = time.time() - 3600
+        os.utime(old, (past, past))
+        os.utime(recent, (past, past))
+        # Reading the older file makes it the most recently used
+        cache.get("aaaaaaaaaaa", "best")
+        
+        _put(cache, "ccccccccccc", 400)
+        
+        assert cache.get("aaaaaaaaaaa", "best") == old
+        assert cache.get("bbbbbbbbbbb", "best") is None
+        assert cache.get("ccccccccccc", "best") is not None
+        assert cache.stats()["evictions"] == 1
+        assert cache.stats()["bytes"] == 800
+    
+    def test_directory_walked_only_when_over_cap(self, cache, monkeypatch):
+        scans = []
+        scan = cache._scan
+        monkeypatch.setattr(cache, "_scan", lambda: scans.append(1) or scan())
+        
+        _put(cache, "aaaaaaaaaaa", 300)
+        _put(cache, "bbbbbbbbbbb", 300)
+        _put(cache, "bbbbbbbbbbb", 300)  # Replacing a file doesn't grow the total
+        assert len(scans) == 1  # Only the first store seeds the running total
+        assert (cache.stats()["files"], cache.stats()["bytes"]) == (2, 600)
+        
+        _put(cache, "ccccccccccc", 500)
+        assert len(scans) == 2
+        assert cache.stats()["bytes"] <= 1000
+    
+    @pytest.mark.parametrize("video_id,variant", [
+        ("dQw4w9WgXcQ", "/../../../../../../tmp/pwn"),
+        ("../../../tmp", "best"),
+        ("aaaaaaaaaaa", "best/.."),
+    ])
+    def test_rejects_paths_outside_directory(self, cache, video_id, variant):
+        with pytest.raises(ValueError):
+            cache.path_for(video_id, variant)
+        with pytest.raises(ValueError):
+            cache.get(video_id, variant)
+    
+    def test_rejects_symlinked_shard_outside_directory(self, cache, tmp_path):
+        os.makedirs(cache.directory)
+        os.symlink(tmp_path, os.path.join(cache.directory, "aa"))
+        
+        with pytest.raises(ValueError):
+            cache.path_for("aaaaaaaaaaa", "best")
+    
+    def test_disabled_cache_misses(self, tmp_path):
+        cache = AudioFileCache(str(tmp_path / "audio"), max_bytes=1000, enabled=False)
+        
+        assert cache.get("aaaaaaaaaaa", "best") is None
@@ -0,0 +1,228 @@
+"""
+Unit tests for the audio relay endpoint with a mocked googlevideo upstream.
+"""
+import time
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.routers import stream as stream_router
+from app.services.audio_relay import AudioRelay, UpstreamError, parse_range_header
+from app.services.stream_extractor import StreamInfo
+
+
+client = TestClient(app)
+
+AUDIO = bytes(range(256)) * 8  # 2048 bytes
+
+
+class FakeExtractor:
+    """Resolves versioned URLs; invalidate() makes the next URL a new version."""
+    
+    def __init__(self, with_clen=True):
+        self.version = 1
+        self.invalidated = 0
+        self.with_clen = with_clen
+        self.itag_after_invalidate = None  # Format picked by later extractions
+        self.itag = "140"
+    
+    def get_stream_url(self, video_id):
+        url = f"https://gv.test/videoplayback?itag={self.itag}&lmt=1700000000000000&v={self.version}"
+        if self.with_clen:
+            url += f"&clen={len(AUDIO)}"
+        return StreamInfo(url=url, format="m4a", quality="128kbps", expires_at=time.time() + 3600)
+    
+    def invalidate(self, video_id):
+        self.invalidated += 1
+        self.version += 1
+        if self.itag_after_invalidate:
+            self.itag = self.itag_after_invalidate
+
+
+class ChunkStream(httpx.AsyncByteStream):
+    """Streamed upstream body (content= would be pre-read by httpx)."""
+    
+    def __init__(self, data):
+        self.data = data
+        self.closed = False
+    
+    async def __aiter__(self):
+        for i in range(0, len(self.data), 64):
+            yield self.data[i:i + 64]
+    
+    async def aclose(self):
+        self.closed = True
+
+
+class FakeUpstream:
+    """googlevideo stand-in serving byte ranges of AUDIO."""
+    
+    def __init__(self):
+        self.requests = []
+        self.expire_version = None  # URLs of this version get 403 after the first request
+        self.empty_after = None  # Requests after this many get an empty 206
+        self.without_size = False  # Omit Content-Range, so the size is unknown
+        self.streams = []
+    
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        version = request.url.params.get("v")
+        if version == self.expire_version and len(self.requests) > 1:
+            return httpx.Response(403)
+        start, end = parse_range_header(request.headers["Range"])
+        end = min(end, len(AUDIO) - 1)
+        if self.empty_after is not None and len(self.requests) > self.empty_after:
+            end = start - 1
+        headers = {"Content-Type": "audio/mp4"}
+        if not self.without_size:
+            headers["Content-Range"] = f"bytes {start}-{end}/{len(AUDIO)}"
+        stream = ChunkStream(AUDIO[start:end + 1])
+        self.streams.append(stream)
+        return httpx.Response(206, headers=headers, stream=stream)
+
+
+@pytest.fixture
+def upstream():
+    return FakeUpstream()
+
+
+@pytest.fixture
+def extractor():
+    return FakeExtractor()
+
+
+@pytest.fixture
+def relay(upstream, extractor, monkeypatch):
+    """Relay with small chunks wired into the router."""
+    relay = AudioRelay(
+        extractor,
+        client=httpx.AsyncClient(transport=httpx.MockTransport(upstream)),
+        upstream_chunk_bytes=512,
+        read_chunk_bytes=100,
+        max_re_resolves=2
+    )
+    monkeypatch.setattr(stream_router, "audio_relay", relay)
+    return relay
+
+
+class TestParseRangeHeader:
+    """Tests for Range header parsing."""
+    
+    def test_ranges(self):
+        assert parse_range_header("bytes=0-99") == (0, 99)
+        assert parse_range_header("bytes=100-") == (100, None)
+        assert parse_range_header("bytes=-50") == (None, 50)
+    
+    def test_unsupported_ranges_ignored(self):
+        assert parse_range_header(None) is None
+        assert parse_range_header("bytes=0-1,5-9") is None
+        assert parse_range_header("items=0-1") is None
+        assert parse_range_header("bytes=9-1") is None
+        assert parse_range_header("bytes=abc") is None
+
+
+class TestAudioRelay:
+    """Tests for GET /api/v1/stream/{video_id}/audio."""
+    
+    def test_full_content(self, relay, upstream):
+        """Without Range the whole file is relayed in upstream chunks."""
+        response = client.get("/api/v1/stream/abcdefghijk/audio")
+        
+        assert response.status_code == 200
+        assert response.content == AUDIO
+        assert response.headers["accept-ranges"] == "bytes"
+        assert response.headers["content-length"] == str(len(AUDIO))
+        assert response.headers["content-type"] == "audio/mp4"
+        assert len(upstream.requests) == 4  # 2048 bytes in 512-byte ranges
+        assert relay.stats()["bytes_relayed"] == len(AUDIO)
+        assert relay.stats()["bytes_in_flight"] == 0
+    
+    def test_partial_content(self, relay, upstream):
+        """A Range request gets 206 with only the requested bytes."""
+        response = client.get("/api/v1/stream/abcdefghijk/audio", headers={"Range": "bytes=1000-1099"})
+        
+        assert response.status_code == 206
+        assert response.content == AUDIO[1000:1100]
+        assert response.headers["content-range"] == f"bytes 1000-1099/{len(AUDIO)}"
+        assert upstream.requests[0].headers["Range"] == "bytes=1000-1511"
+    
+    def test_suffix_range_without_clen(self, relay, extractor):
+        """Suffix ranges work when the size is only known from Content-Range."""
+        extractor.with_clen = False
+        
+        response = client.get("/api/v1/stream/abcdefghijk/audio", headers={"Range": "bytes=-48"})
+        
+        assert response.status_code == 206
+        assert response.content == AUDIO[-48:]
+        assert response.headers["content-range"] == f"bytes 2000-2047/{len(AUDIO)}"
+    
+    def test_range_not_satisfiable(self, relay):
+        response = client.get("/api/v1/stream/abcdefghijk/audio", headers={"Range": "bytes=5000-"})
+        
+        assert response.status_code == 416
+        assert response.headers["content-range"] == f"bytes */{len(AUDIO)}"
+    
+    def test_if_range(self, relay):
+        """Range is honored only when If-Range matches the current ETag."""
+        etag = client.get(
+            "/api/v1/stream/abcdefghijk/audio", headers={"Range": "bytes=0-0"}
+        ).headers["etag"]
+        
+        matching = client.get(
+            "/api/v1/stream/abcdefghijk/audio", headers={"Range": "bytes=10-19", "If-Range": etag}
+        )
+        stale = client.get(
+            "/api/v1/stream/abcdefghijk/audio", headers={"Range": "bytes=10-19", "If-Range": '"old"'}
+        )
+        
+        assert matching.status_code == 206
+        assert matching.content == AUDIO[10:20]
+        assert stale.status_code == 200
+        assert stale.content == AUDIO
+    
+    def test_unknown_size_closes_upstream_response(self, relay, upstream, extractor):
+        """An upstream reply without a usable size fails and releases its connection."""
+        extractor.with_clen = False
+        upstream.without_size = True
+        
+        response = client.get("/api/v1/stream/abcdefghijk/audio")
+        
+        assert response.status_code == 502
+        assert upstream.streams and all(stream.closed for stream in upstream.streams)
+    
+    def test_url_expiring_mid_stream_is_re_resolved(self, relay, upstream, extractor):
+        """A 403 on a later range re-resolves the URL and continues at the same offset."""
+        upstream.expire_version = "1"
+        
+        response = client.get("/api/v1/stream/abcdefghijk/audio")
+        
+        assert response.status_code == 200
+        assert response.content == AUDIO
+        assert extractor.invalidated == 1
+        assert relay.stats()["re_resolves"] == 1
+        retried = [r for r in upstream.requests if r.url.params.get("v") == "2"]
+        assert retried[0].headers["Range"] == "bytes=512-1023"
+    
+    def test_re_resolved_format_change_aborts(self, relay, upstream, extractor):
+        """Bytes of another format must never be spliced onto a relay."""
+        upstream.expire_version = "1"
+        extractor.itag_after_invalidate = "251"
+        
+        with pytest.raises(UpstreamError):
+            client.get("/api/v1/stream/abcdefghijk/audio")
+        
+        assert extractor.invalidated == 1
+        assert not [r for r in upstream.requests if r.url.params.get("v") == "2"]
+    
+    def test_empty_ranges_do_not_retry_forever(self, relay, upstream):
+        """Empty 206 bodies use up the retry budget and then fail the relay."""
+        upstream.empty_after = 1
+        
+        with pytest.raises(UpstreamError):
+            client.get("/api/v1/stream/abcdefghijk/audio")
+        
+        # First chunk, then one empty response per retry
+        assert len(upstream.requests) == 1 + 1 + relay.max_re_resolves
+        assert relay.stats()["failed"] == 1
@@ -0,0 +1,38 @@
+"""
+Smoke test for the offline endpoint benchmark and its upstream stubs.
+"""
+import asyncio
+
+from benchmarks import bench_endpoints, stubs
+
+
+class TestEndpointBenchmark:
+    """Runs every endpoint once against the stubs."""
+    
+    def test_all_endpoints_succeed_offline(self):
+        profile = stubs.UpstreamProfile(latency=0, extraction_latency=0, payload_size=3, audio_bytes=4096)
+        
+        results = asyncio.run(bench_endpoints.run_suite(
+            list(bench_endpoints.ENDPOINTS), levels=[2], requests=2, keys=0, profile=profile
+        ))
+        
+        assert [r["endpoint"] for r in results] == list(bench_endpoints.ENDPOINTS)
+        for result in results:
+            assert result["errors"] == 0, result["endpoint"]
+            assert result["latency_ms"]["p50"] <= result["latency_ms"]["p99"]
+    
+    def test_stubs_are_removed_afterwards(self):
+        from app.services.youtube_music import yt_music_service
+        client = yt_music_service._client
+        
+        restore = stubs.install(stubs.UpstreamProfile())
+        restore()
+        
+        assert yt_music_service._client is client
+    
+    def test_percentile(self):
+        values = [float(v) for v in range(1, 101)]
+        
+        assert bench_endpoints.percentile(values, 50) == 50.0
+        assert bench_endpoints.percentile(values, 99) == 99.0
+        assert bench_endpoints.percentile([], 95) == 0.0
@@ -0,0 +1,82 @@
+"""
+Unit tests for the in-memory TTL/LRU cache.
+"""
+from app.utils.cache import TTLCache
+
+
+class TestTTLCache:
+    """Tests for TTLCache."""
+    
+    def test_get_returns_stored_value(self, clock):
+        """Stored values should be returned until they expire."""
+        cache = TTLCache(max_entries=10, clock=clock)
+        cache.set("a", 1, ttl=60)
+        
+        assert cache.get("a") == 1
+        assert cache.stats()["hits"] == 1
+    
+    def test_entry_expires_after_ttl(self, clock):
+        """Entries should disappear once their own TTL passes."""
+        cache = TTLCache(max_entries=10, clock=clock)
+        cache.set("short", 1, ttl=10)
+        cache.set("long", 2, ttl=100)
+        clock.now += 50
+        
+        assert cache.get("short") is None
+        assert cache.get("long") == 2
+        assert cache.stats()["expirations"] == 1
+    
+    def test_lru_eviction_on_entry_cap(self, clock):
+        """Least recently used entry should be evicted past max_entries."""
+        cache = TTLCache(max_entries=2, clock=clock)
+        cache.set("a", 1, ttl=60)
+        cache.set("b", 2, ttl=60)
+        cache.get("a")
+        cache.set("c", 3, ttl=60)
+        
+        assert "b" not in cache
+        assert cache.get("a") == 1
+        assert cache.get("c") == 3
+        assert cache.stats()["evictions"] == 1
+    
+    def test_expired_entries_purged_before_lru(self, clock):
+        """Expired entries should make room before live ones are evicted."""
+        cache = TTLCache(max_entries=2, clock=clock)
+        cache.set("stale", 1, ttl=5)
+        cache.set("live", 2, ttl=60)
+        cache.get("stale")  # refreshes LRU position but not expiry
+        clock.now += 10
+        cache.set("new", 3, ttl=60)
+        
+        assert cache.get("live") == 2
+        assert cache.get("new") == 3
+        assert cache.stats()["evictions"] == 0
+    
+    def test_byte_cap_enforced(self, clock):
+        """Total accounted size should stay under max_bytes."""
+        cache = TTLCache(max_entries=100, max_bytes=10, sizeof=len, clock=clock)
+        cache.set("a", "xxxx", ttl=60)
+        cache.set("b", "yyyy", ttl=60)
+        cache.set("c", "zzzz", ttl=60)
+        
+        assert len(cache) == 2
+        assert cache.stats()["bytes"] == 8
+        assert "a" not in cache
+    
+    def test_overwrite_replaces_expiry(self, clock):
+        """Overwriting a key should use the new TTL."""
+        cache = TTLCache(max_entries=10, clock=clock)
+        cache.set("a", 1, ttl=5)
+        cache.set("a", 2, ttl=100)
+        clock.now += 50
+        
+        assert cache.purge_expired() == 0
+        assert cache.get("a") == 2
+    
+    def test_non_positive_ttl_not_stored(self, clock):
+        """Values that are already expired should not be cached."""
+        cache = TTLCache(max_entries=10, clock=clock)
+        cache.set("a", 1, ttl=0)
+        
+        assert "a" not in cache
+        assert len(cache) == 0
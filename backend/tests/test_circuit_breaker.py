@@ -0,0 +1,66 @@
+"""
+Unit tests for the circuit breaker.
+"""
+import pytest
+
+from app.utils.circuit_breaker import CircuitBreaker, CircuitOpenError
+
+
+@pytest.fixture
+def breaker(clock):
+    return CircuitBreaker("test", failure_threshold=3, cooldown=10, clock=clock)
+
+
+class TestCircuitBreaker:
+    """Tests for CircuitBreaker state transitions."""
+    
+    def test_opens_after_threshold(self, breaker):
+        """Consecutive failures up to the threshold should open the circuit."""
+        for _ in range(2):
+            breaker.record_failure()
+        assert breaker.allow() is True
+        
+        breaker.record_failure()
+        
+        assert breaker.state == "open"
+        assert breaker.allow() is False
+        with pytest.raises(CircuitOpenError):
+            breaker.check()
+    
+    def test_success_resets_failures(self, breaker):
+        """A success in between should reset the failure count."""
+        breaker.record_failure()
+        breaker.record_failure()
+        breaker.record_success()
+        breaker.record_failure()
+        
+        assert breaker.state == "closed"
+    
+    def test_half_open_allows_one_trial(self, breaker, clock):
+        """After the cool-down exactly one trial call should go through."""
+        for _ in range(3):
+            breaker.record_failure()
+        clock.now = 10
+        
+        assert breaker.allow() is True
+        assert breaker.allow() is False
+        
+        breaker.record_success()
+        assert breaker.state == "closed"
+        assert breaker.allow() is True
+    
+    def test_failed_trial_reopens(self, breaker, clock):
+        """A failed trial should re-open the circuit for a new cool-down."""
+        for _ in range(3):
+            breaker.record_failure()
+        clock.now = 10
+        assert breaker.allow() is True
+        
+        breaker.record_failure()
+        
+        assert breaker.state == "open"
+        clock.now = 15
+        assert breaker.allow() is False
+        clock.now = 20
+        assert breaker.allow() is True
+        assert breaker.stats()["opened"] == 2
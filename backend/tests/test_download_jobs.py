@@ -0,0 +1,366 @@
+"""
+Unit tests for the download job queue and endpoints with a fake downloader.
+"""
+import asyncio
+import os
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.routers import download as download_router
+from app.services.audio_cache import AudioFileCache
+from app.services.download_jobs import (
+    DownloadJobManager, QueueFullError, iter_progressive, open_progressive
+)
+from app.services.youtube_music import DownloadResult
+
+
+client = TestClient(app)
+
+
+class FakeDownloader:
+    """Writes a small file per video; can be paused to hold a worker busy."""
+    
+    def __init__(self, tmp_path):
+        self.tmp_path = tmp_path
+        self.order = []
+        self.gate = threading.Event()
+        self.gate.set()
+        self.fail = set()
+    
+    def __call__(self, video_id, quality, progress_hook=None, output_dir=None, codec="m4a"):
+        self.order.append(video_id)
+        progress_hook({"status": "downloading", "downloaded_bytes": 50, "total_bytes": 100, "eta": 1})
+        self.gate.wait(5)
+        if video_id in self.fail:
+            return None
+        progress_hook({"status": "finished"})
+        ext = ".m4a" if codec == "m4a" else ".webm"
+        path = os.path.join(output_dir or self.tmp_path, f"{video_id}.{quality}{ext}")
+        with open(path, "wb") as f:
+            f.write(b"audio")
+        return DownloadResult(file_path=path, delivery="passthrough")
+
+
+def _wait_done(job, timeout=5.0):
+    job.future.exception(timeout=timeout)
+    return job
+
+
+def _wait_running(manager, timeout=2.0):
+    deadline = time.time() + timeout
+    while manager.stats()["running"] == 0 and time.time() < deadline:
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def downloader(tmp_path):
+    return FakeDownloader(tmp_path)
+
+
+@pytest.fixture
+def manager(downloader):
+    manager = DownloadJobManager(downloader, workers=1, max_queued=3, job_ttl=60)
+    yield manager
+    downloader.gate.set()
+    manager.shutdown()
+
+
+class TestDownloadJobManager:
+    """Tests for DownloadJobManager scheduling."""
+    
+    def test_job_completes_with_file(self, manager):
+        job = _wait_done(manager.submit("aaaaaaaaaaa"))
+        
+        assert job.status == "done"
+        assert job.progress == 1.0
+        assert job.file_path.endswith("aaaaaaaaaaa.best.m4a")
+    
+    def test_progress_reported_while_downloading(self, manager, downloader):
+        downloader.gate.clear()
+        job = manager.submit("aaaaaaaaaaa")
+        
+        deadline = time.time() + 2
+        while job.downloaded_bytes is None and time.time() < deadline:
+            time.sleep(0.01)
+        
+        assert job.status == "downloading"
+        assert job.progress == 0.5
+        assert job.eta_seconds == 1
+    
+    def test_duplicate_jobs_deduplicated(self, manager, downloader):
+        first = manager.submit("aaaaaaaaaaa")
+        second = manager.submit("aaaaaaaaaaa")
+        _wait_done(first)
+        third = manager.submit("aaaaaaaaaaa")
+        
+        assert first is second is third
+        assert downloader.order == ["aaaaaaaaaaa"]
+        assert manager.stats()["deduplicated"] == 2
+    
+    def test_higher_priority_runs_first(self, manager, downloader):
+        downloader.gate.clear()
+        busy = manager.submit("aaaaaaaaaaa")
+        _wait_running(manager)
+        low = manager.submit("bbbbbbbbbbb", priority="low")
+        normal = manager.submit("ccccccccccc")
+        bumped = manager.submit("bbbbbbbbbbb", priority="high")
+        downloader.gate.set()
+        
+        for job in (busy, low, normal):
+            _wait_done(job)
+        
+        assert bumped is low
+        assert downloader.order == ["aaaaaaaaaaa", "bbbbbbbbbbb", "ccccccccccc"]
+    
+    @pytest.mark.parametrize("video_id,quality,codec", [
+        ("../../../tm", "best", "m4a"),
+        ("aaaaaaaaaaa", "/../../../../tmp/x", "m4a"),
+        ("aaaaaaaaaaa", "best", "../x"),
+    ])
+    def test_rejects_values_used_in_paths(self, manager, downloader, video_id, quality, codec):
+        with pytest.raises(ValueError):
+            manager.submit(video_id, quality, codec=codec)
+        
+        assert downloader.order == []
+    
+    def test_failed_job_not_reused(self, manager, downloader):
+        downloader.fail.add("aaaaaaaaaaa")
+        failed = _wait_done(manager.submit("aaaaaaaaaaa"))
+        downloader.fail.clear()
+        retried = _wait_done(manager.submit("aaaaaaaaaaa"))
+        
+        assert failed.status == "failed"
+        assert retried is not failed
+        assert retried.status == "done"
+    
+    def test_queue_limit(self, manager, downloader):
+        downloader.gate.clear()
+        manager.submit("aaaaaaaaaaa")
+        _wait_running(manager)
+        for video_id in ("bbbbbbbbbbb", "ccccccccccc", "ddddddddddd"):
+            manager.submit(video_id)
+        
+        with pytest.raises(QueueFullError):
+            manager.submit("eeeeeeeeeee")
+
+
+class TestDownloadJobCache:
+    """Tests for serving finished downloads from the audio file cache."""
+    
+    @pytest.fixture
+    def cached_manager(self, downloader, tmp_path):
+        cache = AudioFileCache(str(tmp_path / "audio"), max_bytes=1_000_000)
+        manager = DownloadJobManager(downloader, workers=1, max_queued=3, job_ttl=0, cache=cache)
+        yield manager, cache
+        manager.shutdown()
+    
+    def test_cached_file_skips_download(self, cached_manager, downloader):
+        """After a job expires, its cached file completes the next job immediately."""
+        manager, cache = cached_manager
+        first = _wait_done(manager.submit("aaaaaaaaaaa"))
+        
+        second = manager.submit("aaaaaaaaaaa")
+        
+        assert second is not first
+        assert second.status == "done"
+        assert second.file_path == cache.path_for("aaaaaaaaaaa", "best")
+        assert os.path.exists(first.file_path)
+        assert downloader.order == ["aaaaaaaaaaa"]
+        assert manager.stats()["cache_hits"] == 1
+    
+    def test_codec_variants_cached_separately(self, cached_manager, downloader):
+        manager, cache = cached_manager
+        m4a = _wait_done(manager.submit("aaaaaaaaaaa"))
+        opus = _wait_done(manager.submit("aaaaaaaaaaa", codec="opus"))
+        
+        assert m4a.file_path == cache.path_for("aaaaaaaaaaa", "best")
+        assert opus.file_path == cache.path_for("aaaaaaaaaaa", "best-opus", ".webm")
+        assert m4a.delivery == opus.delivery == "passthrough"
+        assert manager.submit("aaaaaaaaaaa", codec="opus").delivery == "cached"
+        assert manager.stats()["deliveries"] == {"passthrough": 2}
+    
+    def test_staging_directory_removed(self, cached_manager):
+        manager, cache = cached_manager
+        _wait_done(manager.submit("aaaaaaaaaaa"))
+        
+        assert os.listdir(os.path.join(cache.directory, cache.STAGING_DIR)) == []
+
+
+class GrowingDownloader:
+    """Writes the first half of a .part file, waits on a gate, then finishes it."""
+    
+    CONTENT = b"0123456789" * 1000
+    
+    def __init__(self, tmp_path, delivery="passthrough"):
+        self.tmp_path = tmp_path
+        self.delivery = delivery
+        self.gate = threading.Event()
+    
+    def __call__(self, video_id, quality, progress_hook=None, output_dir=None, codec="m4a"):
+        final = os.path.join(output_dir or self.tmp_path, f"{video_id}.m4a")
+        part = final + ".part"
+        progress_hook({"status": "planned", "delivery": self.delivery})
+        half = len(self.CONTENT) // 2
+        with open(part, "wb") as f:
+            f.write(self.CONTENT[:half])
+            f.flush()
+            progress_hook({
+                "status": "downloading", "downloaded_bytes": half, "total_bytes": len(self.CONTENT),
+                "tmpfilename": part, "filename": final
+            })
+            self.gate.wait(5)
+            f.write(self.CONTENT[half:])
+        os.replace(part, final)
+        return DownloadResult(file_path=final, delivery=self.delivery)
+
+
+class TestProgressiveDownload:
+    """Tests for reading a job's file while it downloads."""
+    
+    @pytest.fixture
+    def growing(self, tmp_path):
+        downloader = GrowingDownloader(tmp_path)
+        yield downloader
+        downloader.gate.set()
+    
+    @pytest.mark.parametrize("delivery", ["passthrough", "remux"])
+    def test_first_bytes_before_download_completes(self, growing, delivery):
+        # A remux job streams YouTube's DASH fragmented MP4 as downloaded
+        growing.delivery = delivery
+        manager = DownloadJobManager(growing, workers=1, max_queued=3, job_ttl=60)
+        job = manager.submit("aaaaaaaaaaa")
+        
+        async def scenario():
+            handle = await open_progressive(job, timeout=5)
+            chunks = iter_progressive(job, handle)
+            first = await chunks.__anext__()
+            running = not job.finished
+            growing.gate.set()
+            rest = [chunk async for chunk in chunks]
+            return first, running, b"".join([first] + rest)
+        
+        first, running, body = asyncio.run(scenario())
+        manager.shutdown()
+        
+        assert first and running
+        assert body == GrowingDownloader.CONTENT
+        assert job.source_bytes == len(GrowingDownloader.CONTENT)
+    
+    def test_transcoded_file_not_progressive(self, tmp_path):
+        # The bytes yt-dlp writes are not the requested codec until FFmpeg runs
+        downloader = GrowingDownloader(tmp_path, delivery="transcode")
+        manager = DownloadJobManager(downloader, workers=1, max_queued=3, job_ttl=60)
+        job = manager.submit("aaaaaaaaaaa")
+        
+        handle = asyncio.run(open_progressive(job, timeout=5))
+        running = not job.finished
+        downloader.gate.set()
+        manager.shutdown()
+        
+        assert handle is None
+        assert running
+    
+    def test_processing_without_partial_file_stops_waiting(self, manager, downloader):
+        """A job past its download with nothing to tail should not hold the wait."""
+        job = manager.submit("aaaaaaaaaaa")
+        _wait_running(manager)
+        job.status = "processing"
+        
+        started = time.monotonic()
+        handle = asyncio.run(open_progressive(job, timeout=5))
+        
+        assert handle is None
+        assert time.monotonic() - started < 1
+
+
+class TestDownloadEndpoints:
+    """Tests for the download job endpoints."""
+    
+    @pytest.fixture(autouse=True)
+    def route_manager(self, manager, monkeypatch):
+        monkeypatch.setattr(download_router, "download_jobs", manager)
+    
+    def test_enqueue_poll_and_fetch(self, manager):
+        response = client.post("/api/v1/download/jobs", json={"video_ids": ["aaaaaaaaaaa"]})
+        
+        assert response.status_code == 202
+        job_id = response.json()["data"]["jobs"][0]["job_id"]
+        _wait_done(manager.get(job_id))
+        
+        status = client.get(f"/api/v1/download/jobs/{job_id}").json()["data"]
+        assert status["status"] == "done"
+        assert status["codec"] == "m4a"
+        assert status["delivery"] == "passthrough"
+        assert status["file_url"] == f"/api/v1/download/jobs/{job_id}/file"
+        
+        file_response = client.get(status["file_url"])
+        assert file_response.status_code == 200
+        assert file_response.headers["content-type"] == "audio/mp4"
+        assert file_response.content == b"audio"
+    
+    def test_opus_file_served_as_webm(self, manager):
+        response = client.post(
+            "/api/v1/download/jobs", json={"video_ids": ["aaaaaaaaaaa"], "codec": "opus"}
+        )
+        job = _wait_done(manager.get(response.json()["data"]["jobs"][0]["job_id"]))
+        
+        file_response = client.get(f"/api/v1/download/jobs/{job.job_id}/file")
+        
+        assert file_response.headers["content-type"] == "audio/webm"
+        assert "aaaaaaaaaaa.webm" in file_response.headers["content-disposition"]
+    
+    def test_file_before_done_conflicts(self, manager, downloader):
+        downloader.gate.clear()
+        job_id = client.post(
+            "/api/v1/download/jobs", json={"video_ids": ["aaaaaaaaaaa"]}
+        ).json()["data"]["jobs"][0]["job_id"]
+        
+        response = client.get(f"/api/v1/download/jobs/{job_id}/file")
+        
+        assert response.status_code == 409
+    
+    def test_invalid_ids_rejected(self):
+        response = client.post("/api/v1/download/jobs", json={"video_ids": ["short"]})
+        
+        assert response.status_code == 422
+    
+    @pytest.mark.parametrize("body", [
+        {"video_ids": ["../../etc/pa"]},
+        {"video_ids": ["aaaaaaaaaaa"], "quality": "/../../../../tmp/x"},
+    ])
+    def test_path_characters_rejected(self, manager, downloader, body):
+        response = client.post("/api/v1/download/jobs", json=body)
+        
+        assert response.status_code == 422
+        assert downloader.order == []
+    
+    def test_legacy_get_validates_inputs(self, manager, downloader):
+        assert client.get("/api/v1/download/aaaaaaaaaa.").status_code == 422
+        assert client.get("/api/v1/download/aaaaaaaaaaa?quality=..%2F..%2Fx").status_code == 422
+        assert downloader.order == []
+    
+    def test_unknown_job(self):
+        assert client.get("/api/v1/download/jobs/missing").status_code == 404
+    
+    def test_legacy_get_waits_for_job(self):
+        response = client.get("/api/v1/download/aaaaaaaaaaa")
+        
+        assert response.status_code == 200
+        assert response.content == b"audio"
+    
+    def test_legacy_progressive_fallback_shares_one_timeout(self, manager, downloader, monkeypatch):
+        """Waiting for a progressive start and then the file should not double the timeout."""
+        from app.config import settings
+        
+        monkeypatch.setattr(settings, "executor_download_timeout", 0.3)
+        downloader.gate.clear()
+        
+        started = time.monotonic()
+        response = client.get("/api/v1/download/aaaaaaaaaaa?progressive=true")
+        
+        assert response.status_code == 504
+        assert time.monotonic() - started < 0.55
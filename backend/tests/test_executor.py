@@ -0,0 +1,129 @@
+"""
+Unit tests for the blocking call executor.
+"""
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.services.executor import BlockingExecutor, WorkerPool, ExecutorTimeoutError
+
+
+@pytest.fixture
+def executor():
+    """Executor with small pools for testing."""
+    executor = BlockingExecutor({
+        "search": WorkerPool("search", max_workers=2, timeout=1.0),
+        "extraction": WorkerPool("extraction", max_workers=1, timeout=0.2),
+    })
+    yield executor
+    executor.shutdown(wait=False)
+
+
+class TestBlockingExecutor:
+    """Tests for BlockingExecutor."""
+
+    def test_run_returns_result(self, executor):
+        """Blocking call result should be returned to the caller."""
+        result = asyncio.run(executor.run("search", lambda a, b: a + b, 2, 3))
+
+        assert result == 5
+        assert executor.stats()["search"]["completed"] == 1
+
+    def test_failed_calls_are_not_counted_as_completed(self, executor):
+        """A call that raises should count as failed only."""
+        def fail():
+            raise ValueError("upstream error")
+
+        with pytest.raises(ValueError):
+            asyncio.run(executor.run("search", fail))
+        asyncio.run(executor.run("search", lambda: None))
+
+        stats = executor.stats()["search"]
+        assert stats["failed"] == 1
+        assert stats["completed"] == 1
+        assert stats["running"] == 0
+
+    def test_run_does_not_block_event_loop(self, executor):
+        """Other coroutines should progress while a blocking call runs."""
+        async def scenario():
+            ticks = 0
+
+            async def ticker():
+                nonlocal ticks
+                for _ in range(5):
+                    await asyncio.sleep(0.01)
+                    ticks += 1
+
+            await asyncio.gather(
+                executor.run("search", time.sleep, 0.2),
+                ticker()
+            )
+            return ticks
+
+        assert asyncio.run(scenario()) == 5
+
+    def test_timeout_raises(self, executor):
+        """Call exceeding the pool timeout should raise ExecutorTimeoutError."""
+        with pytest.raises(ExecutorTimeoutError) as exc_info:
+            asyncio.run(executor.run("extraction", time.sleep, 0.5))
+
+        assert exc_info.value.pool == "extraction"
+        assert executor.stats()["extraction"]["timed_out"] == 1
+
+    def test_per_call_timeout_overrides_pool(self, executor):
+        """Explicit timeout should override the pool default."""
+        result = asyncio.run(
+            executor.run("extraction", lambda: time.sleep(0.3) or "done", timeout=2.0)
+        )
+
+        assert result == "done"
+
+    def test_pools_are_isolated(self, executor):
+        """A saturated pool should not delay calls on another pool."""
+        release = threading.Event()
+
+        async def scenario():
+            blocked = asyncio.ensure_future(
+                executor.run("extraction", release.wait, timeout=5.0)
+            )
+            await asyncio.sleep(0.05)
+            started = time.perf_counter()
+            await executor.run("search", lambda: None)
+            elapsed = time.perf_counter() - started
+            release.set()
+            await blocked
+            return elapsed
+
+        assert asyncio.run(scenario()) < 0.5
+
+    def test_queue_depth_and_wait_time_tracked(self, executor):
+        """Calls waiting for a worker should show up in queue stats."""
+        async def scenario():
+            await asyncio.gather(*[
+                executor.run("extraction", time.sleep, 0.05, timeout=5.0)
+                for _ in range(3)
+            ])
+
+        asyncio.run(scenario())
+        stats = executor.stats()["extraction"]
+
+        assert stats["max_queued"] >= 2
+        assert stats["queued"] == 0
+        assert stats["max_wait_seconds"] > 0.05
+
+    def test_failures_counted(self, executor):
+        """Exceptions should propagate and be counted."""
+        def boom():
+            raise ValueError("boom")
+
+        with pytest.raises(ValueError):
+            asyncio.run(executor.run("search", boom))
+
+        assert executor.stats()["search"]["failed"] == 1
+
+    def test_unknown_pool_rejected(self, executor):
+        """Unknown pool names should raise ValueError."""
+        with pytest.raises(ValueError):
+            asyncio.run(executor.run("nope", lambda: None))
@@ -0,0 +1,84 @@
+"""
+Unit tests for the single-pass JSON response path.
+"""
+import json
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.models.lyrics import LyricsData, LyricsLine
+from app.models.response import ApiResponse
+from app.models.song import MetadataResponse, SearchMeta, Song, UnifiedSearchResponse
+from app.utils.json_response import api_response
+
+
+SONGS = [
+    Song(video_id="aaaaaaaaaaa", title="Lagu – Überlänge ♪", artist="Artis", thumbnail_url="https://x/a.jpg"),
+    Song(video_id="bbbbbbbbbbb", title='Quote "and" \\ slash', artist="B", album="Album",
+         duration_text="3:05", thumbnail_url="https://x/b.jpg"),
+]
+LYRICS = LyricsData(type="synced", lines=[LyricsLine(text="la", start_time_ms=0, end_time_ms=1500)])
+
+
+def _app() -> FastAPI:
+    """Routes returning the same data through the old and the new path."""
+    app = FastAPI()
+    
+    @app.get("/old/songs", response_model=ApiResponse)
+    async def old_songs():
+        return ApiResponse(success=True, data={"songs": [song.model_dump() for song in SONGS], "count": 2})
+    
+    @app.get("/new/songs", response_model=ApiResponse)
+    async def new_songs():
+        return api_response({"songs": SONGS, "count": 2})
+    
+    search = UnifiedSearchResponse(songs=SONGS, playlists=[], meta=SearchMeta(query="q", count=2))
+    
+    @app.get("/old/search", response_model=ApiResponse[UnifiedSearchResponse])
+    async def old_search():
+        return ApiResponse(success=True, data=search)
+    
+    @app.get("/new/search", response_model=ApiResponse[UnifiedSearchResponse])
+    async def new_search():
+        return api_response(search)
+    
+    def metadata(lyrics):
+        return MetadataResponse(
+            video_id="aaaaaaaaaaa", title="t", artist="a", duration_seconds=1, has_lyrics=True, lyrics=lyrics
+        )
+    
+    @app.get("/old/metadata", response_model=ApiResponse)
+    async def old_metadata():
+        return ApiResponse(success=True, data=metadata(LYRICS.model_dump()).model_dump())
+    
+    @app.get("/new/metadata", response_model=ApiResponse)
+    async def new_metadata():
+        return api_response(metadata(LYRICS))
+    
+    return app
+
+
+class TestApiResponse:
+    """Tests for api_response()."""
+    
+    def test_wire_format_matches_response_model_path(self):
+        client = TestClient(_app())
+        
+        for endpoint in ("songs", "search", "metadata"):
+            old = client.get(f"/old/{endpoint}")
+            new = client.get(f"/new/{endpoint}")
+            assert new.content == old.content, endpoint
+            assert new.headers["content-type"] == old.headers["content-type"]
+    
+    def test_matches_compact_json_dumps(self):
+        """Same bytes as Starlette's JSONResponse (older FastAPI encoding)."""
+        body = api_response({"songs": SONGS}).body
+        
+        expected = json.dumps(
+            {"success": True, "data": {"songs": [song.model_dump() for song in SONGS]}, "error": None},
+            ensure_ascii=False, separators=(",", ":")
+        ).encode("utf-8")
+        assert body == expected
+    
+    def test_status_code(self):
+        assert api_response([], status_code=202).status_code == 202
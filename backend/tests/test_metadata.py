@@ -0,0 +1,90 @@
+"""
+Unit tests for metadata and lyrics endpoints with a stubbed service.
+"""
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.models.lyrics import LyricsData, LyricsLine
+from app.services.youtube_music import yt_music_service
+
+
+client = TestClient(app)
+
+SONG = {"videoDetails": {"title": "Song", "author": "Artist - Topic", "lengthSeconds": "180"}}
+LYRICS = LyricsData(type="plain", lines=[LyricsLine(text="la la")], source="lrclib")
+
+
+class TestMetadataLyricsAssembly:
+    """Tests for concurrent song + lyrics resolution."""
+    
+    @pytest.fixture
+    def stub_service(self, monkeypatch):
+        """Stub the song and lyrics lookups, recording lyrics calls."""
+        calls = {"lyrics": [], "lyrics_done": threading.Event()}
+        
+        def get_lyrics(video_id, hints=None):
+            calls["lyrics"].append((video_id, hints))
+            calls["lyrics_done"].set()
+            return LYRICS
+        
+        monkeypatch.setattr(yt_music_service, "get_song_metadata", lambda video_id: SONG)
+        monkeypatch.setattr(yt_music_service, "get_cached_lyrics", lambda video_id: None)
+        monkeypatch.setattr(yt_music_service, "get_lyrics", get_lyrics)
+        return calls
+    
+    def test_lyrics_use_song_details_as_hints(self, stub_service):
+        """Lyrics lookup should get title/artist/duration from videoDetails."""
+        response = client.get("/api/v1/metadata/abcdefghijk")
+        
+        assert response.status_code == 200
+        data = response.json()["data"]
+        assert data["has_lyrics"] is True
+        assert data["lyrics_status"] == "included"
+        assert stub_service["lyrics"] == [
+            ("abcdefghijk", {"title": "Song", "artist": "Artist", "duration_sec": 180})
+        ]
+    
+    def test_cached_lyrics_skip_pipeline(self, stub_service, monkeypatch):
+        """A lyrics cache hit should not run the upstream pipeline."""
+        monkeypatch.setattr(yt_music_service, "get_cached_lyrics", lambda video_id: (LYRICS,))
+        
+        data = client.get("/api/v1/metadata/abcdefghijk").json()["data"]
+        
+        assert data["lyrics"]["lines"][0]["text"] == "la la"
+        assert stub_service["lyrics"] == []
+    
+    def test_include_lyrics_false(self, stub_service):
+        """include_lyrics=false should return metadata without lyrics."""
+        data = client.get("/api/v1/metadata/abcdefghijk?include_lyrics=false").json()["data"]
+        
+        assert data["title"] == "Song"
+        assert data["lyrics"] is None
+        assert data["lyrics_status"] == "skipped"
+        assert stub_service["lyrics"] == []
+    
+    def test_include_lyrics_async_warms_cache(self, stub_service):
+        """include_lyrics=async should return at once and fetch lyrics in the background."""
+        data = client.get("/api/v1/metadata/abcdefghijk?include_lyrics=async").json()["data"]
+        
+        assert data["lyrics_status"] == "pending"
+        assert data["lyrics"] is None
+        assert stub_service["lyrics_done"].wait(2.0)
+    
+    def test_song_not_found(self, stub_service, monkeypatch):
+        """A missing song should still be a 404."""
+        monkeypatch.setattr(yt_music_service, "get_song_metadata", lambda video_id: None)
+        
+        response = client.get("/api/v1/metadata/abcdefghijk")
+        
+        assert response.status_code == 404
+    
+    def test_lyrics_endpoint(self, stub_service):
+        """GET /lyrics should return a LyricsResponse."""
+        data = client.get("/api/v1/lyrics/abcdefghijk").json()["data"]
+        
+        assert data["video_id"] == "abcdefghijk"
+        assert data["has_lyrics"] is True
+        assert data["lyrics"]["source"] == "lrclib"
@@ -0,0 +1,129 @@
+"""
+Unit tests for the metrics registry, upstream timing and /metrics.
+"""
+import math
+
+import pytest
+from fastapi import APIRouter, FastAPI
+from fastapi.testclient import TestClient
+
+from app.middleware import MetricsMiddleware, http_duration
+from app.utils.metrics import InstrumentedClient, MetricsRegistry, upstream_duration, upstream_errors
+
+
+class TestMetricsRegistry:
+    """Tests for counters, gauges, histograms and rendering."""
+
+    def test_histogram_buckets_are_cumulative(self):
+        histogram = MetricsRegistry().histogram("latency_seconds", "Latency", ("route",), buckets=(0.1, 1.0))
+
+        for value in (0.05, 0.1, 0.5, 5.0):
+            histogram.observe(value, "/a")
+
+        snapshot = histogram.snapshot("/a")
+        assert snapshot["buckets"] == {0.1: 2, 1.0: 3, math.inf: 4}
+        assert snapshot["count"] == 4
+        assert snapshot["sum"] == pytest.approx(5.65)
+
+    def test_label_count_is_checked(self):
+        counter = MetricsRegistry().counter("events_total", "Events", ("kind",))
+
+        with pytest.raises(ValueError):
+            counter.inc()
+
+    def test_same_name_returns_same_metric(self):
+        registry = MetricsRegistry()
+
+        assert registry.counter("events_total", "Events") is registry.counter("events_total", "Events")
+        with pytest.raises(ValueError):
+            registry.gauge("events_total", "Events")
+
+    def test_renders_prometheus_text(self):
+        registry = MetricsRegistry()
+        registry.counter("events_total", "Events", ("kind",)).inc('say "hi"', amount=2)
+        registry.gauge("in_flight", "In flight").inc()
+        registry.histogram("latency_seconds", "Latency", buckets=(1.0,)).observe(0.5)
+        registry.register_collector(lambda: [("cache_hits_total", "counter", "Hits", [({"cache": "a"}, 3)])])
+
+        lines = registry.render().splitlines()
+
+        assert "# TYPE events_total counter" in lines
+        assert 'events_total{kind="say \\"hi\\""} 2' in lines
+        assert "in_flight 1" in lines
+        assert 'latency_seconds_bucket{le="1"} 1' in lines
+        assert 'latency_seconds_bucket{le="+Inf"} 1' in lines
+        assert "latency_seconds_count 1" in lines
+        assert 'cache_hits_total{cache="a"} 3' in lines
+
+    def test_failing_collector_is_skipped(self):
+        registry = MetricsRegistry()
+        registry.counter("events_total", "Events").inc()
+
+        def broken():
+            raise RuntimeError("boom")
+
+        registry.register_collector(broken)
+
+        assert "events_total 1" in registry.render()
+
+
+class FakeClient:
+    language = "en"
+
+    def search(self, query):
+        return [query]
+
+    def get_album(self, browse_id):
+        raise RuntimeError("upstream down")
+
+
+class TestInstrumentedClient:
+    """Tests for upstream call timing."""
+
+    def test_times_calls_and_counts_errors(self):
+        client = InstrumentedClient(FakeClient(), "test-upstream", {"search", "get_album"})
+        before = (upstream_duration.snapshot("test-upstream", "search") or {"count": 0})["count"]
+
+        assert client.search("lofi") == ["lofi"]
+        with pytest.raises(RuntimeError):
+            client.get_album("MPREb")
+
+        assert upstream_duration.snapshot("test-upstream", "search")["count"] == before + 1
+        assert upstream_errors.value("test-upstream", "get_album") >= 1
+        assert client.language == "en"
+
+
+class TestMetricsMiddleware:
+    """Tests for per-route latency."""
+
+    def test_labels_by_route_template(self):
+        router = APIRouter()
+
+        @router.get("/items/{item_id}")
+        async def item(item_id: str):
+            return {"id": item_id}
+
+        app = FastAPI()
+        app.include_router(router, prefix="/api/v1")
+        app.add_middleware(MetricsMiddleware)
+        client = TestClient(app)
+
+        client.get("/api/v1/items/1")
+        client.get("/api/v1/items/2")
+        client.get("/missing")
+
+        assert http_duration.snapshot("GET", "/api/v1/items/{item_id}", 200)["count"] == 2
+        assert http_duration.snapshot("GET", "unmatched", 404)["count"] >= 1
+
+    def test_metrics_endpoint(self):
+        from app.main import app
+        client = TestClient(app)
+
+        client.get("/health")
+        response = client.get("/metrics")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        assert 'http_request_duration_seconds_count{method="GET",route="/health",status="200"}' in response.text
+        assert 'cache_hits_total{cache="stream_url"}' in response.text
+        assert 'executor_queued{pool="extraction"}' in response.text
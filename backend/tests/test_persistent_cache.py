@@ -0,0 +1,96 @@
+"""
+Unit tests for the SQLite-backed persistent cache.
+"""
+import multiprocessing
+import time
+
+import pytest
+
+from app.services.persistent_cache import PersistentCache
+
+
+@pytest.fixture
+def cache_path(tmp_path):
+    return str(tmp_path / "cache.sqlite3")
+
+
+@pytest.fixture
+def cache(cache_path):
+    return PersistentCache(cache_path, max_bytes=10_000, ttls={"album": 60})
+
+
+def _write_from_process(path, key):
+    """Write an entry from a separate process."""
+    PersistentCache(path, max_bytes=10_000, ttls={}).set("album", key, {"writer": key}, ttl=60)
+
+
+class TestPersistentCache:
+    """Tests for PersistentCache."""
+    
+    def test_roundtrip(self, cache):
+        """Stored JSON values should be returned."""
+        cache.set("album", "MPREb_1", {"title": "Album", "tracks": [1, 2]})
+        
+        assert cache.get("album", "MPREb_1") == {"title": "Album", "tracks": [1, 2]}
+        assert cache.stats()["hits"] == 1
+    
+    def test_namespaces_are_separate(self, cache):
+        """Same key in different namespaces should not collide."""
+        cache.set("album", "x", 1)
+        cache.set("artist", "x", 2)
+        
+        assert cache.get("album", "x") == 1
+        assert cache.get("artist", "x") == 2
+    
+    def test_expired_entry_misses(self, cache):
+        """Entries should miss once their TTL passes."""
+        cache.set("album", "short", "v", ttl=0.05)
+        time.sleep(0.1)
+        
+        assert cache.get("album", "short") is None
+    
+    def test_max_age_rejects_older_entries(self, cache):
+        """Live entries written longer ago than max_age should miss."""
+        cache.set("album", "x", "v", ttl=60)
+        time.sleep(0.1)
+        
+        assert cache.get("album", "x", max_age=0.05) is None
+        assert cache.get("album", "x", max_age=60) == "v"
+        assert cache.get("album", "x") == "v"
+    
+    def test_survives_reopen(self, cache_path):
+        """Data should be visible to a new instance (restart / other worker)."""
+        PersistentCache(cache_path, max_bytes=10_000, ttls={}).set("song", "abc", {"a": 1}, ttl=60)
+        
+        assert PersistentCache(cache_path, max_bytes=10_000, ttls={}).get("song", "abc") == {"a": 1}
+    
+    def test_concurrent_processes(self, cache_path):
+        """Writes from several processes should all land."""
+        ctx = multiprocessing.get_context("spawn")
+        procs = [ctx.Process(target=_write_from_process, args=(cache_path, f"k{i}")) for i in range(4)]
+        for p in procs:
+            p.start()
+        for p in procs:
+            p.join(30)
+        
+        cache = PersistentCache(cache_path, max_bytes=10_000, ttls={})
+        assert all(cache.get("album", f"k{i}") == {"writer": f"k{i}"} for i in range(4))
+    
+    def test_size_eviction_removes_least_recently_read(self, cache_path):
+        """Eviction should keep the total size under the cap."""
+        cache = PersistentCache(cache_path, max_bytes=500, ttls={})
+        for i in range(10):
+            cache.set("album", f"k{i}", "x" * 100, ttl=60)
+        
+        removed = cache.evict()
+        
+        assert removed > 0
+        assert cache.get("album", "k9") == "x" * 100
+        assert cache.get("album", "k0") is None
+    
+    def test_disabled_cache_is_noop(self, cache_path):
+        """A disabled cache should never return stored values."""
+        cache = PersistentCache(cache_path, max_bytes=10_000, ttls={}, enabled=False)
+        cache.set("album", "k", 1, ttl=60)
+        
+        assert cache.get("album", "k") is None
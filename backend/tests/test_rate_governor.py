@@ -0,0 +1,178 @@
+"""
+Unit tests for the outbound rate governor.
+"""
+import threading
+import time
+import urllib.error
+
+import pytest
+
+from app.services.executor import WorkerPool
+from app.services.rate_governor import (
+    GovernedClient,
+    RateGovernor,
+    RateLimited,
+    current_lane,
+    is_throttle_error,
+    lane,
+)
+
+
+class HTTPStatusError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"status {status_code}")
+        self.status_code = status_code
+
+
+class TestTokenBucket:
+    """Tests for rate, burst and the maximum wait."""
+
+    def test_burst_then_sustained_rate(self):
+        governor = RateGovernor(rate=50.0, burst=3, min_rate=1.0, max_wait=1.0)
+
+        waits = [governor.acquire() for _ in range(4)]
+
+        assert all(wait < 0.001 for wait in waits[:3])
+        assert 0.005 < waits[3] < 0.2
+
+    def test_gives_up_after_max_wait(self):
+        governor = RateGovernor(rate=1.0, burst=1, min_rate=1.0, max_wait=0.05)
+        governor.acquire("background")
+
+        with pytest.raises(RateLimited) as info:
+            governor.acquire("background")
+
+        assert info.value.lane == "background"
+        assert governor.stats()["rejected"]["background"] == 1
+        assert governor.stats()["waiting"]["background"] == 0
+
+    def test_disabled_passes_through(self):
+        governor = RateGovernor(rate=1.0, burst=1, min_rate=1.0, max_wait=0.01, enabled=False)
+
+        for _ in range(5):
+            assert governor.acquire() == 0.0
+
+
+class TestPriorityLanes:
+    """Waiting calls are served by lane priority."""
+
+    def test_stream_is_served_before_earlier_background_calls(self):
+        governor = RateGovernor(rate=20.0, burst=1, min_rate=1.0, max_wait=5.0)
+        governor.acquire()
+        order = []
+
+        def call(name):
+            governor.acquire(name)
+            order.append(name)
+
+        threads = [threading.Thread(target=call, args=("background",)) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        # Both background calls are queued before the stream call arrives
+        while governor.stats()["waiting"]["background"] < 2:
+            time.sleep(0.001)
+        threads.append(threading.Thread(target=call, args=("stream",)))
+        threads[-1].start()
+        for thread in threads:
+            thread.join()
+
+        assert order[0] == "stream"
+
+    def test_lane_comes_from_context_or_pool(self):
+        governor = RateGovernor(rate=10.0, burst=10, min_rate=1.0, max_wait=1.0)
+        pool = WorkerPool("extraction", 1, 5.0, lane="stream")
+
+        with lane("suggest"):
+            governor.acquire()
+            pinned = pool.submit(current_lane).result()
+        unpinned = pool.submit(current_lane).result()
+        pool.shutdown()
+
+        assert governor.stats()["granted"]["suggest"] == 1
+        assert pinned == "suggest"
+        assert unpinned == "stream"
+        assert current_lane() is None
+
+    def test_unknown_lane_is_rejected(self):
+        with pytest.raises(ValueError):
+            with lane("urgent"):
+                pass
+
+
+class TestBackoff:
+    """Tests for adaptive backoff on throttling."""
+
+    def test_throttling_halves_rate_once_per_cooldown(self, clock):
+        governor = RateGovernor(rate=8.0, burst=8, min_rate=1.0, max_wait=1.0, backoff_cooldown=5.0, clock=clock)
+
+        governor.record_outcome(Exception("HTTP Error 429: Too Many Requests"))
+        governor.record_outcome(Exception("HTTP Error 429: Too Many Requests"))
+        assert governor.rate == 4.0
+        assert governor.stats()["tokens"] == 0.0
+
+        clock.now += 6.0
+        governor.record_outcome(Exception("Sign in to confirm you're not a bot"))
+        assert governor.rate == 2.0
+        assert governor.stats()["throttled"] == 3
+        assert governor.stats()["backoffs"] == 2
+
+    def test_rate_never_drops_below_floor(self, clock):
+        governor = RateGovernor(rate=2.0, burst=2, min_rate=1.5, max_wait=1.0, backoff_cooldown=0.0, clock=clock)
+
+        for _ in range(3):
+            clock.now += 1.0
+            governor.record_outcome(HTTPStatusError(429))
+
+        assert governor.rate == 1.5
+
+    def test_successes_recover_the_rate(self):
+        governor = RateGovernor(rate=10.0, burst=10, min_rate=1.0, max_wait=1.0)
+        governor.record_outcome(HTTPStatusError(429))
+
+        for _ in range(100):
+            governor.record_outcome()
+
+        assert governor.rate == 10.0
+
+    def test_other_errors_are_ignored(self):
+        governor = RateGovernor(rate=10.0, burst=10, min_rate=1.0, max_wait=1.0)
+
+        governor.record_outcome(Exception("Video unavailable"))
+
+        assert governor.rate == 10.0
+        assert not is_throttle_error(ValueError("bad id"))
+
+    def test_throttling_is_recognized_by_status_not_digits(self):
+        http_error = urllib.error.HTTPError("https://music.youtube.com", 429, "Too Many Requests", {}, None)
+        wrapped = Exception("ERROR: unable to download")
+        wrapped.exc_info = (type(http_error), http_error, None)
+
+        assert is_throttle_error(HTTPStatusError(429))
+        assert is_throttle_error(http_error)
+        assert is_throttle_error(wrapped)
+        assert is_throttle_error(Exception("Server returned HTTP 429: Too Many Requests."))
+        assert not is_throttle_error(HTTPStatusError(500))
+        assert not is_throttle_error(Exception("Video unavailable: abc429xyz01"))
+        assert not is_throttle_error(Exception("HTTP Error 404 for /watch?v=4291234abcd"))
+
+
+class FakeClient:
+    language = "en"
+
+    def search(self, query):
+        raise RuntimeError("HTTP Error 429: Too Many Requests")
+
+
+class TestGovernedClient:
+    """Tests for the governed client proxy."""
+
+    def test_governs_calls_and_learns_from_errors(self):
+        governor = RateGovernor(rate=10.0, burst=10, min_rate=1.0, max_wait=1.0)
+        client = GovernedClient(FakeClient(), governor, {"search"})
+
+        with pytest.raises(RuntimeError):
+            client.search("lofi")
+
+        assert governor.stats()["granted"]["search"] == 1
+        assert governor.rate == 5.0
+        assert client.language == "en"
@@ -0,0 +1,218 @@
+"""
+Unit tests for the response cache (memory and Redis-protocol backends).
+"""
+import socket
+import socketserver
+import threading
+import time
+
+import pytest
+
+from app.services.response_cache import (
+    MemoryBackend, RedisBackend, ResponseCache, cached_response
+)
+
+
+class FakeRedisHandler(socketserver.StreamRequestHandler):
+    """Tiny RESP server supporting GET, SET [PX], DEL and PING."""
+    
+    def _read_command(self):
+        header = self.rfile.readline()
+        if not header:
+            return None
+        parts = []
+        for _ in range(int(header[1:])):
+            length = int(self.rfile.readline()[1:])
+            parts.append(self.rfile.read(length + 2)[:-2])
+        return parts
+    
+    def handle(self):
+        store = self.server.store
+        while True:
+            parts = self._read_command()
+            if parts is None:
+                return
+            command = parts[0].upper()
+            if self.server.error_reply:
+                self.wfile.write(self.server.error_reply)
+            elif command == b"PING":
+                self.wfile.write(b"+PONG\r\n")
+            elif command == b"SET":
+                expires_at = None
+                if len(parts) >= 5 and parts[3].upper() == b"PX":
+                    expires_at = time.time() + int(parts[4]) / 1000
+                store[parts[1]] = (parts[2], expires_at)
+                self.wfile.write(b"+OK\r\n")
+            elif command == b"GET":
+                value, expires_at = store.get(parts[1], (None, None))
+                if value is None or (expires_at and expires_at < time.time()):
+                    self.wfile.write(b"$-1\r\n")
+                else:
+                    self.wfile.write(b"$%d\r\n%s\r\n" % (len(value), value))
+            elif command == b"DEL":
+                self.wfile.write(b":%d\r\n" % int(store.pop(parts[1], None) is not None))
+            else:
+                self.wfile.write(b"-ERR unknown command\r\n")
+
+
+@pytest.fixture
+def redis_server():
+    """Start a local Redis-protocol stand-in; set error_reply to answer every command with it."""
+    server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), FakeRedisHandler)
+    server.daemon_threads = True
+    server.store = {}
+    server.error_reply = None
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def redis_url(redis_server):
+    return f"redis://127.0.0.1:{redis_server.server_address[1]}/0"
+
+
+class FakeService:
+    """Service with cached methods and an upstream call counter."""
+    
+    def __init__(self, cache):
+        self._response_cache = cache
+        self.calls = 0
+        self.version = 1
+    
+    @cached_response("search", normalize=("query",))
+    def search(self, query: str, limit: int = 10):
+        self.calls += 1
+        return [f"{query}-v{self.version}"] * min(limit, 2)
+    
+    @cached_response("album")
+    def get_album(self, browse_id: str):
+        self.calls += 1
+        return None if browse_id == "missing" else {"browse_id": browse_id, "v": self.version}
+
+
+def make_cache(backend, ttl=60.0, stale_ttl=60.0):
+    return ResponseCache(backend, ttls={"search": ttl, "album": ttl}, stale_ttl=stale_ttl)
+
+
+class TestResponseCache:
+    """Tests for ResponseCache with the in-process backend."""
+    
+    def test_repeat_calls_hit_cache(self):
+        """A second identical call should not reach upstream."""
+        service = FakeService(make_cache(MemoryBackend(100)))
+        
+        assert service.search("coldplay") == service.search("coldplay")
+        assert service.calls == 1
+    
+    def test_query_normalized(self):
+        """Case and whitespace differences should share one entry."""
+        service = FakeService(make_cache(MemoryBackend(100)))
+        service.search("Cold  Play ")
+        service.search("cold play")
+        
+        assert service.calls == 1
+    
+    def test_other_args_distinguish_keys(self):
+        """Different limits should be cached separately."""
+        service = FakeService(make_cache(MemoryBackend(100)))
+        service.search("coldplay", limit=1)
+        service.search("coldplay", limit=5)
+        
+        assert service.calls == 2
+    
+    def test_none_not_cached(self):
+        """Failed lookups (None) should be retried next time."""
+        service = FakeService(make_cache(MemoryBackend(100)))
+        service.get_album("missing")
+        service.get_album("missing")
+        
+        assert service.calls == 2
+    
+    def test_stale_served_then_refreshed(self):
+        """Expired entries should be served stale while refreshing in background."""
+        cache = make_cache(MemoryBackend(100), ttl=0.05)
+        service = FakeService(cache)
+        assert service.get_album("MPREb_1")["v"] == 1
+        
+        time.sleep(0.1)
+        service.version = 2
+        assert service.get_album("MPREb_1")["v"] == 1
+        
+        deadline = time.time() + 2
+        while cache.stats()["refreshes"] == 0 and time.time() < deadline:
+            time.sleep(0.01)
+        assert service.get_album("MPREb_1")["v"] == 2
+        assert cache.stats()["stale_hits"] >= 1
+    
+    def test_without_cache_calls_through(self):
+        """Services without a response cache should call upstream every time."""
+        service = FakeService(None)
+        service.search("coldplay")
+        service.search("coldplay")
+        
+        assert service.calls == 2
+
+
+class TestRedisBackend:
+    """Tests for the Redis-protocol backend against a local stand-in."""
+    
+    def test_shared_between_instances(self, redis_url):
+        """Entries written by one process' cache should be read by another."""
+        first = FakeService(make_cache(RedisBackend(redis_url)))
+        second = FakeService(make_cache(RedisBackend(redis_url)))
+        
+        first.get_album("MPREb_1")
+        assert second.get_album("MPREb_1") == {"browse_id": "MPREb_1", "v": 1}
+        assert second.calls == 0
+    
+    def test_unreachable_server_falls_back_to_upstream(self):
+        """Backend errors should degrade to cache misses."""
+        service = FakeService(make_cache(RedisBackend("redis://127.0.0.1:1/0", timeout=0.2)))
+        
+        assert service.get_album("MPREb_1")["v"] == 1
+        assert service.calls == 1
+    
+    def test_unreachable_server_is_not_retried_on_every_call(self, monkeypatch, clock):
+        """After repeated connection failures the server is skipped for a while."""
+        backend = RedisBackend(
+            "redis://127.0.0.1:1/0", timeout=0.2, failure_threshold=2, retry_after=30.0, clock=clock
+        )
+        connects = []
+        
+        def refuse(*args, **kwargs):
+            connects.append(args)
+            raise ConnectionRefusedError("refused")
+        
+        monkeypatch.setattr(socket, "create_connection", refuse)
+        for _ in range(5):
+            assert backend.get("album:MPREb_1") is None
+        assert len(connects) == 2
+        assert backend.breaker.state == "open"
+        
+        clock.now += 31.0
+        assert backend.get("album:MPREb_1") is None
+        assert len(connects) == 3
+    
+    def test_error_reply_during_half_open_trial_closes_circuit(self, redis_server, redis_url, monkeypatch, clock):
+        """An error reply proves the server is reachable and must settle the trial."""
+        backend = RedisBackend(redis_url, failure_threshold=1, retry_after=30.0, clock=clock)
+        
+        def refuse(*args, **kwargs):
+            raise ConnectionRefusedError("refused")
+        
+        with monkeypatch.context() as patched:
+            patched.setattr(socket, "create_connection", refuse)
+            assert backend.get("album:MPREb_1") is None
+        assert backend.breaker.state == "open"
+        
+        clock.now += 31.0
+        redis_server.error_reply = b"-LOADING Redis is loading the dataset in memory\r\n"
+        assert backend.get("album:MPREb_1") is None
+        assert backend.breaker.state == "closed"
+        
+        redis_server.error_reply = None
+        backend.set("album:MPREb_1", "v", 60)
+        assert backend.get("album:MPREb_1") == "v"
@@ -93,3 +93,79 @@ class TestSearchEndpoint:
             thumbnail = data["data"]["songs"][0]["thumbnail_url"]
             # Should contain high-res dimensions
             assert "w800" in thumbnail or "w544" in thumbnail or thumbnail != ""
+
+
+class TestUnifiedSearchFanOut:
+    """Tests for concurrent type=all search with partial results (offline)."""
+    
+    @pytest.fixture
+    def stub_search(self, monkeypatch):
+        """Replace upstream search calls with fast local stubs."""
+        from app.config import settings
+        from app.models.album import Album
+        from app.models.song import Song
+        from app.services.youtube_music import yt_music_service
+        
+        monkeypatch.setattr(settings, "search_section_timeout", 0.3)
+        monkeypatch.setattr(yt_music_service, "search_songs", lambda q, limit: [
+            Song(video_id="abcdefghijk", title="Song", artist="Artist", thumbnail_url="")
+        ])
+        monkeypatch.setattr(yt_music_service, "search_playlists", lambda q, limit: [])
+        monkeypatch.setattr(yt_music_service, "search_albums", lambda q, limit: [
+            Album(browse_id="MPREb_1", title="Album", thumbnail_url="")
+        ])
+        monkeypatch.setattr(yt_music_service, "search_artists", lambda q, limit: [])
+        return monkeypatch, yt_music_service
+    
+    def test_all_sections_ok(self, stub_search):
+        """Every section should report ok when all branches succeed."""
+        response = client.get("/api/v1/search?q=stub")
+        
+        assert response.status_code == 200
+        meta = response.json()["data"]["meta"]
+        assert meta["count"] == 2
+        assert meta["sections"] == {
+            "songs": "ok", "playlists": "ok", "albums": "ok", "artists": "ok"
+        }
+    
+    def test_slow_section_returns_partial_results(self, stub_search):
+        """A branch missing its deadline should not hold back the others."""
+        import time
+        monkeypatch, service = stub_search
+        monkeypatch.setattr(service, "search_playlists", lambda q, limit: time.sleep(1) or [])
+        
+        started = time.perf_counter()
+        response = client.get("/api/v1/search?q=stub")
+        elapsed = time.perf_counter() - started
+        
+        assert response.status_code == 200
+        data = response.json()["data"]
+        assert elapsed < 0.9
+        assert len(data["songs"]) == 1
+        assert data["meta"]["sections"]["playlists"] == "timeout"
+        assert data["meta"]["sections"]["songs"] == "ok"
+    
+    def test_failed_section_reported(self, stub_search):
+        """A failing branch should be flagged as error."""
+        monkeypatch, service = stub_search
+        
+        def boom(q, limit):
+            raise RuntimeError("upstream down")
+        
+        monkeypatch.setattr(service, "search_artists", boom)
+        response = client.get("/api/v1/search?q=stub")
+        
+        assert response.status_code == 200
+        assert response.json()["data"]["meta"]["sections"]["artists"] == "error"
+    
+    def test_single_type_failure_is_error(self, stub_search):
+        """When the only requested section fails the request should fail."""
+        monkeypatch, service = stub_search
+        
+        def boom(q, limit):
+            raise RuntimeError("upstream down")
+        
+        monkeypatch.setattr(service, "search_songs", boom)
+        response = client.get("/api/v1/search?q=stub&type=songs")
+        
+        assert response.status_code == 500
@@ -2,6 +2,7 @@
 Unit tests for stream endpoint.
 """
 import pytest
+import yt_dlp
 from fastapi.testclient import TestClient
 
 from app.main import app
@@ -78,3 +79,231 @@ class TestStreamEndpoint:
         assert data["expires_in_seconds"] <= 86400
         # Should be at least 1 hour
         assert data["expires_in_seconds"] >= 3600
+
+
+class FakeYoutubeDL:
+    """Offline stand-in for yt_dlp.YoutubeDL that counts extractions."""
+    
+    calls = 0
+    delay = 0.2
+    
+    def __init__(self, opts):
+        self.opts = opts
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        return False
+    
+    def get_info_extractor(self, ie_key):
+        return None
+    
+    def extract_info(self, url, download=False):
+        import time
+        type(self).calls += 1
+        time.sleep(self.delay)
+        return {"formats": [{
+            "url": "https://rr1.googlevideo.com/videoplayback?expire=9999999999",
+            "ext": "m4a",
+            "acodec": "mp4a.40.2",
+            "vcodec": "none",
+            "abr": 129.5,
+        }]}
+
+
+class TestStreamExtractionCoalescing:
+    """Tests for single-flight stream extraction (offline)."""
+    
+    @pytest.fixture
+    def service(self, monkeypatch):
+        """Fresh extractor service backed by FakeYoutubeDL."""
+        from app.services import stream_extractor
+        
+        FakeYoutubeDL.calls = 0
+        monkeypatch.setattr(yt_dlp, "YoutubeDL", FakeYoutubeDL)
+        return stream_extractor.StreamExtractorService()
+    
+    def test_concurrent_requests_share_one_extraction(self, service):
+        """Concurrent callers for the same video should trigger one extraction."""
+        from concurrent.futures import ThreadPoolExecutor
+        
+        with ThreadPoolExecutor(max_workers=5) as pool:
+            results = list(pool.map(service.get_stream_url, ["dQw4w9WgXcQ"] * 5))
+        
+        assert FakeYoutubeDL.calls == 1
+        assert len({r.url for r in results}) == 1
+        stats = service.stats()
+        assert stats["extractions"] == 1
+        assert stats["coalesced"] == 4
+    
+    def test_errors_shared_with_waiters(self, service, monkeypatch):
+        """Every concurrent caller should receive the leader's error."""
+        from concurrent.futures import ThreadPoolExecutor
+        
+        def failing_extract(self, url, download=False):
+            import time
+            type(self).calls += 1
+            time.sleep(0.2)
+            raise RuntimeError("Video unavailable")
+        
+        monkeypatch.setattr(FakeYoutubeDL, "extract_info", failing_extract)
+        
+        def call(video_id):
+            try:
+                service.get_stream_url(video_id)
+            except RuntimeError as e:
+                return str(e)
+        
+        with ThreadPoolExecutor(max_workers=3) as pool:
+            errors = list(pool.map(call, ["dQw4w9WgXcQ"] * 3))
+        
+        assert errors == ["Video unavailable"] * 3
+        assert FakeYoutubeDL.calls == 1
+    
+    def test_cached_result_reused(self, service):
+        """Sequential calls should hit the cache after the first extraction."""
+        service.get_stream_url("dQw4w9WgXcQ")
+        service.get_stream_url("dQw4w9WgXcQ")
+        
+        assert FakeYoutubeDL.calls == 1
+        assert service.stats()["cache_hits"] == 1
+
+
+class TestStreamUrlExpiry:
+    """Tests for expiry derived from the googlevideo expire parameter."""
+    
+    def test_parse_url_expiry(self):
+        """The expire query parameter should be parsed as a timestamp."""
+        from app.services.stream_extractor import parse_url_expiry
+        
+        url = "https://rr1.googlevideo.com/videoplayback?expire=1700000000&ei=abc"
+        assert parse_url_expiry(url) == 1700000000.0
+        assert parse_url_expiry("https://example.com/audio.m4a") is None
+    
+    def test_expires_in_reports_remaining_lifetime(self):
+        """expires_in_seconds should shrink as the URL ages."""
+        import time
+        from app.services.stream_extractor import StreamInfo
+        
+        info = StreamInfo(url="", format="m4a", quality=None, expires_at=time.time() + 3600)
+        assert 3590 <= info.expires_in_seconds <= 3600
+        
+        info.expires_at = time.time() - 10
+        assert info.expires_in_seconds == 0
+    
+    def test_url_near_expiry_not_cached(self, monkeypatch):
+        """A URL expiring within the safety margin should not be cached."""
+        import time
+        from app.services import stream_extractor
+        
+        expire = int(time.time()) + 60
+        
+        class ShortLivedYoutubeDL(FakeYoutubeDL):
+            delay = 0
+            
+            def extract_info(self, url, download=False):
+                type(self).calls += 1
+                return {"formats": [{
+                    "url": f"https://rr1.googlevideo.com/videoplayback?expire={expire}",
+                    "ext": "m4a", "acodec": "mp4a.40.2", "vcodec": "none", "abr": 128,
+                }]}
+        
+        ShortLivedYoutubeDL.calls = 0
+        monkeypatch.setattr(yt_dlp, "YoutubeDL", ShortLivedYoutubeDL)
+        service = stream_extractor.StreamExtractorService()
+        
+        first = service.get_stream_url("dQw4w9WgXcQ")
+        service.get_stream_url("dQw4w9WgXcQ")
+        
+        assert first.expires_in_seconds <= 60
+        assert ShortLivedYoutubeDL.calls == 2
+    
+    def test_persistent_cache_shared_between_services(self, monkeypatch, tmp_path):
+        """A URL extracted by one worker should be reused by another."""
+        from app.services import stream_extractor
+        from app.services.persistent_cache import PersistentCache
+        
+        FakeYoutubeDL.calls = 0
+        monkeypatch.setattr(FakeYoutubeDL, "delay", 0)
+        monkeypatch.setattr(yt_dlp, "YoutubeDL", FakeYoutubeDL)
+        store = PersistentCache(str(tmp_path / "cache.sqlite3"), max_bytes=10_000, ttls={})
+        
+        first = stream_extractor.StreamExtractorService(store=store).get_stream_url("dQw4w9WgXcQ")
+        second = stream_extractor.StreamExtractorService(store=store).get_stream_url("dQw4w9WgXcQ")
+        
+        assert FakeYoutubeDL.calls == 1
+        assert second.url == first.url
+        assert second.expires_at == first.expires_at
+
+
+class TestStreamBatch:
+    """Tests for batch stream resolution (offline)."""
+    
+    @pytest.fixture
+    def stub_streams(self, monkeypatch):
+        """Stub the extractor: one cached video, one failing, others resolve."""
+        import time
+        from app.services.stream_extractor import stream_extractor_service, StreamInfo
+        
+        def make(video_id):
+            return StreamInfo(
+                url=f"https://rr1.googlevideo.com/{video_id}", format="m4a",
+                quality="128kbps", expires_at=time.time() + 3600
+            )
+        
+        def get_stream_url(video_id):
+            if video_id == "failingvid1":
+                raise RuntimeError("Video unavailable")
+            return make(video_id)
+        
+        monkeypatch.setattr(
+            stream_extractor_service, "get_cached_stream",
+            lambda video_id: make(video_id) if video_id == "cachedvid01" else None
+        )
+        monkeypatch.setattr(stream_extractor_service, "get_stream_url", get_stream_url)
+    
+    def test_batch_streams_items_with_per_item_errors(self, stub_streams):
+        """Each video should get its own line; failures should not fail the batch."""
+        import json
+        
+        response = client.post("/api/v1/stream/batch", json={
+            "video_ids": ["freshvideo1", "cachedvid01", "failingvid1", "freshvideo1"]
+        })
+        
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        items = [json.loads(line) for line in response.text.splitlines()]
+        by_id = {item["video_id"]: item for item in items}
+        
+        assert len(items) == 3
+        assert items[0]["video_id"] == "cachedvid01"
+        assert by_id["freshvideo1"]["success"] is True
+        assert by_id["freshvideo1"]["data"]["stream_url"].endswith("freshvideo1")
+        assert by_id["failingvid1"]["success"] is False
+        assert by_id["failingvid1"]["error"]["code"] == "STREAM_FAILED"
+    
+    def test_batch_leaves_an_extraction_worker_free(self, monkeypatch):
+        """A batch should never occupy every extraction worker."""
+        from app.config import settings
+        from app.routers import stream as stream_router
+        
+        workers = stream_router.blocking_executor.pool("extraction").max_workers
+        monkeypatch.setattr(settings, "stream_batch_concurrency", 100)
+        
+        assert stream_router._batch_concurrency() == max(1, workers - 1)
+    
+    def test_batch_rejects_invalid_ids(self, stub_streams):
+        """Malformed video IDs should be rejected up front."""
+        response = client.post("/api/v1/stream/batch", json={"video_ids": ["short"]})
+        
+        assert response.status_code == 400
+    
+    def test_batch_rejects_oversized_batch(self, stub_streams):
+        """Batches over the configured limit should be rejected."""
+        from app.config import settings
+        
+        ids = [f"video{i:06d}" for i in range(settings.stream_batch_max_ids + 1)]
+        response = client.post("/api/v1/stream/batch", json={"video_ids": ids})
+        
+        assert response.status_code == 400
@@ -0,0 +1,151 @@
+"""
+Unit tests for speculative stream URL prefetch.
+"""
+import threading
+import time
+
+import pytest
+
+from app.services.executor import BlockingExecutor, WorkerPool
+from app.services.stream_extractor import StreamExtractorService, StreamInfo
+from app.services.stream_prefetch import StreamPrefetcher
+
+
+def _stream_info():
+    return StreamInfo(url="https://example.com/a", format="m4a", quality=None, expires_at=time.time() + 6 * 3600)
+
+
+class FakeExtractor:
+    """Records prefetches; some videos start out cached."""
+    
+    def __init__(self, cached=()):
+        self.cached = set(cached)
+        self.prefetched = []
+        self.done = threading.Event()
+    
+    def get_cached_stream(self, video_id):
+        return _stream_info() if video_id in self.cached else None
+    
+    def prefetch(self, video_id):
+        self.prefetched.append(video_id)
+        self.cached.add(video_id)
+        self.done.set()
+
+
+@pytest.fixture
+def executor():
+    executor = BlockingExecutor({
+        "extraction": WorkerPool("extraction", max_workers=1, timeout=1.0),
+        "prefetch": WorkerPool("prefetch", max_workers=1, timeout=1.0),
+    })
+    yield executor
+    executor.shutdown(wait=False)
+
+
+def _wait_idle(prefetcher, timeout=2.0):
+    deadline = time.time() + timeout
+    while prefetcher.stats()["pending"] and time.time() < deadline:
+        time.sleep(0.01)
+
+
+class TestStreamPrefetcher:
+    """Tests for StreamPrefetcher scheduling."""
+    
+    def test_prefetches_first_uncached_tracks(self, executor):
+        extractor = FakeExtractor(cached={"a"})
+        prefetcher = StreamPrefetcher(extractor, executor, tracks=2, per_minute=60, burst=10)
+        
+        assert prefetcher.schedule(["a", "b", "c", "d"]) == 2
+        _wait_idle(prefetcher)
+        
+        assert sorted(extractor.prefetched) == ["b", "c"]
+    
+    def test_rate_budget_throttles_and_refills(self, executor, clock):
+        extractor = FakeExtractor()
+        prefetcher = StreamPrefetcher(extractor, executor, tracks=3, per_minute=60, burst=2, clock=clock)
+        
+        assert prefetcher.schedule(["a", "b", "c"]) == 2
+        assert prefetcher.stats()["throttled"] == 1
+        _wait_idle(prefetcher)
+        assert prefetcher.schedule(["c"]) == 0
+        
+        clock.now += 1.0
+        assert prefetcher.schedule(["c"]) == 1
+    
+    def test_deferred_while_user_extractions_queued(self, executor):
+        extractor = FakeExtractor()
+        prefetcher = StreamPrefetcher(extractor, executor, tracks=3, per_minute=60, burst=10)
+        release = threading.Event()
+        executor.submit("extraction", release.wait, 2)
+        executor.submit("extraction", release.wait, 2)
+        
+        try:
+            assert prefetcher.schedule(["a"]) == 0
+            assert prefetcher.stats()["deferred"] == 1
+        finally:
+            release.set()
+    
+    def test_disabled(self, executor):
+        prefetcher = StreamPrefetcher(FakeExtractor(), executor, tracks=3, per_minute=60, burst=10, enabled=False)
+        
+        assert prefetcher.schedule(["a"]) == 0
+
+
+class TestPrefetchHits:
+    """Tests for counting requests served by a prefetched stream."""
+    
+    def test_first_request_after_prefetch_is_a_prefetch_hit(self, monkeypatch):
+        service = StreamExtractorService()
+        
+        def extract(video_id):
+            stream_info = _stream_info()
+            service._cache.set(video_id, stream_info, 60)
+            return stream_info
+        
+        monkeypatch.setattr(service, "_extract_uncached", extract)
+        service.prefetch("abcdefghijk")
+        service.get_stream_url("abcdefghijk")
+        service.get_stream_url("abcdefghijk")
+        
+        stats = service.stats()
+        assert stats["prefetches"] == 1
+        assert stats["prefetch_hits"] == 1
+        assert stats["cache_hits"] == 2
+    
+    def test_stored_stream_is_not_counted_as_prefetch(self, monkeypatch):
+        service = StreamExtractorService()
+        monkeypatch.setattr(service, "_load_stored", lambda video_id: _stream_info())
+        monkeypatch.setattr(service, "_extract_uncached", lambda video_id: pytest.fail("extracted"))
+        
+        service.prefetch("abcdefghijk")
+        
+        assert service.stats()["prefetches"] == 0
+    
+    def test_user_request_does_not_wait_for_prefetch(self, monkeypatch):
+        service = StreamExtractorService()
+        release = threading.Event()
+        calls = []
+        
+        def extract(video_id):
+            calls.append(threading.current_thread().name)
+            if len(calls) == 1:
+                # The prefetch extraction is slow (low-priority lane)
+                release.wait(5)
+            stream_info = _stream_info()
+            service._cache.set(video_id, stream_info, 60)
+            return stream_info
+        
+        monkeypatch.setattr(service, "_extract_uncached", extract)
+        prefetch = threading.Thread(target=service.prefetch, args=("abcdefghijk",), name="prefetch")
+        prefetch.start()
+        while not calls:
+            time.sleep(0.001)
+        
+        try:
+            started = time.time()
+            assert service.get_stream_url("abcdefghijk").url == "https://example.com/a"
+            assert time.time() - started < 1.0
+        finally:
+            release.set()
+            prefetch.join()
+        assert calls == ["prefetch", "MainThread"]
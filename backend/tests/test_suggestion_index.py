@@ -0,0 +1,117 @@
+"""
+Unit tests for the autocomplete prefix index.
+"""
+from app.utils.suggestion_index import SuggestionIndex, suggestion_key
+
+
+FULL_PAGE = ["lofi hip hop", "lofi girl", "lofi beats", "lofi jazz", "lofi rain"]
+
+
+class TestLookup:
+    """Tests for exact and derived lookups."""
+
+    def test_repeat_prefix_is_a_hit(self):
+        index = SuggestionIndex(page_size=5)
+        index.add("Lofi", FULL_PAGE)
+
+        assert index.lookup("lofi") == FULL_PAGE
+        assert index.lookup("  LOFI") == FULL_PAGE
+        assert index.lookup("lof") is None
+        assert index.stats()["hits"] == 2
+        assert index.stats()["misses"] == 1
+
+    def test_longer_prefix_is_derived_from_complete_list(self):
+        index = SuggestionIndex(page_size=5)
+        index.add("lofi", FULL_PAGE)
+        index.add("lofi h", ["lofi hip hop", "Lofi Hip Hop Radio"])
+
+        # Shorter than a full page, so nothing else starts with "lofi h"
+        assert index.lookup("lofi hi") == ["lofi hip hop", "Lofi Hip Hop Radio"]
+        assert index.lookup("lofi hip hop r") == ["Lofi Hip Hop Radio"]
+        assert index.lookup("lofi hop") == []
+        assert index.lookup("lofi x") is None
+        assert index.stats()["derived"] == 3
+
+    def test_full_page_is_not_used_for_derivation(self):
+        index = SuggestionIndex(page_size=5)
+        index.add("lofi", FULL_PAGE)
+
+        assert index.lookup("lofi g") is None
+
+    def test_completeness_uses_configured_page_size(self):
+        # Not learned from earlier responses: a full page is never complete
+        for page_size, expected in ((3, ["lofi"]), (2, None), (0, None)):
+            index = SuggestionIndex(page_size=page_size)
+            index.add("ab", ["abba"])
+            index.add("lo", ["lofi", "love"])
+
+            assert index.lookup("lof") == expected
+
+    def test_empty_complete_list_answers_longer_prefixes(self):
+        index = SuggestionIndex(page_size=5)
+        index.add("lofi", FULL_PAGE)
+        index.add("xq", [])
+
+        assert index.lookup("xqzt") == []
+
+    def test_entries_expire(self, clock):
+        index = SuggestionIndex(ttl=60, page_size=5, clock=clock)
+        index.add("lofi", FULL_PAGE)
+        index.add("lofi h", ["lofi hip hop"])
+        assert index.lookup("lofi hi") == ["lofi hip hop"]
+
+        clock.now += 61
+
+        assert index.lookup("lofi hi") is None
+        assert index.lookup("lofi") is None
+        assert len(index) == 0
+
+    def test_disabled_index_never_hits(self):
+        index = SuggestionIndex(enabled=False)
+        index.add("lofi", FULL_PAGE)
+
+        assert index.lookup("lofi") is None
+        assert len(index) == 0
+
+    def test_normalization_keeps_trailing_space(self):
+        assert suggestion_key("  Lofi \t Hip ") == "lofi hip "
+
+
+class TestEviction:
+    """Tests for bounded size and frequency-based eviction."""
+
+    def test_least_used_prefixes_are_evicted(self):
+        index = SuggestionIndex(max_entries=10)
+        for i in range(10):
+            index.add(f"query {i}", FULL_PAGE)
+        for _ in range(3):
+            index.lookup("query 0")
+            index.lookup("query 1")
+
+        index.add("query new", FULL_PAGE)
+
+        assert len(index) == 10
+        assert index.lookup("query 0") == FULL_PAGE
+        assert index.lookup("query 1") == FULL_PAGE
+        assert index.lookup("query new") == FULL_PAGE
+        assert index.stats()["evictions"] == 1
+
+    def test_eviction_passes_are_batched(self, monkeypatch):
+        index = SuggestionIndex(max_entries=100)
+        passes = []
+        evict = index._evict
+        monkeypatch.setattr(index, "_evict", lambda keep: passes.append(keep) or evict(keep))
+
+        for i in range(120):
+            index.add(f"q{i}", FULL_PAGE)
+
+        # One pass frees a tenth, so 20 inserts past the cap need two
+        assert len(passes) == 2
+
+    def test_size_stays_bounded(self):
+        index = SuggestionIndex(max_entries=100)
+
+        for i in range(1000):
+            index.add(f"q{i}", FULL_PAGE)
+
+        assert len(index) <= 100
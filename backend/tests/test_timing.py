@@ -0,0 +1,177 @@
+"""
+Unit tests for request spans, Server-Timing and the slow-request log.
+"""
+import asyncio
+import contextvars
+import json
+import logging
+import time
+
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+from app.middleware import TimingMiddleware
+from app.services.executor import WorkerPool
+from app.utils.timing import detached, end_trace, span, start_trace, timed
+
+
+@timed("tiny")
+def tiny_call():
+    return 1
+
+
+class TestSpans:
+    """Tests for the span tree."""
+
+    def test_untraced_spans_are_no_ops(self):
+        with span("anything") as current:
+            assert current is None
+        assert tiny_call() == 1
+
+    def test_nesting_and_exclusive_times(self):
+        trace, token = start_trace("GET")
+        with span("outer"):
+            time.sleep(0.02)
+            with span("inner", video_id="abc"):
+                time.sleep(0.03)
+            for _ in range(3):
+                tiny_call()
+        end_trace(trace, token)
+
+        tree = trace.to_dict()
+        outer = tree["children"][0]
+        assert outer["name"] == "outer"
+        assert outer["children"][0]["attributes"] == {"video_id": "abc"}
+        assert outer["aggregates"]["tiny"]["calls"] == 3
+        phases = {name: (calls, seconds) for name, calls, seconds in trace.phases()}
+        assert 0.015 < phases["outer"][1] < outer["ms"] / 1000
+        assert phases["inner"][1] >= 0.03
+        assert phases["tiny"][0] == 3
+
+    def test_closed_trace_ignores_late_spans(self):
+        trace, token = start_trace("GET")
+        # Work still running after the response, e.g. on a worker thread
+        context = contextvars.copy_context()
+        end_trace(trace, token)
+
+        def late():
+            with span("late"):
+                pass
+
+        context.run(late)
+
+        assert "children" not in trace.to_dict()
+
+    def test_server_timing_header(self):
+        trace, token = start_trace("GET")
+        with span("fetch.album"):
+            pass
+        tiny_call()
+        tiny_call()
+        end_trace(trace, token)
+
+        header = trace.server_timing()
+
+        assert header.startswith("fetch.album;dur=")
+        assert 'tiny;desc="2 calls";dur=' in header
+        assert ", total;dur=" in header
+
+
+class TestExecutorPropagation:
+    """Spans cross into worker threads through the blocking pools."""
+
+    def test_worker_spans_nest_under_submitter(self):
+        pool = WorkerPool("browse", 2, 5.0)
+
+        def work():
+            with span("fetch.artist"):
+                return 42
+
+        async def request():
+            with span("route"):
+                return await pool.run(work)
+
+        trace, token = start_trace("GET")
+        assert asyncio.run(request()) == 42
+        end_trace(trace, token)
+        pool.shutdown()
+
+        route = trace.to_dict()["children"][0]
+        assert route["aggregates"]["queue.browse"]["calls"] == 1
+        assert route["children"][0]["name"] == "browse"
+        assert route["children"][0]["children"][0]["name"] == "fetch.artist"
+
+    def test_detached_work_is_not_recorded(self):
+        pool = WorkerPool("browse", 1, 5.0)
+
+        def background():
+            with span("refresh"):
+                pass
+
+        trace, token = start_trace("GET")
+        with detached():
+            pool.submit(background).result()
+        end_trace(trace, token)
+        pool.shutdown()
+
+        assert trace.to_dict().get("children") is None
+
+
+def _app(**kwargs) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/slow")
+    def slow():
+        with span("upstream"):
+            time.sleep(0.02)
+        return {"ok": True}
+
+    @app.get("/stream")
+    def stream():
+        def body():
+            for _ in range(5):
+                time.sleep(0.02)
+                yield b"x"
+        return StreamingResponse(body())
+
+    app.add_middleware(TimingMiddleware, **kwargs)
+    return app
+
+
+class TestTimingMiddleware:
+    """Tests for the Server-Timing header and the slow log."""
+
+    def test_adds_server_timing(self):
+        response = TestClient(_app()).get("/slow")
+
+        assert response.status_code == 200
+        assert response.headers["server-timing"].startswith("upstream;dur=")
+
+    def test_header_can_be_disabled(self):
+        response = TestClient(_app(server_timing=False)).get("/slow")
+
+        assert "server-timing" not in response.headers
+
+    def test_logs_slow_requests_with_span_tree(self, caplog):
+        with caplog.at_level(logging.WARNING, logger="app.slow_requests"):
+            TestClient(_app(slow_threshold=0.01)).get("/slow")
+
+        entry = json.loads(caplog.records[-1].getMessage())
+        assert entry["event"] == "slow_request"
+        assert entry["route"] == "/slow"
+        assert entry["status"] == 200
+        assert entry["spans"]["children"][0]["name"] == "upstream"
+
+    def test_fast_requests_are_not_logged(self, caplog):
+        with caplog.at_level(logging.WARNING, logger="app.slow_requests"):
+            TestClient(_app(slow_threshold=5.0)).get("/slow")
+
+        assert caplog.records == []
+
+    def test_long_streamed_body_is_not_slow(self, caplog):
+        with caplog.at_level(logging.WARNING, logger="app.slow_requests"):
+            response = TestClient(_app(slow_threshold=0.05)).get("/stream")
+
+        assert response.content == b"xxxxx"
+        assert caplog.records == []
@@ -0,0 +1,114 @@
+"""
+Unit tests for the pooled yt-dlp instances.
+"""
+import threading
+
+import pytest
+
+from app.services.ydl_pool import YoutubeDLPool, PoolExhaustedError
+
+
+class FakeYDL:
+    """Minimal YoutubeDL stand-in that records lifecycle calls."""
+    
+    created = 0
+    
+    def __init__(self, opts):
+        type(self).created += 1
+        self.opts = opts
+        self.closed = False
+        self.extractors = []
+    
+    def get_info_extractor(self, ie_key):
+        self.extractors.append(ie_key)
+    
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture(autouse=True)
+def reset_counter():
+    FakeYDL.created = 0
+
+
+class TestYoutubeDLPool:
+    """Tests for YoutubeDLPool."""
+    
+    def test_instances_are_reused(self):
+        """Sequential acquisitions should reuse one instance."""
+        pool = YoutubeDLPool({}, size=2, max_uses=100, factory=FakeYDL)
+        
+        instances = []
+        for _ in range(5):
+            with pool.acquire() as ydl:
+                instances.append(ydl)
+        
+        assert all(ydl is instances[0] for ydl in instances)
+        
+        assert FakeYDL.created == 1
+        assert pool.stats()["acquisitions"] == 5
+    
+    def test_warm_creates_instances(self):
+        """Warm-up should create the full pool and load the YouTube extractor."""
+        pool = YoutubeDLPool({}, size=3, max_uses=100, factory=FakeYDL)
+        pool.warm()
+        
+        stats = pool.stats()
+        assert stats["instances"] == 3
+        assert stats["idle"] == 3
+        with pool.acquire() as ydl:
+            assert ydl.extractors == ["Youtube"]
+        assert FakeYDL.created == 3
+    
+    def test_recycled_after_max_uses(self):
+        """An instance should be closed and replaced after max_uses."""
+        pool = YoutubeDLPool({}, size=1, max_uses=2, factory=FakeYDL)
+        
+        with pool.acquire() as first:
+            pass
+        with pool.acquire() as second:
+            pass
+        with pool.acquire() as third:
+            pass
+        
+        assert first is second
+        assert third is not first
+        assert first.closed
+        assert pool.stats()["recycled"] == 1
+    
+    def test_recycled_on_error(self):
+        """A failing extraction should discard its instance."""
+        pool = YoutubeDLPool({}, size=1, max_uses=100, factory=FakeYDL)
+        
+        with pytest.raises(RuntimeError):
+            with pool.acquire() as broken:
+                raise RuntimeError("extraction failed")
+        with pool.acquire() as fresh:
+            pass
+        
+        assert broken.closed
+        assert fresh is not broken
+    
+    def test_waits_when_exhausted(self):
+        """Callers should time out when every instance is busy."""
+        pool = YoutubeDLPool({}, size=1, max_uses=100, factory=FakeYDL)
+        release = threading.Event()
+        acquired = threading.Event()
+        
+        def hold():
+            with pool.acquire():
+                acquired.set()
+                release.wait()
+        
+        holder = threading.Thread(target=hold)
+        holder.start()
+        acquired.wait()
+        assert pool.stats()["utilization"] == 1.0
+        
+        with pytest.raises(PoolExhaustedError):
+            with pool.acquire(timeout=0.05):
+                pass
+        
+        release.set()
+        holder.join()
+        assert pool.stats()["in_use"] == 0
@@ -0,0 +1,358 @@
+"""
+Unit tests for YouTubeMusicService with a stubbed YTMusic client.
+"""
+import threading
+import time
+
+import pytest
+
+from app.models.lyrics import LyricsData, LyricsLine
+from app.services.youtube_music import YouTubeMusicService
+
+
+LYRICS_FOUND = LyricsData(type="plain", lines=[LyricsLine(text="found")], source="lrclib")
+
+
+class FakeYTMusic:
+    """Offline YTMusic stand-in recording upstream calls."""
+    
+    def __init__(self):
+        self.calls = []
+    
+    def search(self, query, filter=None, limit=20):
+        self.calls.append(("search", query, filter))
+        return [
+            {"browseId": "VLPL1", "title": "One", "itemCount": "3", "thumbnails": []},
+            {"browseId": "VLPL2", "title": "Two", "itemCount": None, "thumbnails": []},
+        ]
+    
+    def get_search_suggestions(self, query):
+        self.calls.append(("get_search_suggestions", query))
+        if query == "boom":
+            raise RuntimeError("upstream down")
+        return [f"{query} {suffix}" for suffix in ("lyrics", "live", "remix")][:3 if len(query) < 4 else 2]
+    
+    def get_playlist(self, playlist_id):
+        self.calls.append(("get_playlist", playlist_id))
+        # One unavailable track without a videoId
+        return {"title": playlist_id, "tracks": [
+            {"videoId": "aaaaaaaaaaa"}, {"videoId": "bbbbbbbbbbb"}, {"videoId": None}
+        ]}
+
+
+@pytest.fixture
+def service():
+    service = YouTubeMusicService()
+    service._client = FakeYTMusic()
+    return service
+
+
+def _wait_for(predicate, timeout=2.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+class TestPlaylistSearchCounts:
+    """Tests for the playable-count index used by search_playlists."""
+    
+    def test_fast_mode_returns_upstream_count_then_exact(self, service):
+        """Fast mode should not block on get_playlist and fill counts later."""
+        first = service.search_playlists("mix", exact_counts=False)
+        
+        assert [p.song_count for p in first] == [3, None]
+        assert _wait_for(lambda: service.playable_count_stats()["entries"] == 2)
+        
+        second = service.search_playlists("mix", exact_counts=False)
+        assert [p.song_count for p in second] == [2, 2]
+    
+    def test_exact_mode_counts_playable_tracks(self, service):
+        """Exact mode should return counts of tracks with a videoId."""
+        playlists = service.search_playlists("mix", exact_counts=True)
+        
+        assert [p.song_count for p in playlists] == [2, 2]
+    
+    def test_exact_mode_falls_back_when_counting_hangs(self, service, monkeypatch):
+        """A hung get_playlist should not hold the search past the browse timeout."""
+        from app.config import settings
+        
+        release = threading.Event()
+        original = service._client.get_playlist
+        service._client.get_playlist = lambda pid: release.wait(5) and original(pid)
+        monkeypatch.setattr(settings, "executor_browse_timeout", 0.1)
+        try:
+            started = time.monotonic()
+            playlists = service.search_playlists("mix", exact_counts=True)
+            
+            assert time.monotonic() - started < 2
+            assert [p.song_count for p in playlists] == [3, None]
+        finally:
+            release.set()
+    
+    def test_index_avoids_repeat_playlist_downloads(self, service):
+        """Known counts should not trigger another get_playlist."""
+        service.search_playlists("mix", exact_counts=True)
+        service.search_playlists("mix", exact_counts=True)
+        
+        fetches = [c for c in service._client.calls if c[0] == "get_playlist"]
+        assert len(fetches) == 2
+    
+    def test_get_playlist_fills_index(self, service):
+        """Opening a playlist should record its playable count."""
+        service.get_playlist("VLPL1")
+        
+        assert service._get_indexed_playable_count("VLPL1") == 2
+    
+    def test_parse_item_count(self, service):
+        """Upstream counts should parse from int or numeric strings only."""
+        assert service._parse_item_count(174) == 174
+        assert service._parse_item_count("1,204") == 1204
+        assert service._parse_item_count("1.2K") is None
+        assert service._parse_item_count(None) is None
+
+
+class FakeResponse:
+    """Minimal requests.Response stand-in."""
+    
+    def __init__(self, status_code, payload=None):
+        self.status_code = status_code
+        self._payload = payload or {}
+    
+    def json(self):
+        return self._payload
+
+
+class TestLyricsCache:
+    """Tests for persistent lyrics caching, including negative results."""
+    
+    @pytest.fixture
+    def lyrics_service(self, tmp_path):
+        """Service with a temp persistent cache and stubbed upstreams."""
+        from app.services.persistent_cache import PersistentCache
+        
+        lrclib = {"calls": 0, "response": FakeResponse(404)}
+        
+        class FakeHttp:
+            def get(self, url, params=None):
+                lrclib["calls"] += 1
+                if isinstance(lrclib["response"], Exception):
+                    raise lrclib["response"]
+                return lrclib["response"]
+        
+        store = PersistentCache(str(tmp_path / "cache.sqlite3"), max_bytes=1_000_000, ttls={})
+        service = YouTubeMusicService(store=store, http=FakeHttp())
+        client = FakeYTMusic()
+        client.get_watch_playlist = lambda video_id: client.calls.append(("watch", video_id)) or {
+            "tracks": [{"title": "Song", "artists": [{"name": "Artist"}], "length": "3:00"}],
+            "lyrics": None
+        }
+        service._client = client
+        return service, lrclib
+    
+    def test_lyrics_cached_by_video_id(self, lyrics_service):
+        """Found lyrics should be served from the cache next time."""
+        service, lrclib = lyrics_service
+        lrclib["response"] = FakeResponse(200, {"syncedLyrics": "[00:01.00] Hello\n[00:03.50] World"})
+        
+        first = service.get_lyrics("abcdefghijk")
+        second = service.get_lyrics("abcdefghijk")
+        
+        assert first.type == "synced"
+        assert second == first
+        assert second.lines[1].start_time_ms == 3500
+        assert lrclib["calls"] == 1
+    
+    def test_no_lyrics_is_cached(self, lyrics_service):
+        """Instrumentals should not re-query upstream."""
+        service, lrclib = lyrics_service
+        
+        assert service.get_lyrics("abcdefghijk") is None
+        assert service.get_lyrics("abcdefghijk") is None
+        assert lrclib["calls"] == 1
+        assert len([c for c in service._client.calls if c[0] == "watch"]) == 1
+    
+    def test_lrclib_error_not_cached_as_missing(self, lyrics_service):
+        """A failed LRCLIB lookup should be retried on the next request."""
+        service, lrclib = lyrics_service
+        lrclib["response"] = ConnectionError("LRCLIB down")
+        
+        assert service.get_lyrics("abcdefghijk") is None
+        lrclib["response"] = FakeResponse(200, {"plainLyrics": "line one\nline two"})
+        lyrics = service.get_lyrics("abcdefghijk")
+        
+        assert lyrics.type == "plain"
+        assert [line.text for line in lyrics.lines] == ["line one", "line two"]
+    
+    def test_hints_skip_watch_playlist(self, lyrics_service):
+        """With song hints, LRCLIB is queried without a watch-playlist call."""
+        service, lrclib = lyrics_service
+        lrclib["response"] = FakeResponse(200, {"plainLyrics": "hello"})
+        hints = service.lyrics_hints(
+            {"videoDetails": {"title": "Song", "author": "Artist - Topic", "lengthSeconds": "180"}}
+        )
+        
+        lyrics = service.get_lyrics("abcdefghijk", hints)
+        
+        assert hints == {"title": "Song", "artist": "Artist", "duration_sec": 180}
+        assert lyrics.lines[0].text == "hello"
+        assert not [c for c in service._client.calls if c[0] == "watch"]
+    
+    def test_hint_miss_retries_with_watch_track(self, lyrics_service, monkeypatch):
+        """A hint miss should retry LRCLIB with the watch-playlist track metadata."""
+        service, lrclib = lyrics_service
+        queried = []
+        
+        def fake_lrclib(title, artist, duration_sec):
+            queried.append(title)
+            return LYRICS_FOUND if title == "Song" else None
+        
+        monkeypatch.setattr(service, "_get_lrclib_lyrics", fake_lrclib)
+        hints = {"title": "Song (Official Video)", "artist": "Artist", "duration_sec": 180}
+        
+        assert service.get_lyrics("abcdefghijk", hints) is LYRICS_FOUND
+        assert queried == ["Song (Official Video)", "Song"]
+    
+    def test_lrclib_skipped_while_circuit_open(self, lyrics_service):
+        """After repeated LRCLIB failures, lookups should skip it for the cool-down."""
+        service, lrclib = lyrics_service
+        lrclib["response"] = ConnectionError("LRCLIB down")
+        threshold = service.lrclib_breaker.failure_threshold
+        
+        for i in range(threshold + 3):
+            assert service.get_lyrics(f"video{i:06d}") is None
+        
+        assert lrclib["calls"] == threshold
+        assert service.lrclib_breaker.state == "open"
+
+
+class TestCacheLayers:
+    """The response cache must not be refilled from stale raw payloads."""
+    
+    def test_stale_refresh_reaches_upstream(self, tmp_path):
+        from app.services.persistent_cache import PersistentCache
+        from app.services.response_cache import MemoryBackend, ResponseCache
+        
+        store = PersistentCache(str(tmp_path / "cache.sqlite3"), max_bytes=1_000_000, ttls={})
+        cache = ResponseCache(MemoryBackend(100), ttls={"album": 0.05}, stale_ttl=60)
+        service = YouTubeMusicService(store=store, response_cache=cache)
+        client = FakeYTMusic()
+        version = {"title": "First"}
+        client.get_album = lambda browse_id: client.calls.append(("get_album", browse_id)) or {
+            "title": version["title"], "tracks": []
+        }
+        service._client = client
+        assert service.get_album("MPREb_1")["title"] == "First"
+        
+        time.sleep(0.1)
+        version["title"] = "Second"
+        service.get_album("MPREb_1")
+        
+        assert _wait_for(lambda: cache.stats()["refreshes"] == 1)
+        assert service.get_album("MPREb_1")["title"] == "Second"
+        assert len(client.calls) == 2
+        # The raw payload was overwritten for readers outside the response cache
+        assert store.get("album", "MPREb_1")["title"] == "Second"
+    
+    def test_cold_worker_reads_shared_store(self, tmp_path):
+        """A second worker's response-cache miss should be served from the shared store."""
+        from app.services.persistent_cache import PersistentCache
+        from app.services.response_cache import MemoryBackend, ResponseCache
+        
+        store = PersistentCache(str(tmp_path / "cache.sqlite3"), max_bytes=1_000_000, ttls={})
+        client = FakeYTMusic()
+        client.get_album = lambda browse_id: client.calls.append(("get_album", browse_id)) or {
+            "title": "First", "tracks": []
+        }
+        workers = []
+        for _ in range(2):
+            cache = ResponseCache(MemoryBackend(100), ttls={"album": 60}, stale_ttl=60)
+            worker = YouTubeMusicService(store=store, response_cache=cache)
+            worker._client = client
+            workers.append(worker)
+        
+        assert workers[0].get_album("MPREb_1")["title"] == "First"
+        assert workers[1].get_album("MPREb_1")["title"] == "First"
+        assert len(client.calls) == 1
+    
+    def test_cold_worker_skips_payload_older_than_ttl(self, tmp_path):
+        """Stored payloads older than the response-cache TTL should go upstream."""
+        from app.services.persistent_cache import PersistentCache
+        from app.services.response_cache import MemoryBackend, ResponseCache
+        
+        store = PersistentCache(str(tmp_path / "cache.sqlite3"), max_bytes=1_000_000, ttls={})
+        store.set("album", "MPREb_1", {"title": "Old", "tracks": []}, ttl=3600)
+        time.sleep(0.1)
+        cache = ResponseCache(MemoryBackend(100), ttls={"album": 0.05}, stale_ttl=60)
+        service = YouTubeMusicService(store=store, response_cache=cache)
+        client = FakeYTMusic()
+        client.get_album = lambda browse_id: client.calls.append(("get_album", browse_id)) or {
+            "title": "New", "tracks": []
+        }
+        service._client = client
+        
+        assert service.get_album("MPREb_1")["title"] == "New"
+        assert len(client.calls) == 1
+
+
+class TestSearchSuggestions:
+    """Tests for serving autocomplete from the prefix index."""
+    
+    @pytest.fixture(autouse=True)
+    def page_size(self, service):
+        # FakeYTMusic returns 3 suggestions for a full page
+        service.suggestion_index.page_size = 3
+    
+    def test_repeat_and_longer_prefixes_skip_upstream(self, service):
+        assert service.get_search_suggestions("lof") == ["lof lyrics", "lof live", "lof remix"]
+        assert service.get_search_suggestions("LOF") == ["lof lyrics", "lof live", "lof remix"]
+        # Shorter than a full page, so the list is complete
+        assert service.get_search_suggestions("lofi") == ["lofi lyrics", "lofi live"]
+        assert service.get_search_suggestions("lofi l") == ["lofi lyrics", "lofi live"]
+        assert service.cached_search_suggestions("lofi ly") == ["lofi lyrics"]
+        
+        assert [call[1] for call in service._client.calls] == ["lof", "lofi"]
+    
+    def test_endpoint_looks_up_index_once_per_request(self, service, monkeypatch):
+        from fastapi.testclient import TestClient
+        from app.main import app
+        from app.routers import search as search_router
+        monkeypatch.setattr(search_router, "yt_music_service", service)
+        client = TestClient(app)
+        
+        assert client.get("/api/v1/search/suggestions?q=lof").json()["data"] == ["lof lyrics", "lof live", "lof remix"]
+        assert client.get("/api/v1/search/suggestions?q=lof").json()["data"] == ["lof lyrics", "lof live", "lof remix"]
+        
+        stats = service.suggestion_index.stats()
+        assert (stats["misses"], stats["hits"]) == (1, 1)
+        assert len(service._client.calls) == 1
+    
+    def test_failures_are_not_indexed(self, service):
+        assert service.get_search_suggestions("boom") == []
+        assert service.cached_search_suggestions("boom") is None
+        assert service.cached_search_suggestions("b") == []
+
+
+class TestDownloadDelivery:
+    """Tests for choosing passthrough / remux / transcode downloads."""
+    
+    @pytest.mark.parametrize("info,codec,expected", [
+        ({"acodec": "mp4a.40.2", "container": "m4a_dash"}, "m4a", "remux"),
+        ({"acodec": "mp4a.40.2"}, "m4a", "passthrough"),
+        ({"acodec": "opus"}, "opus", "passthrough"),
+        ({"acodec": "opus"}, "m4a", "transcode"),
+        ({"acodec": "mp4a.40.5"}, "opus", "transcode"),
+        ({}, "m4a", "transcode"),
+    ])
+    def test_plan_delivery(self, service, info, codec, expected):
+        assert service._plan_delivery(info, codec) == expected
+    
+    def test_download_format_prefers_requested_codec(self, service):
+        assert service._download_format("128k", "m4a").split("/")[:3] == [
+            "bestaudio[acodec^=mp4a][abr<=128]",
+            "bestaudio[acodec^=mp4a]",
+            "bestaudio[abr<=128]",
+        ]
+        assert service._download_format("best", "opus").startswith("bestaudio[acodec=opus]/")
@@ -0,0 +1,133 @@
+"""
+Tests for recording and replaying YTMusic responses.
+"""
+import gzip
+import json
+import os
+import time
+
+import pytest
+
+from app.services.youtube_music import YouTubeMusicService
+from app.services.ytmusic_fixtures import FixtureNotFound, RecordingYTMusic, ReplayYTMusic, fixture_name
+from benchmarks import bench_replay
+
+
+class FakeYTMusic:
+    """Offline YTMusic stand-in with a little latency."""
+
+    language = "en"
+
+    def __init__(self):
+        self.calls = 0
+
+    def search(self, query, filter=None, limit=20):
+        self.calls += 1
+        time.sleep(0.02)
+        return [
+            {"videoId": f"{query[:5]}{i:06d}", "title": f"{query} {i}", "artists": [{"name": "Artist"}],
+             "duration": "3:30", "thumbnails": [{"url": "https://lh3.googleusercontent.com/x=w60-h60"}]}
+            for i in range(limit)
+        ]
+
+    def get_album(self, browse_id):
+        self.calls += 1
+        return {"title": "Album", "artists": [{"name": "Artist"}], "thumbnails": [], "tracks": [
+            {"videoId": f"{i:011d}", "title": f"Track {i}", "artists": [{"name": "Artist"}]}
+            for i in range(1200)
+        ]}
+
+
+@pytest.fixture
+def recorded(tmp_path):
+    """Fixture directory with a recorded search and album."""
+    recorder = RecordingYTMusic(FakeYTMusic(), str(tmp_path))
+    recorder.search("lofi beats", filter="songs", limit=5)
+    recorder.get_album("MPREb_album")
+    return tmp_path
+
+
+class TestRecording:
+    """Tests for RecordingYTMusic."""
+
+    def test_writes_compressed_fixture_with_latency(self, tmp_path):
+        client = FakeYTMusic()
+        recorder = RecordingYTMusic(client, str(tmp_path))
+
+        results = recorder.search("lofi", filter="songs", limit=3)
+
+        path = tmp_path / fixture_name("search", ("lofi",), {"filter": "songs", "limit": 3})
+        with gzip.open(path, "rt") as f:
+            fixture = json.load(f)
+        assert fixture["response"] == results
+        assert fixture["kwargs"] == {"filter": "songs", "limit": 3}
+        assert fixture["latency"] >= 0.02
+        assert recorder.stats()["recorded"] == 1
+        assert [name for name in os.listdir(tmp_path) if name.endswith(".tmp")] == []
+
+    def test_other_attributes_pass_through(self, tmp_path):
+        recorder = RecordingYTMusic(FakeYTMusic(), str(tmp_path))
+
+        assert recorder.language == "en"
+        assert os.listdir(tmp_path) == []
+
+
+class TestReplay:
+    """Tests for ReplayYTMusic."""
+
+    def test_replays_recorded_response(self, recorded):
+        client = ReplayYTMusic(str(recorded), latency=0)
+
+        results = client.search("lofi beats", filter="songs", limit=5)
+
+        assert [r["title"] for r in results] == [f"lofi beats {i}" for i in range(5)]
+        assert len(client.get_album("MPREb_album")["tracks"]) == 1200
+        assert client.stats()["replayed"] == 2
+
+    def test_each_call_returns_a_fresh_copy(self, recorded):
+        client = ReplayYTMusic(str(recorded), latency=0)
+
+        client.get_album("MPREb_album")["tracks"].clear()
+
+        assert len(client.get_album("MPREb_album")["tracks"]) == 1200
+
+    def test_replays_recorded_latency_unless_overridden(self, recorded):
+        recorded_client = ReplayYTMusic(str(recorded))
+        fixed_client = ReplayYTMusic(str(recorded), latency=0)
+
+        started = time.perf_counter()
+        recorded_client.search("lofi beats", filter="songs", limit=5)
+        recorded_seconds = time.perf_counter() - started
+        started = time.perf_counter()
+        fixed_client.search("lofi beats", filter="songs", limit=5)
+        fixed_seconds = time.perf_counter() - started
+
+        assert recorded_seconds >= 0.02
+        assert fixed_seconds < 0.02
+
+    def test_unrecorded_call_raises(self, recorded):
+        client = ReplayYTMusic(str(recorded), latency=0)
+
+        with pytest.raises(FixtureNotFound):
+            client.search("lofi beats", filter="songs", limit=6)
+        assert client.stats()["missing"] == 1
+
+    def test_service_parses_replayed_payloads(self, recorded):
+        service = YouTubeMusicService(client=ReplayYTMusic(str(recorded), latency=0))
+
+        songs = service.search_songs("lofi beats", limit=5)
+
+        assert [s.title for s in songs] == [f"lofi beats {i}" for i in range(5)]
+        assert songs[0].thumbnail_url
+
+
+class TestReplayBenchmark:
+    """Smoke test for benchmarks.bench_replay."""
+
+    def test_times_every_replayable_fixture(self, recorded):
+        results = bench_replay.run(str(recorded), iterations=2)
+
+        assert sorted(r["method"] for r in results) == ["get_album", "search"]
+        for result in results:
+            assert result["parse_ms"] > 0
+            assert result["response_bytes"] > 0